@@ -0,0 +1,149 @@
+"""Datenbankgröße und Leselatenz vor und nach der Textkompression
+
+Legt eine temporäre SQLite-Datenbank mit Projekten und Kommunikationsplänen
+an, deren lange Freitexte unkomprimiert (wie vor der Migration) gespeichert
+sind, misst Größe und Lesezeiten, führt die Migration aus und misst erneut.
+Die Texte werden per Bigramm-Kette aus den Markdown-Dateien des Repositorys
+erzeugt, damit sie sich ähnlich wie echte Dokumente komprimieren lassen.
+
+    cd communication-plan-backend
+    python benchmarks/compressed_text.py              # zstd, falls installiert
+    python benchmarks/compressed_text.py --zlib --projects 500
+"""
+import argparse
+import glob
+import os
+import random
+import re
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from sqlalchemy import MetaData, create_engine, insert, select  # noqa: E402
+from src.models import compressed  # noqa: E402
+from src.models.communication_plan import Project, CommunicationPlan  # noqa: E402
+from src.models.migrations import prepare_database, _vacuum  # noqa: E402
+from src.models.rows import project_rows, communication_plan_rows  # noqa: E402
+
+REPOSITORY = os.path.join(os.path.dirname(__file__), '..', '..')
+
+# Feld -> ungefähre Länge in Zeichen
+PROJECT_TEXTS = {'description': 300, 'charter': 20000, 'goals': 3000, 'risk_management_plan': 15000}
+PLAN_TEXTS = {'company_guidelines': 20000, 'compliance_requirements': 10000, 'feedback_mechanisms': 500}
+
+
+class TextGenerator:
+    def __init__(self, seed):
+        corpus = ' '.join(
+            open(path, encoding='utf-8').read() for path in sorted(glob.glob(os.path.join(REPOSITORY, '*.md')))
+        )
+        self.words = re.findall(r'\S+', corpus)
+        self.chain = {}
+        for first, second in zip(self.words, self.words[1:]):
+            self.chain.setdefault(first, []).append(second)
+        self.random = random.Random(seed)
+
+    def __call__(self, size):
+        word = self.random.choice(self.words)
+        output = []
+        length = 0
+        while length < size:
+            output.append(word)
+            length += len(word) + 1
+            word = self.random.choice(self.chain.get(word) or self.words)
+        return ' '.join(output)
+
+
+def populate(engine, projects, generate):
+    """Schreibt die Texte am Typ vorbei als Klartext (Stand vor der Migration)"""
+    project_table = Project.__table__.to_metadata(MetaData())
+    plan_table = CommunicationPlan.__table__.to_metadata(project_table.metadata)
+    for column in (*project_table.columns, *plan_table.columns):
+        if isinstance(column.type, compressed.CompressedText):
+            column.type = column.type.impl_instance
+    with engine.begin() as connection:
+        for project_id in range(1, projects + 1):
+            connection.execute(insert(project_table).values(
+                id=project_id, name=f'Projekt {project_id}',
+                **{field: generate(size) for field, size in PROJECT_TEXTS.items()},
+            ))
+            connection.execute(insert(plan_table).values(
+                project_id=project_id, **{field: generate(size) for field, size in PLAN_TEXTS.items()},
+            ))
+
+
+def measure(path, projects, seed, rounds=3):
+    """Beste Werte aus mehreren Durchläufen (Zeiten in ms)"""
+    results = []
+    for _ in range(rounds):
+        engine = create_engine(f'sqlite:///{path}')
+        ids = random.Random(seed).choices(range(1, projects + 1), k=2000)
+        with engine.connect() as connection:
+            start = time.perf_counter()
+            for project_id in ids:
+                project_rows(connection.execute(project_rows.statement.where(Project.id == project_id)).one())
+                communication_plan_rows(connection.execute(
+                    communication_plan_rows.statement.where(CommunicationPlan.project_id == project_id)
+                ).one())
+            point = (time.perf_counter() - start) / len(ids) * 1e3
+
+            scans = []
+            for _ in range(5):
+                start = time.perf_counter()
+                for row in connection.execute(project_rows.statement):
+                    project_rows(row)
+                scans.append(time.perf_counter() - start)
+
+            start = time.perf_counter()
+            for _ in range(20):
+                connection.execute(select(Project.id, Project.name, Project.updated_at)).all()
+            metadata_scan = (time.perf_counter() - start) / 20 * 1e3
+        engine.dispose()
+        results.append((point, statistics.median(scans) * 1e3, metadata_scan))
+    return [min(values) for values in zip(*results)]
+
+
+def report(label, path, timings):
+    point, scan, metadata_scan = timings
+    print(f'{label:<11} size {os.path.getsize(path) / 1e6:6.1f} MB | point read project+plan {point:6.2f} ms'
+          f' | full project scan {scan:7.1f} ms | id/name scan {metadata_scan:5.1f} ms')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--projects', type=int, default=1000)
+    parser.add_argument('--zlib', action='store_true', help='zlib auch bei installiertem zstandard')
+    parser.add_argument('--seed', type=int, default=7)
+    args = parser.parse_args()
+    if args.zlib:
+        compressed.zstandard = None
+
+    handle, path = tempfile.mkstemp(prefix='compressed-text-', suffix='.db')
+    os.close(handle)
+    os.remove(path)
+    try:
+        engine = create_engine(f'sqlite:///{path}')
+        prepare_database(engine)
+        populate(engine, args.projects, TextGenerator(args.seed))
+        _vacuum(engine)
+        report('plain', path, measure(path, args.projects, args.seed))
+
+        start = time.perf_counter()
+        with engine.begin() as connection:
+            rewritten = compressed.compress_text_columns(connection)
+        elapsed = time.perf_counter() - start
+        _vacuum(engine)
+        engine.dispose()
+        codec = 'zstd' if compressed.zstandard is not None else 'zlib'
+        print(f'migration  rewrote {rewritten} rows in {elapsed:.2f} s ({codec})')
+        report('compressed', path, measure(path, args.projects, args.seed))
+    finally:
+        if os.path.exists(path):
+            os.remove(path)
+
+
+if __name__ == '__main__':
+    main()
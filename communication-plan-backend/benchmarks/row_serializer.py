@@ -0,0 +1,80 @@
+"""ORM-Hydrierung mit to_dict() gegen den Core-Lesepfad (src/models/rows.py)
+
+Legt in einer temporären SQLite-Datenbank ein Projekt mit --rows Stakeholdern
+und ebenso vielen Matrixeinträgen an und misst für beide Wege Laden plus
+json.dumps. Die JSON-Ausgaben werden zusätzlich auf Gleichheit geprüft.
+
+    cd communication-plan-backend
+    python benchmarks/row_serializer.py --rows 100000
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from flask import Flask  # noqa: E402
+from sqlalchemy import insert  # noqa: E402
+from src.models.user import db  # noqa: E402
+from src.models.communication_plan import Project, Stakeholder, CommunicationPlan, CommunicationMatrix  # noqa: E402
+from src.models.migrations import prepare_database  # noqa: E402
+from src.models.rows import stakeholder_rows, matrix_rows  # noqa: E402
+
+
+def populate(rows):
+    project = Project(name='Benchmark', phases='["Analyse"]')
+    db.session.add(project)
+    db.session.flush()
+    plan = CommunicationPlan(project_id=project.id, information_types='["Status"]', communication_budget=1.5)
+    db.session.add(plan)
+    db.session.commit()
+    db.session.execute(insert(Stakeholder), [
+        {'project_id': project.id, 'name': f'Stakeholder {index} ä', 'role': 'Team',
+         'information_needs': '["Status", "Risiken"]', 'timezone': 'UTC'}
+        for index in range(rows)
+    ])
+    db.session.execute(insert(CommunicationMatrix), [
+        {'communication_plan_id': plan.id, 'who_sender': 'Projektleiter', 'what_content': 'c' * 50,
+         'confirmation_required': bool(index % 2)}
+        for index in range(rows)
+    ])
+    db.session.commit()
+    return project.id, plan.id
+
+
+def measure(label, serializer, model, criteria):
+    db.session.expunge_all()
+    start = time.perf_counter()
+    orm = json.dumps([item.to_dict() for item in model.query.filter(criteria).order_by(model.id)])
+    orm_time = time.perf_counter() - start
+
+    db.session.expunge_all()
+    start = time.perf_counter()
+    core = json.dumps(list(serializer.iter_rows(criteria, order_by=model.id)))
+    core_time = time.perf_counter() - start
+    print(f'{label:<13} ORM {orm_time:6.2f} s | Core {core_time:6.2f} s | identical {orm == core}')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, default=100000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory(prefix='row-serializer-') as directory:
+        app = Flask(__name__)
+        app.config['SQLALCHEMY_DATABASE_URI'] = f"sqlite:///{os.path.join(directory, 'app.db')}"
+        db.init_app(app)
+        with app.app_context():
+            prepare_database()
+            project_id, plan_id = populate(args.rows)
+            measure('stakeholders', stakeholder_rows, Stakeholder, Stakeholder.project_id == project_id)
+            measure('matrix', matrix_rows, CommunicationMatrix, CommunicationMatrix.communication_plan_id == plan_id)
+            db.session.remove()
+            db.engine.dispose()
+
+
+if __name__ == '__main__':
+    main()
@@ -7,11 +7,23 @@ from flask import Flask, send_from_directory
 from flask_cors import CORS
 from src.models.user import db
 from src.models.communication_plan import Project, Stakeholder, CommunicationPlan, CommunicationMatrix
+from src.models.summaries import ProjectValidation, ProjectAnalytics, AnalyticsTotal
+from src.models.revisions import ProjectRevision
+from src.models.migrations import prepare_database
+from src.services.project_summaries import refresh_missing_summaries
+from src.services.analytics import refresh_missing_analytics
+from src.services.tenants import init_tenancy
+from src.services.dump import data_cli
 from src.routes.user import user_bp
 from src.routes.projects import projects_bp
 from src.routes.stakeholders import stakeholders_bp
 from src.routes.communication_plans import communication_plans_bp
 from src.routes.export import export_bp
+from src.routes.analytics import analytics_bp
+from src.routes.calendar import calendar_bp
+from src.routes.admission import admission_bp
+from src.routes.revisions import revisions_bp
+from src.routes.dump import dump_bp
 
 app = Flask(__name__, static_folder=os.path.join(os.path.dirname(__file__), 'static'))
 app.config['SECRET_KEY'] = 'asdf#FGSgvasgf$5$WGT'
@@ -25,13 +37,58 @@ app.register_blueprint(projects_bp, url_prefix='/api')
 app.register_blueprint(stakeholders_bp, url_prefix='/api')
 app.register_blueprint(communication_plans_bp, url_prefix='/api')
 app.register_blueprint(export_bp, url_prefix='/api')
+app.register_blueprint(analytics_bp, url_prefix='/api')
+app.register_blueprint(calendar_bp, url_prefix='/api')
+app.register_blueprint(admission_bp, url_prefix='/api')
+app.register_blueprint(revisions_bp, url_prefix='/api')
+
+# GET /api/dump und POST /api/restore lesen bzw. überschreiben die gesamte
+# Datenbank (inklusive Benutzer) ohne Anmeldung; standardmäßig aus, Sicherung
+# und Wiederherstellung laufen über die CLI (flask data dump/restore)
+app.config['DUMP_ENDPOINTS_ENABLED'] = False
+if app.config['DUMP_ENDPOINTS_ENABLED']:
+    app.register_blueprint(dump_bp, url_prefix='/api')
 
 # Database configuration
 app.config['SQLALCHEMY_DATABASE_URI'] = f"sqlite:///{os.path.join(os.path.dirname(__file__), 'database', 'app.db')}"
 app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+
+# Collection-Antworten ab dieser Größe (Bytes) komprimiert streamen
+app.config['JSON_COMPRESS_MIN_SIZE'] = 1024
+
+# Mandanten (Header X-Tenant) erhalten eigene Datenbanken; '{tenant}' in der
+# Shard-URL ergibt eine Datenbank je Mandant, sonst ein Schema je Mandant
+app.config['TENANT_HEADER'] = 'X-Tenant'
+app.config['TENANT_SHARDS'] = {
+    'local': 'sqlite:///' + os.path.join(os.path.dirname(__file__), 'database', 'tenants', '{tenant}.db'),
+}
+app.config['TENANT_DEFAULT_SHARD'] = 'local'
+app.config['TENANT_ENGINE_CACHE_SIZE'] = 32
+# Sekunden, die die Zuordnung Mandant -> Shard zwischengespeichert wird (Umzüge warten so lange)
+app.config['TENANT_PLACEMENT_TTL'] = 5.0
+
+# Portfolio-Analytics aus inkrementell gepflegten Summentabellen lesen
+app.config['ANALYTICS_MATERIALIZED'] = True
+
+# Revisionen: spätestens nach so vielen Deltas wird wieder ein Vollstand gespeichert
+app.config['REVISION_KEYFRAME_INTERVAL'] = 50
+
+# Gleichzeitige Ausführungen und Warteschlange je Endpunktklasse (pro Prozess)
+app.config['ADMISSION_LIMITS'] = {
+    'export': {'concurrency': 2, 'queue_size': 4, 'queue_timeout': 10.0},
+    'bulk': {'concurrency': 2, 'queue_size': 8, 'queue_timeout': 30.0},
+    # Vollständige Dumps/Restores laufen lange und belegen keine Export-Plätze
+    'dump': {'concurrency': 1, 'queue_size': 1, 'queue_timeout': 5.0},
+}
+
 db.init_app(app)
 with app.app_context():
-    db.create_all()
+    prepare_database()
+    refresh_missing_summaries()
+    if app.config['ANALYTICS_MATERIALIZED']:
+        refresh_missing_analytics()
+init_tenancy(app)
+app.cli.add_command(data_cli)
 
 @app.route('/', defaults={'path': ''})
 @app.route('/<path:path>')
@@ -1,4 +1,5 @@
 from src.models.user import db
+from src.models.compressed import CompressedText
 from datetime import datetime
 import json
 
@@ -8,17 +9,24 @@ class Project(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String(200), nullable=False)
     description = db.Column(db.Text)
-    charter = db.Column(db.Text)
-    goals = db.Column(db.Text)
+    # Lange, eingefügte Dokumente; Spalten, die per SQL geprüft werden
+    # (z.B. description in der Validierung), bleiben unkomprimiert
+    charter = db.Column(CompressedText)
+    goals = db.Column(CompressedText)
     phases = db.Column(db.Text)  # JSON string
     milestones = db.Column(db.Text)  # JSON string
-    risk_management_plan = db.Column(db.Text)
+    risk_management_plan = db.Column(CompressedText)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    # Zähler für optimistische Nebenläufigkeit (ETag/If-Match), siehe services/concurrency.py
+    version = db.Column(db.Integer, nullable=False, default=1, server_default=db.text('1'))
+
+    __mapper_args__ = {'version_id_col': version}
     
     # Relationships
-    stakeholders = db.relationship('Stakeholder', backref='project', lazy=True, cascade='all, delete-orphan')
-    communication_plan = db.relationship('CommunicationPlan', backref='project', uselist=False, cascade='all, delete-orphan')
+    # Kindzeilen löscht die Datenbank (ON DELETE CASCADE); das ORM lädt sie dafür nicht
+    stakeholders = db.relationship('Stakeholder', backref='project', lazy=True, cascade='all, delete-orphan', passive_deletes=True)
+    communication_plan = db.relationship('CommunicationPlan', backref='project', uselist=False, cascade='all, delete-orphan', passive_deletes=True)
     
     def to_dict(self):
         return {
@@ -31,17 +39,18 @@ class Project(db.Model):
             'milestones': json.loads(self.milestones) if self.milestones else [],
             'risk_management_plan': self.risk_management_plan,
             'created_at': self.created_at.isoformat() if self.created_at else None,
-            'updated_at': self.updated_at.isoformat() if self.updated_at else None
+            'updated_at': self.updated_at.isoformat() if self.updated_at else None,
+            'version': self.version
         }
 
 class Stakeholder(db.Model):
     __tablename__ = 'stakeholders'
     
     id = db.Column(db.Integer, primary_key=True)
-    project_id = db.Column(db.Integer, db.ForeignKey('projects.id'), nullable=False)
+    project_id = db.Column(db.Integer, db.ForeignKey('projects.id', ondelete='CASCADE'), nullable=False, index=True)
     name = db.Column(db.String(100), nullable=False)
     role = db.Column(db.String(100))
-    department = db.Column(db.String(100))
+    department = db.Column(db.String(100), index=True)
     contact_info = db.Column(db.String(200))
     information_needs = db.Column(db.Text)  # JSON string
     preferred_channels = db.Column(db.Text)  # JSON string
@@ -51,6 +60,18 @@ class Stakeholder(db.Model):
     decision_authority = db.Column(db.Text)
     timezone = db.Column(db.String(50))
     availability = db.Column(db.Text)
+    # Hash aus normalisiertem Namen und Kontakt, siehe services/duplicates.py;
+    # NULL bei Altbeständen, die bereits doppelt vorhanden waren
+    identity_key = db.Column(db.String(40))
+    version = db.Column(db.Integer, nullable=False, default=1, server_default=db.text('1'))
+
+    __mapper_args__ = {'version_id_col': version}
+    __table_args__ = (
+        db.Index(
+            'ux_stakeholders_project_identity', 'project_id', 'identity_key', unique=True,
+            sqlite_where=identity_key.isnot(None), postgresql_where=identity_key.isnot(None),
+        ),
+    )
     
     def to_dict(self):
         return {
@@ -67,39 +88,43 @@ class Stakeholder(db.Model):
             'escalation_path': self.escalation_path,
             'decision_authority': self.decision_authority,
             'timezone': self.timezone,
-            'availability': self.availability
+            'availability': self.availability,
+            'version': self.version
         }
 
 class CommunicationPlan(db.Model):
     __tablename__ = 'communication_plans'
     
     id = db.Column(db.Integer, primary_key=True)
-    project_id = db.Column(db.Integer, db.ForeignKey('projects.id'), nullable=False)
+    project_id = db.Column(db.Integer, db.ForeignKey('projects.id', ondelete='CASCADE'), nullable=False, index=True)
     
     # Organisatorische Rahmenbedingungen
-    company_guidelines = db.Column(db.Text)
+    company_guidelines = db.Column(CompressedText)
     available_technologies = db.Column(db.Text)  # JSON string
-    documentation_standards = db.Column(db.Text)
-    compliance_requirements = db.Column(db.Text)
+    documentation_standards = db.Column(CompressedText)
+    compliance_requirements = db.Column(CompressedText)
     
     # Kommunikationsspezifische Details
     information_types = db.Column(db.Text)  # JSON string
-    confidentiality_requirements = db.Column(db.Text)
-    language_considerations = db.Column(db.Text)
-    cultural_considerations = db.Column(db.Text)
+    confidentiality_requirements = db.Column(CompressedText)
+    language_considerations = db.Column(CompressedText)
+    cultural_considerations = db.Column(CompressedText)
     communication_budget = db.Column(db.Float)
-    budget_breakdown = db.Column(db.Text)
+    budget_breakdown = db.Column(CompressedText)
     
     # Prozessdefinition
-    feedback_mechanisms = db.Column(db.Text)
-    update_procedures = db.Column(db.Text)
-    effectiveness_metrics = db.Column(db.Text)
+    feedback_mechanisms = db.Column(CompressedText)
+    update_procedures = db.Column(CompressedText)
+    effectiveness_metrics = db.Column(db.Text)  # in der Validierung per SQL geprüft
     
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    version = db.Column(db.Integer, nullable=False, default=1, server_default=db.text('1'))
+
+    __mapper_args__ = {'version_id_col': version}
     
     # Relationships
-    communication_matrix = db.relationship('CommunicationMatrix', backref='communication_plan', lazy=True, cascade='all, delete-orphan')
+    communication_matrix = db.relationship('CommunicationMatrix', backref='communication_plan', lazy=True, cascade='all, delete-orphan', passive_deletes=True)
     
     def to_dict(self):
         return {
@@ -119,28 +144,41 @@ class CommunicationPlan(db.Model):
             'update_procedures': self.update_procedures,
             'effectiveness_metrics': self.effectiveness_metrics,
             'created_at': self.created_at.isoformat() if self.created_at else None,
-            'updated_at': self.updated_at.isoformat() if self.updated_at else None
+            'updated_at': self.updated_at.isoformat() if self.updated_at else None,
+            'version': self.version
         }
 
+# Verknüpfung von Matrixeinträgen mit Stakeholdern als Sender bzw. Empfänger
+matrix_stakeholders = db.Table(
+    'matrix_stakeholders',
+    db.Column('matrix_id', db.Integer, db.ForeignKey('communication_matrix.id', ondelete='CASCADE'), primary_key=True),
+    db.Column('stakeholder_id', db.Integer, db.ForeignKey('stakeholders.id', ondelete='CASCADE'), primary_key=True),
+    db.Column('role', db.String(10), primary_key=True),  # sender, receiver
+    db.Index('ix_matrix_stakeholders_stakeholder_role', 'stakeholder_id', 'role'),
+)
+
 class CommunicationMatrix(db.Model):
     __tablename__ = 'communication_matrix'
     
     id = db.Column(db.Integer, primary_key=True)
-    communication_plan_id = db.Column(db.Integer, db.ForeignKey('communication_plans.id'), nullable=False)
+    communication_plan_id = db.Column(db.Integer, db.ForeignKey('communication_plans.id', ondelete='CASCADE'), nullable=False, index=True)
     
     # Wer, Was, Wann, Wie, Warum
     who_sender = db.Column(db.String(100))  # Wer sendet
     who_receiver = db.Column(db.String(100))  # Wer empfängt
     what_content = db.Column(db.Text)  # Was wird kommuniziert
-    when_frequency = db.Column(db.String(50))  # Wann/Häufigkeit
+    when_frequency = db.Column(db.String(50), index=True)  # Wann/Häufigkeit
     when_timing = db.Column(db.String(100))  # Spezifisches Timing
-    how_channel = db.Column(db.String(50))  # Wie/Kanal
+    how_channel = db.Column(db.String(50), index=True)  # Wie/Kanal
     how_format = db.Column(db.String(50))  # Format
     why_purpose = db.Column(db.Text)  # Warum/Zweck
     
     # Zusätzliche Felder
-    priority = db.Column(db.String(20))  # Hoch, Mittel, Niedrig
+    priority = db.Column(db.String(20), index=True)  # Hoch, Mittel, Niedrig
     confirmation_required = db.Column(db.Boolean, default=False)
+    version = db.Column(db.Integer, nullable=False, default=1, server_default=db.text('1'))
+
+    __mapper_args__ = {'version_id_col': version}
     
     def to_dict(self):
         return {
@@ -155,6 +193,7 @@ class CommunicationMatrix(db.Model):
             'how_format': self.how_format,
             'why_purpose': self.why_purpose,
             'priority': self.priority,
-            'confirmation_required': self.confirmation_required
+            'confirmation_required': self.confirmation_required,
+            'version': self.version
         }
 
@@ -0,0 +1,136 @@
+from sqlalchemy import select, update, bindparam, cast, func, or_, and_
+from sqlalchemy.types import TypeDecorator, Text, LargeBinary
+from src.models.user import db
+import threading
+import zlib
+
+try:
+    import zstandard
+except ImportError:  # zstd ist optional, ohne Paket wird mit zlib komprimiert
+    zstandard = None
+
+# Komprimierte Freitextspalten: Texte ab einer Mindestgröße werden in
+# SQLite als BLOB aus einem Kennbyte (Verfahren) und den komprimierten
+# UTF-8-Daten gespeichert, kürzere bleiben Text. Die Spalte bleibt als TEXT
+# deklariert, ältere Zeilen und kurze Werte werden unverändert gelesen. In
+# SQL lassen sich komprimierte Werte nicht vergleichen oder durchsuchen;
+# Spalten, die in Validierung, Analytics oder Filtern per SQL ausgewertet
+# werden, bleiben daher normale Textspalten. Andere Datenbanken
+# (PostgreSQL komprimiert große Texte per TOAST selbst) erhalten Klartext.
+
+DEFAULT_THRESHOLD = 1024
+ZLIB_LEVEL = 6
+ZSTD_LEVEL = 6
+BATCH_SIZE = 500
+
+_ZLIB = b'z'
+_ZSTD = b's'
+
+# ZstdCompressor/ZstdDecompressor dürfen nicht von mehreren Threads
+# gleichzeitig verwendet werden, daher je Thread eigene Instanzen
+_zstd = threading.local()
+
+
+def _zstd_compressor():
+    compressor = getattr(_zstd, 'compressor', None)
+    if compressor is None:
+        compressor = _zstd.compressor = zstandard.ZstdCompressor(level=ZSTD_LEVEL)
+    return compressor
+
+
+def _zstd_decompressor():
+    decompressor = getattr(_zstd, 'decompressor', None)
+    if decompressor is None:
+        decompressor = _zstd.decompressor = zstandard.ZstdDecompressor()
+    return decompressor
+
+
+def compress_text(value, threshold=DEFAULT_THRESHOLD):
+    """Komprimiert value, sofern es mindestens threshold Bytes groß ist und kleiner wird"""
+    raw = value.encode('utf-8')
+    if len(raw) < threshold:
+        return value
+    if zstandard is not None:
+        packed = _ZSTD + _zstd_compressor().compress(raw)
+    else:
+        packed = _ZLIB + zlib.compress(raw, ZLIB_LEVEL)
+    return packed if len(packed) < len(raw) else value
+
+
+def decompress_text(value):
+    """Gegenstück zu compress_text; Text wird unverändert zurückgegeben"""
+    if not isinstance(value, (bytes, memoryview)):
+        return value
+    value = bytes(value)
+    method, data = value[:1], value[1:]
+    if method == _ZLIB:
+        return zlib.decompress(data).decode('utf-8')
+    if method == _ZSTD:
+        if zstandard is None:
+            raise RuntimeError('zstd-compressed text requires the zstandard package')
+        return _zstd_decompressor().decompress(data).decode('utf-8')
+    raise ValueError(f'Unknown text compression {method!r}')
+
+
+class CompressedText(TypeDecorator):
+    """Text, der ab threshold Bytes komprimiert gespeichert wird (nur SQLite)"""
+
+    impl = Text
+    cache_ok = True
+
+    def __init__(self, threshold=DEFAULT_THRESHOLD, **kwargs):
+        super().__init__(**kwargs)
+        self.threshold = threshold
+
+    def process_bind_param(self, value, dialect):
+        if value is None or dialect.name != 'sqlite':
+            return value
+        return compress_text(value, self.threshold)
+
+    def process_result_value(self, value, dialect):
+        return decompress_text(value)
+
+
+def compressed_columns(table):
+    return [column for column in table.columns if isinstance(column.type, CompressedText)]
+
+
+def compress_text_columns(connection, project_ids=None):
+    """Schreibt als Text gespeicherte große Werte komprimiert neu (Migration, Import)
+
+    project_ids beschränkt auf die Zeilen dieser Projekte. Version und
+    updated_at bleiben unverändert, der Inhalt ändert sich ja nicht. Liefert
+    die Zahl neu geschriebener Zeilen.
+    """
+    if connection.dialect.name != 'sqlite':
+        return 0
+    rewritten = 0
+    for table in db.metadata.sorted_tables:
+        columns = compressed_columns(table)
+        if not columns:
+            continue
+        statement = select(table.c.id, *columns).where(or_(*[
+            and_(func.typeof(column) == 'text', func.length(cast(column, LargeBinary)) >= column.type.threshold)
+            for column in columns
+        ]))
+        if project_ids is not None:
+            key = table.c.id if table.name == 'projects' else table.c.project_id
+            statement = statement.where(key.in_(project_ids))
+
+        rewrite = update(table).where(table.c.id == bindparam('_id'))
+        if 'updated_at' in table.c:
+            rewrite = rewrite.values(updated_at=table.c.updated_at)
+        # Seitenweise über die Id, damit nicht in eine laufende Abfrage geschrieben wird
+        last_id = 0
+        while True:
+            rows = connection.execute(
+                statement.where(table.c.id > last_id).order_by(table.c.id).limit(BATCH_SIZE)
+            ).all()
+            if not rows:
+                break
+            connection.execute(rewrite, [
+                {'_id': row.id, **{column.name: row._mapping[column] for column in columns}} for row in rows
+            ])
+            rewritten += len(rows)
+            last_id = rows[-1].id
+    return rewritten
@@ -0,0 +1,171 @@
+from sqlalchemy import event, select, insert, inspect, text
+from sqlalchemy.engine import Engine
+from sqlalchemy.schema import CreateTable, CreateColumn
+from src.models.user import db
+from src.services.matrix_links import relink_all
+from src.services.duplicates import refresh_identity_keys
+from src.models.compressed import compress_text_columns
+from datetime import datetime
+import sqlite3
+
+# db.create_all() legt nur fehlende Tabellen an. Änderungen an bestehenden
+# Tabellen (neue Spalten und Indizes, Fremdschlüssel mit ON DELETE CASCADE) werden hier
+# beim Start nachgezogen, einmalige Datenmigrationen über run_once
+# protokolliert.
+
+@event.listens_for(Engine, 'connect')
+def _enable_foreign_keys(dbapi_connection, connection_record):
+    """SQLite prüft Fremdschlüssel (und ON DELETE CASCADE) nur mit diesem Pragma"""
+    if isinstance(dbapi_connection, sqlite3.Connection):
+        cursor = dbapi_connection.cursor()
+        cursor.execute('PRAGMA foreign_keys=ON')
+        cursor.close()
+
+schema_migrations = db.Table(
+    'schema_migrations',
+    db.Column('name', db.String(100), primary_key=True),
+    db.Column('applied_at', db.DateTime, nullable=False),
+)
+
+def _outdated_foreign_keys(connection):
+    """Tabellen, deren Fremdschlüssel ein anderes ON DELETE haben als im Modell"""
+    inspector = inspect(connection)
+    existing_tables = set(inspector.get_table_names())
+    outdated = []
+    for table in db.metadata.sorted_tables:
+        if table.name not in existing_tables:
+            continue
+        existing = {
+            (tuple(key['constrained_columns']), key['referred_table']): (key.get('options') or {}).get('ondelete')
+            for key in inspector.get_foreign_keys(table.name)
+        }
+        for key in table.foreign_key_constraints:
+            columns = tuple(column.name for column in key.columns)
+            ondelete = key.ondelete.upper() if key.ondelete else None
+            current = existing.get((columns, key.referred_table.name))
+            if (current.upper() if current else None) != ondelete:
+                outdated.append(table)
+                break
+    return outdated
+
+def _rebuild_tables(engine):
+    """Baut SQLite-Tabellen mit geänderten Fremdschlüsseln neu auf
+
+    SQLite kann Constraints nicht per ALTER TABLE ändern. Die Tabelle wird
+    daher neu angelegt, umkopiert und umbenannt. Währenddessen sind
+    Fremdschlüssel abgeschaltet, damit DROP TABLE keine Kaskaden auslöst;
+    das Pragma wirkt nur außerhalb einer Transaktion, die deshalb explizit
+    gesteuert wird. Verwaiste Zeilen, die die neuen Constraints verletzen
+    würden, werden entfernt.
+    """
+    with engine.connect() as connection:
+        connection = connection.execution_options(isolation_level='AUTOCOMMIT')
+        tables = _outdated_foreign_keys(connection)
+        if not tables:
+            return
+
+        connection.exec_driver_sql('PRAGMA foreign_keys=OFF')
+        try:
+            connection.exec_driver_sql('BEGIN')
+            try:
+                for table in tables:
+                    existing = {column['name'] for column in inspect(connection).get_columns(table.name)}
+                    columns = ', '.join(column.name for column in table.columns if column.name in existing)
+                    temporary = f'{table.name}_rebuild'
+
+                    ddl = str(CreateTable(table).compile(dialect=connection.dialect))
+                    connection.exec_driver_sql(ddl.replace(f'CREATE TABLE {table.name} ', f'CREATE TABLE {temporary} ', 1))
+                    connection.exec_driver_sql(f'INSERT INTO {temporary} ({columns}) SELECT {columns} FROM {table.name}')
+                    connection.exec_driver_sql(f'DROP TABLE {table.name}')
+                    connection.exec_driver_sql(f'ALTER TABLE {temporary} RENAME TO {table.name}')
+                    for index in table.indexes:
+                        index.create(connection)
+
+                # Waisen aus der Zeit ohne Fremdschlüsselprüfung entfernen (ggf. mehrstufig)
+                while True:
+                    violations = connection.exec_driver_sql('PRAGMA foreign_key_check').all()
+                    if not violations:
+                        break
+                    for table_name, rowid, _, _ in violations:
+                        connection.exec_driver_sql(f'DELETE FROM {table_name} WHERE rowid = ?', (rowid,))
+                connection.exec_driver_sql('COMMIT')
+            except Exception:
+                connection.exec_driver_sql('ROLLBACK')
+                raise
+        finally:
+            connection.exec_driver_sql('PRAGMA foreign_keys=ON')
+
+def _add_missing_columns(connection):
+    """Ergänzt Spalten, die im Modell neu hinzugekommen sind (nullable, ohne Constraints)"""
+    inspector = inspect(connection)
+    existing_tables = set(inspector.get_table_names())
+    for table in db.metadata.sorted_tables:
+        if table.name not in existing_tables:
+            continue
+        existing = {column['name'] for column in inspector.get_columns(table.name)}
+        for column in table.columns:
+            if column.name not in existing:
+                ddl = str(CreateColumn(column).compile(dialect=connection.dialect))
+                connection.exec_driver_sql(f'ALTER TABLE {table.name} ADD COLUMN {ddl}')
+
+def upgrade_schema(engine=None):
+    """Bringt eine bestehende Datenbank auf den Stand der Modelle"""
+    engine = engine if engine is not None else db.engine
+    with engine.begin() as connection:
+        _add_missing_columns(connection)
+    if engine.dialect.name == 'sqlite':
+        _rebuild_tables(engine)
+    with engine.begin() as connection:
+        for table in db.metadata.sorted_tables:
+            for index in table.indexes:
+                index.create(connection, checkfirst=True)
+
+def sync_sequence(connection, table):
+    """Setzt auf PostgreSQL die Sequenz des Primärschlüssels hinter die vorhandenen Ids
+
+    Nötig nach Inserts mit expliziten Ids (Umzug, Import); SQLite vergibt
+    ohnehin max(id) + 1.
+    """
+    key = list(table.primary_key.columns)
+    if connection.dialect.name != 'postgresql' or len(key) != 1 or not isinstance(key[0].type, db.Integer):
+        return
+    column = key[0].name
+    connection.execute(
+        text(
+            f'SELECT setval(pg_get_serial_sequence(:table, :column), '
+            f'(SELECT coalesce(max("{column}"), 1) FROM "{table.name}"))'
+        ),
+        {'table': table.name, 'column': column},
+    )
+
+def _vacuum(engine):
+    """Gibt freie Seiten nach großen Umschreibungen an das Dateisystem zurück"""
+    with engine.connect() as connection:
+        connection.execution_options(isolation_level='AUTOCOMMIT').exec_driver_sql('VACUUM')
+
+def run_once(name, migration, engine=None):
+    """Führt eine Datenmigration genau einmal je Datenbank aus
+
+    migration erhält eine Connection innerhalb derselben Transaktion, in der
+    die Migration als angewendet markiert wird.
+    """
+    engine = engine if engine is not None else db.engine
+    with engine.begin() as connection:
+        applied = connection.execute(
+            select(schema_migrations.c.name).where(schema_migrations.c.name == name)
+        ).first()
+        if applied:
+            return False
+        migration(connection)
+        connection.execute(insert(schema_migrations).values(name=name, applied_at=datetime.utcnow()))
+    return True
+
+def prepare_database(engine=None):
+    """Legt fehlende Tabellen an und wendet alle Schema- und Datenmigrationen an"""
+    engine = engine if engine is not None else db.engine
+    db.metadata.create_all(engine)
+    upgrade_schema(engine)
+    run_once('matrix_stakeholder_links', relink_all, engine)
+    run_once('stakeholder_identity_keys', refresh_identity_keys, engine)
+    if run_once('compressed_text_columns', compress_text_columns, engine) and engine.dialect.name == 'sqlite':
+        _vacuum(engine)
@@ -0,0 +1,31 @@
+from src.models.user import db
+from datetime import datetime
+
+class ProjectRevision(db.Model):
+    """Revision eines Projekt-Aggregats, als komprimierter Vollstand oder Delta gespeichert"""
+    __tablename__ = 'project_revisions'
+    __table_args__ = (
+        db.UniqueConstraint('project_id', 'number', name='uq_project_revisions_number'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    project_id = db.Column(db.Integer, db.ForeignKey('projects.id', ondelete='CASCADE'), nullable=False)
+    number = db.Column(db.Integer, nullable=False)
+    label = db.Column(db.String(200))
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    # Keyframes enthalten den vollständigen Stand, alle anderen Revisionen nur
+    # die Änderungen gegenüber der vorherigen (zlib-komprimiertes JSON)
+    is_keyframe = db.Column(db.Boolean, nullable=False, default=False)
+    data = db.Column(db.LargeBinary, nullable=False)
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'project_id': self.project_id,
+            'number': self.number,
+            'label': self.label,
+            'created_at': self.created_at.isoformat() if self.created_at else None,
+            'is_keyframe': self.is_keyframe,
+            'stored_bytes': len(self.data) if self.data is not None else 0
+        }
@@ -0,0 +1,133 @@
+from sqlalchemy import select
+from src.models.user import db
+from src.models.communication_plan import Project, Stakeholder, CommunicationPlan, CommunicationMatrix
+from src.models.summaries import ProjectValidation
+import json
+
+# Lesepfad für reine Lese-Endpunkte: Core-Selects liefern Tupel, die über
+# vorkompilierte Serializer direkt in die Form von to_dict() gebracht werden,
+# ohne Objekte in der Identity Map zu hydrieren.
+
+def _json_list(value):
+    return json.loads(value) if value else []
+
+def _isoformat(value):
+    return value.isoformat() if value else None
+
+
+class RowSerializer:
+    """Vorkompilierte Abbildung von Spalten auf die Schlüssel von to_dict()"""
+
+    def __init__(self, model, fields):
+        # Felder sind (Schlüssel, Konverter) oder (Schlüssel, Konverter, Spalte)
+        self.keys = tuple(field[0] for field in fields)
+        self.converters = tuple(
+            (index, field[1]) for index, field in enumerate(fields) if field[1]
+        )
+        self.statement = select(*[
+            field[2] if len(field) > 2 else getattr(model, field[0]) for field in fields
+        ])
+
+    def __call__(self, row):
+        values = list(row)
+        for index, converter in self.converters:
+            values[index] = converter(values[index])
+        return dict(zip(self.keys, values))
+
+    def iter_rows(self, *criteria, order_by=None, yield_per=1000):
+        """Führt das Select aus und liefert die Zeilen als Dicts"""
+        statement = self.statement.where(*criteria)
+        if order_by is not None:
+            statement = statement.order_by(order_by)
+        statement = statement.execution_options(yield_per=yield_per)
+        for row in db.session.execute(statement):
+            yield self(row)
+
+
+project_rows = RowSerializer(Project, [
+    ('id', None),
+    ('name', None),
+    ('description', None),
+    ('charter', None),
+    ('goals', None),
+    ('phases', _json_list),
+    ('milestones', _json_list),
+    ('risk_management_plan', None),
+    ('created_at', _isoformat),
+    ('updated_at', _isoformat),
+    ('version', None),
+])
+
+# Projektliste inklusive gespeichertem Vollständigkeits-Score
+project_list_rows = RowSerializer(Project, [
+    ('id', None),
+    ('name', None),
+    ('description', None),
+    ('charter', None),
+    ('goals', None),
+    ('phases', _json_list),
+    ('milestones', _json_list),
+    ('risk_management_plan', None),
+    ('created_at', _isoformat),
+    ('updated_at', _isoformat),
+    ('version', None),
+    ('completeness_score', None, ProjectValidation.completeness_score),
+])
+project_list_rows.statement = project_list_rows.statement.outerjoin(
+    ProjectValidation, ProjectValidation.project_id == Project.id
+)
+
+stakeholder_rows = RowSerializer(Stakeholder, [
+    ('id', None),
+    ('project_id', None),
+    ('name', None),
+    ('role', None),
+    ('department', None),
+    ('contact_info', None),
+    ('information_needs', _json_list),
+    ('preferred_channels', _json_list),
+    ('preferred_formats', _json_list),
+    ('communication_frequency', None),
+    ('escalation_path', None),
+    ('decision_authority', None),
+    ('timezone', None),
+    ('availability', None),
+    ('version', None),
+])
+
+communication_plan_rows = RowSerializer(CommunicationPlan, [
+    ('id', None),
+    ('project_id', None),
+    ('company_guidelines', None),
+    ('available_technologies', _json_list),
+    ('documentation_standards', None),
+    ('compliance_requirements', None),
+    ('information_types', _json_list),
+    ('confidentiality_requirements', None),
+    ('language_considerations', None),
+    ('cultural_considerations', None),
+    ('communication_budget', None),
+    ('budget_breakdown', None),
+    ('feedback_mechanisms', None),
+    ('update_procedures', None),
+    ('effectiveness_metrics', None),
+    ('created_at', _isoformat),
+    ('updated_at', _isoformat),
+    ('version', None),
+])
+
+matrix_rows = RowSerializer(CommunicationMatrix, [
+    ('id', None),
+    ('communication_plan_id', None),
+    ('who_sender', None),
+    ('who_receiver', None),
+    ('what_content', None),
+    ('when_frequency', None),
+    ('when_timing', None),
+    ('how_channel', None),
+    ('how_format', None),
+    ('why_purpose', None),
+    ('priority', None),
+    ('confirmation_required', None),
+    ('version', None),
+])
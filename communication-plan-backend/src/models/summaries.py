@@ -0,0 +1,50 @@
+from src.models.user import db
+from datetime import datetime
+import json
+
+class ProjectValidation(db.Model):
+    """Gespeichertes Validierungsergebnis je Projekt, inkrementell gepflegt"""
+    __tablename__ = 'project_validations'
+
+    project_id = db.Column(db.Integer, db.ForeignKey('projects.id', ondelete='CASCADE'), primary_key=True)
+    completeness_score = db.Column(db.Float, nullable=False, index=True)
+    is_valid = db.Column(db.Boolean, nullable=False)
+    errors = db.Column(db.Text)  # JSON string
+    warnings = db.Column(db.Text)  # JSON string
+    recommendations = db.Column(db.Text)  # JSON string
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    def to_dict(self):
+        return {
+            'project_id': self.project_id,
+            'completeness_score': self.completeness_score,
+            'is_valid': self.is_valid,
+            'errors': json.loads(self.errors) if self.errors else [],
+            'warnings': json.loads(self.warnings) if self.warnings else [],
+            'recommendations': json.loads(self.recommendations) if self.recommendations else [],
+            'updated_at': self.updated_at.isoformat() if self.updated_at else None
+        }
+
+class ProjectAnalytics(db.Model):
+    """Materialisierte Kennzahlen je Projekt und Dimension"""
+    __tablename__ = 'project_analytics'
+
+    # Bewusst ohne Fremdschlüssel: beim Löschen eines Projekts werden die
+    # Zeilen von refresh_project_analytics entfernt und dabei von den
+    # Portfolio-Summen abgezogen.
+    project_id = db.Column(db.Integer, primary_key=True)
+    dimension = db.Column(db.String(50), primary_key=True)
+    key = db.Column(db.String(200), primary_key=True)
+    subkey = db.Column(db.String(200), primary_key=True, default='')
+    count = db.Column(db.Integer, nullable=False, default=0)
+    total = db.Column(db.Float, nullable=False, default=0)
+
+class AnalyticsTotal(db.Model):
+    """Portfolio-Summen je Dimension, inkrementell aus ProjectAnalytics fortgeschrieben"""
+    __tablename__ = 'analytics_totals'
+
+    dimension = db.Column(db.String(50), primary_key=True)
+    key = db.Column(db.String(200), primary_key=True)
+    subkey = db.Column(db.String(200), primary_key=True, default='')
+    count = db.Column(db.Integer, nullable=False, default=0)
+    total = db.Column(db.Float, nullable=False, default=0)
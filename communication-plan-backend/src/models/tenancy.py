@@ -0,0 +1,16 @@
+from flask import g, has_app_context
+from flask_sqlalchemy.session import Session
+
+class TenantSession(Session):
+    """Session, die Abfragen auf die Datenbank des Mandanten der Anfrage leitet
+
+    Die Engine wird je Anfrage von src.services.tenants in g.tenant_engine
+    abgelegt. Ohne Mandant gilt die Standarddatenbank.
+    """
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if bind is None and has_app_context():
+            engine = g.get('tenant_engine')
+            if engine is not None:
+                return engine
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
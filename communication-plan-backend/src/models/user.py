@@ -1,6 +1,7 @@
 from flask_sqlalchemy import SQLAlchemy
+from src.models.tenancy import TenantSession
 
-db = SQLAlchemy()
+db = SQLAlchemy(session_options={'class_': TenantSession})
 
 class User(db.Model):
     id = db.Column(db.Integer, primary_key=True)
@@ -0,0 +1,12 @@
+from flask import Blueprint, jsonify
+from src.utils.admission import admission_metrics
+
+admission_bp = Blueprint('admission', __name__)
+
+@admission_bp.route('/metrics/admission', methods=['GET'])
+def get_admission_metrics():
+    """Auslastung, Warteschlangentiefe und Abweisungen je Endpunktklasse abrufen"""
+    try:
+        return jsonify(admission_metrics()), 200
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
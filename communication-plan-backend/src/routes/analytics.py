@@ -0,0 +1,17 @@
+from flask import Blueprint, request, jsonify
+from src.services.analytics import portfolio_analytics
+
+analytics_bp = Blueprint('analytics', __name__)
+
+@analytics_bp.route('/analytics/portfolio', methods=['GET'])
+def get_portfolio_analytics():
+    """Portfolio-Kennzahlen über alle Projekte abrufen"""
+    try:
+        source = request.args.get('source')
+        if source not in (None, 'live', 'materialized'):
+            return jsonify({'error': 'source must be live or materialized'}), 400
+
+        materialized = None if source is None else source == 'materialized'
+        return jsonify(portfolio_analytics(materialized)), 200
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
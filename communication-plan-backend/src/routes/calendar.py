@@ -0,0 +1,136 @@
+from flask import Blueprint, Response, request, jsonify, stream_with_context
+from src.models.communication_plan import Project, Stakeholder, CommunicationMatrix
+from src.services.calendar import (
+    expand, project_entries, stakeholder_entries, receiver_timezones, occurrence_to_dict, iter_ics
+)
+from src.services.scheduling import find_slots, entry_attendees, assumed_availability
+from datetime import date, datetime, time, timedelta, timezone
+
+calendar_bp = Blueprint('calendar', __name__)
+
+MAX_RANGE_DAYS = 2 * 366
+MAX_SLOT_SEARCH_DAYS = 62
+
+
+def _date_range():
+    """Liest start/end (ISO-Datum) aus der Anfrage, Standard: die nächsten 90 Tage"""
+    start = date.fromisoformat(request.args['start']) if 'start' in request.args else date.today()
+    end = date.fromisoformat(request.args['end']) if 'end' in request.args else start + timedelta(days=90)
+    if end <= start:
+        raise ValueError('end must be after start')
+    if (end - start).days > MAX_RANGE_DAYS:
+        raise ValueError(f'date range must not exceed {MAX_RANGE_DAYS} days')
+    return start, end
+
+
+def _slot_parameters():
+    """Liest start, days, duration, limit und min_attendees für die Terminsuche"""
+    start = date.fromisoformat(request.args['start']) if 'start' in request.args else date.today()
+    days = int(request.args.get('days', 14))
+    duration = int(request.args.get('duration', 60))
+    limit = int(request.args.get('limit', 10))
+    min_attendees = int(request.args.get('min_attendees', 1))
+    if not 1 <= days <= MAX_SLOT_SEARCH_DAYS:
+        raise ValueError(f'days must be between 1 and {MAX_SLOT_SEARCH_DAYS}')
+    if not 1 <= duration <= 24 * 60:
+        raise ValueError('duration must be between 1 and 1440 minutes')
+    if not 1 <= limit <= 100:
+        raise ValueError('limit must be between 1 and 100')
+    if min_attendees < 1:
+        raise ValueError('min_attendees must be at least 1')
+    return start, days, timedelta(minutes=duration), limit, min_attendees
+
+
+def _calendar_json(entries, project_id, start, end):
+    occurrences, unscheduled = expand(entries, receiver_timezones(project_id), start, end)
+    return jsonify({
+        'start': start.isoformat(),
+        'end': end.isoformat(),
+        'occurrences': [occurrence_to_dict(occurrence) for occurrence in occurrences],
+        'unscheduled': [{'matrix_id': entry.id, 'when_frequency': entry.when_frequency} for entry in unscheduled]
+    }), 200
+
+
+def _calendar_ics(entries, project_id, start, end, name):
+    occurrences, _ = expand(entries, receiver_timezones(project_id), start, end)
+    response = Response(stream_with_context(iter_ics(occurrences, name)), mimetype='text/calendar')
+    response.headers['Content-Disposition'] = f'attachment; filename="{name.replace(" ", "_")}.ics"'
+    return response
+
+
+@calendar_bp.route('/projects/<int:project_id>/calendar', methods=['GET'])
+def get_project_calendar(project_id):
+    """Konkrete Kommunikationstermine eines Projekts abrufen"""
+    try:
+        start, end = _date_range()
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    try:
+        Project.query.get_or_404(project_id)
+        return _calendar_json(project_entries(project_id), project_id, start, end)
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@calendar_bp.route('/projects/<int:project_id>/calendar.ics', methods=['GET'])
+def get_project_calendar_ics(project_id):
+    """Kommunikationstermine eines Projekts als iCalendar-Feed"""
+    try:
+        start, end = _date_range()
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    try:
+        project = Project.query.get_or_404(project_id)
+        return _calendar_ics(project_entries(project_id), project_id, start, end, f'Kommunikationsplan {project.name}')
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@calendar_bp.route('/stakeholders/<int:stakeholder_id>/calendar', methods=['GET'])
+def get_stakeholder_calendar(stakeholder_id):
+    """Kommunikationstermine eines Stakeholders abrufen"""
+    try:
+        start, end = _date_range()
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    try:
+        stakeholder = Stakeholder.query.get_or_404(stakeholder_id)
+        return _calendar_json(stakeholder_entries(stakeholder), stakeholder.project_id, start, end)
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@calendar_bp.route('/stakeholders/<int:stakeholder_id>/calendar.ics', methods=['GET'])
+def get_stakeholder_calendar_ics(stakeholder_id):
+    """Kommunikationstermine eines Stakeholders als iCalendar-Feed"""
+    try:
+        start, end = _date_range()
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    try:
+        stakeholder = Stakeholder.query.get_or_404(stakeholder_id)
+        return _calendar_ics(stakeholder_entries(stakeholder), stakeholder.project_id, start, end, f'Kommunikation {stakeholder.name}')
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@calendar_bp.route('/matrix/<int:entry_id>/meeting-slots', methods=['GET'])
+def get_meeting_slots(entry_id):
+    """Gemeinsame Zeitfenster der Empfänger eines Matrixeintrags finden"""
+    try:
+        start, days, duration, limit, min_attendees = _slot_parameters()
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    try:
+        CommunicationMatrix.query.get_or_404(entry_id)
+        include_sender = request.args.get('include_sender', '').lower() in ('1', 'true', 'yes')
+        attendees = entry_attendees(entry_id, include_sender=include_sender)
+        range_start = datetime.combine(start, time(0), timezone.utc)
+        range_end = range_start + timedelta(days=days)
+
+        return jsonify({
+            'start': range_start.isoformat().replace('+00:00', 'Z'),
+            'end': range_end.isoformat().replace('+00:00', 'Z'),
+            'duration_minutes': int(duration.total_seconds() // 60),
+            'attendee_count': len(attendees),
+            'assumed_availability': assumed_availability(attendees),
+            'slots': find_slots(attendees, range_start, range_end, duration, limit, min_attendees),
+        }), 200
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
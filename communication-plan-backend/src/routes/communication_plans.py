@@ -1,5 +1,14 @@
 from flask import Blueprint, request, jsonify
+from sqlalchemy import insert, select
 from src.models.communication_plan import db, CommunicationPlan, CommunicationMatrix
+from src.models.rows import communication_plan_rows, matrix_rows
+from src.services.concurrency import conditional_update, VersionConflict
+from src.services.matrix_links import coverage_report, relink_entries
+from src.services.matrix_generator import generate_matrix, DEFAULT_SENDER
+from src.services.project_summaries import refresh_project_summaries
+from src.utils.conditional import expected_versions, with_etag, version_conflict
+from src.utils.streaming import stream_json
+from src.utils.admission import admission_controlled
 import json
 
 communication_plans_bp = Blueprint('communication_plans', __name__)
@@ -18,7 +27,7 @@ def get_communication_plan(project_id):
         matrix_entries = CommunicationMatrix.query.filter_by(communication_plan_id=communication_plan.id).all()
         result['matrix'] = [entry.to_dict() for entry in matrix_entries]
         
-        return jsonify(result), 200
+        return with_etag(jsonify(result), communication_plan.version), 200
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -60,33 +69,36 @@ def create_communication_plan(project_id):
 
 @communication_plans_bp.route('/projects/<int:project_id>/communication-plan', methods=['PUT'])
 def update_communication_plan(project_id):
-    """Kommunikationsplan aktualisieren"""
+    """Kommunikationsplan aktualisieren (mit If-Match nur, wenn die Version noch passt)"""
     try:
-        communication_plan = CommunicationPlan.query.filter_by(project_id=project_id).first()
-        if not communication_plan:
-            return jsonify({'error': 'Communication plan not found'}), 404
-        
         data = request.get_json()
-        
-        communication_plan.company_guidelines = data.get('company_guidelines', communication_plan.company_guidelines)
-        communication_plan.documentation_standards = data.get('documentation_standards', communication_plan.documentation_standards)
-        communication_plan.compliance_requirements = data.get('compliance_requirements', communication_plan.compliance_requirements)
-        communication_plan.confidentiality_requirements = data.get('confidentiality_requirements', communication_plan.confidentiality_requirements)
-        communication_plan.language_considerations = data.get('language_considerations', communication_plan.language_considerations)
-        communication_plan.cultural_considerations = data.get('cultural_considerations', communication_plan.cultural_considerations)
-        communication_plan.communication_budget = data.get('communication_budget', communication_plan.communication_budget)
-        communication_plan.budget_breakdown = data.get('budget_breakdown', communication_plan.budget_breakdown)
-        communication_plan.feedback_mechanisms = data.get('feedback_mechanisms', communication_plan.feedback_mechanisms)
-        communication_plan.update_procedures = data.get('update_procedures', communication_plan.update_procedures)
-        communication_plan.effectiveness_metrics = data.get('effectiveness_metrics', communication_plan.effectiveness_metrics)
-        
-        if 'available_technologies' in data:
-            communication_plan.available_technologies = json.dumps(data['available_technologies'])
-        if 'information_types' in data:
-            communication_plan.information_types = json.dumps(data['information_types'])
-        
+        values = {
+            field: data[field]
+            for field in (
+                'company_guidelines', 'documentation_standards', 'compliance_requirements',
+                'confidentiality_requirements', 'language_considerations', 'cultural_considerations',
+                'communication_budget', 'budget_breakdown', 'feedback_mechanisms', 'update_procedures',
+                'effectiveness_metrics',
+            )
+            if field in data
+        }
+        for field in ('available_technologies', 'information_types'):
+            if field in data:
+                values[field] = json.dumps(data[field])
+
+        connection = db.session.connection()
+        communication_plan = conditional_update(
+            connection, CommunicationPlan, [CommunicationPlan.project_id == project_id], values,
+            communication_plan_rows, expected_versions(),
+        )
+        if communication_plan is None:
+            return jsonify({'error': 'Communication plan not found'}), 404
+        refresh_project_summaries(connection, [project_id])
         db.session.commit()
-        return jsonify(communication_plan.to_dict()), 200
+        return with_etag(jsonify(communication_plan), communication_plan['version']), 200
+    except VersionConflict as conflict:
+        db.session.rollback()
+        return version_conflict(conflict)
     except Exception as e:
         db.session.rollback()
         return jsonify({'error': str(e)}), 500
@@ -97,8 +109,15 @@ def update_communication_plan(project_id):
 def get_communication_matrix(plan_id):
     """Kommunikationsmatrix abrufen"""
     try:
-        matrix_entries = CommunicationMatrix.query.filter_by(communication_plan_id=plan_id).all()
-        return jsonify([entry.to_dict() for entry in matrix_entries]), 200
+        return stream_json(matrix_rows.iter_rows(CommunicationMatrix.communication_plan_id == plan_id))
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@communication_plans_bp.route('/projects/<int:project_id>/coverage', methods=['GET'])
+def get_coverage(project_id):
+    """Kommunikationsabdeckung und -last je Stakeholder abrufen"""
+    try:
+        return jsonify(coverage_report(project_id)), 200
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -132,24 +151,35 @@ def create_matrix_entry(plan_id):
 
 @communication_plans_bp.route('/matrix/<int:entry_id>', methods=['PUT'])
 def update_matrix_entry(entry_id):
-    """Eintrag in der Kommunikationsmatrix aktualisieren"""
+    """Eintrag in der Kommunikationsmatrix aktualisieren (mit If-Match nur, wenn die Version noch passt)"""
     try:
-        matrix_entry = CommunicationMatrix.query.get_or_404(entry_id)
         data = request.get_json()
-        
-        matrix_entry.who_sender = data.get('who_sender', matrix_entry.who_sender)
-        matrix_entry.who_receiver = data.get('who_receiver', matrix_entry.who_receiver)
-        matrix_entry.what_content = data.get('what_content', matrix_entry.what_content)
-        matrix_entry.when_frequency = data.get('when_frequency', matrix_entry.when_frequency)
-        matrix_entry.when_timing = data.get('when_timing', matrix_entry.when_timing)
-        matrix_entry.how_channel = data.get('how_channel', matrix_entry.how_channel)
-        matrix_entry.how_format = data.get('how_format', matrix_entry.how_format)
-        matrix_entry.why_purpose = data.get('why_purpose', matrix_entry.why_purpose)
-        matrix_entry.priority = data.get('priority', matrix_entry.priority)
-        matrix_entry.confirmation_required = data.get('confirmation_required', matrix_entry.confirmation_required)
-        
+        values = {
+            field: data[field]
+            for field in (
+                'who_sender', 'who_receiver', 'what_content', 'when_frequency', 'when_timing',
+                'how_channel', 'how_format', 'why_purpose', 'priority', 'confirmation_required',
+            )
+            if field in data
+        }
+
+        connection = db.session.connection()
+        matrix_entry = conditional_update(
+            connection, CommunicationMatrix, [CommunicationMatrix.id == entry_id], values,
+            matrix_rows, expected_versions(),
+        )
+        if matrix_entry is None:
+            return jsonify({'error': 'Matrix entry not found'}), 404
+        relink_entries(connection, entry_ids=[entry_id])
+        project_id = connection.execute(
+            select(CommunicationPlan.project_id).where(CommunicationPlan.id == matrix_entry['communication_plan_id'])
+        ).scalar()
+        refresh_project_summaries(connection, [project_id])
         db.session.commit()
-        return jsonify(matrix_entry.to_dict()), 200
+        return with_etag(jsonify(matrix_entry), matrix_entry['version']), 200
+    except VersionConflict as conflict:
+        db.session.rollback()
+        return version_conflict(conflict)
     except Exception as e:
         db.session.rollback()
         return jsonify({'error': str(e)}), 500
@@ -167,6 +197,7 @@ def delete_matrix_entry(entry_id):
         return jsonify({'error': str(e)}), 500
 
 @communication_plans_bp.route('/communication-plans/<int:plan_id>/matrix/bulk', methods=['POST'])
+@admission_controlled('bulk')
 def create_bulk_matrix_entries(plan_id):
     """Mehrere Einträge in der Kommunikationsmatrix gleichzeitig erstellen"""
     try:
@@ -200,3 +231,33 @@ def create_bulk_matrix_entries(plan_id):
         db.session.rollback()
         return jsonify({'error': str(e)}), 500
 
+
+@communication_plans_bp.route('/communication-plans/<int:plan_id>/matrix/generate', methods=['POST'])
+@admission_controlled('bulk')
+def generate_matrix_entries(plan_id):
+    """Kommunikationsmatrix aus den Stakeholder-Präferenzen ableiten (optional als Probelauf)"""
+    try:
+        communication_plan = CommunicationPlan.query.get_or_404(plan_id)
+        data = request.get_json(silent=True) or {}
+        dry_run = data.get('dry_run', request.args.get('dry_run') in ('1', 'true'))
+
+        entries, skipped, existing = generate_matrix(communication_plan, data.get('sender') or DEFAULT_SENDER)
+        if dry_run:
+            return jsonify({'dry_run': True, 'entries': entries, 'skipped': skipped, 'existing': existing}), 200
+
+        if entries:
+            # Ein Bulk-Insert statt einzelner ORM-Objekte; Verknüpfungen und
+            # Zusammenfassungen werden daher explizit nachgezogen
+            db.session.execute(insert(CommunicationMatrix), entries)
+            connection = db.session.connection()
+            relink_entries(connection, project_ids=[communication_plan.project_id])
+            refresh_project_summaries(connection, [communication_plan.project_id])
+        db.session.commit()
+
+        return jsonify({
+            'dry_run': False, 'created': len(entries), 'existing': existing,
+            'entries': entries, 'skipped': skipped,
+        }), 201
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 500
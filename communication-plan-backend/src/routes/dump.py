@@ -0,0 +1,44 @@
+from flask import Blueprint, request, jsonify
+from src.models.user import db
+from src.services.dump import iter_dump, restore_dump, DumpFormatError
+from src.utils.streaming import stream_chunks
+from src.utils.admission import admission_controlled
+from datetime import datetime
+
+dump_bp = Blueprint('dump', __name__)
+
+@dump_bp.route('/dump', methods=['GET'])
+@admission_controlled('dump')
+def get_dump():
+    """Alle Tabellen als NDJSON aus einem konsistenten Stand streamen"""
+    try:
+        chunks = iter_dump(db.session.get_bind())
+        # Kopfzeile noch im View erzeugen, damit Fehler beim Snapshot hier landen
+        head = next(chunks)
+
+        def body():
+            yield head.encode('utf-8')
+            for chunk in chunks:
+                yield chunk.encode('utf-8')
+
+        response = stream_chunks(body(), 'application/x-ndjson')
+        filename = f"dump_{datetime.utcnow().strftime('%Y%m%d_%H%M%S')}.ndjson"
+        response.headers['Content-Disposition'] = f'attachment; filename="{filename}"'
+        return response
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@dump_bp.route('/restore', methods=['POST'])
+@admission_controlled('dump')
+def post_restore():
+    """NDJSON-Dump aus dem Anfragetext importieren; Ids werden hinter die vorhandenen Daten gelegt"""
+    try:
+        result = restore_dump(db.session.connection(), request.stream)
+        db.session.commit()
+        return jsonify(result), 200
+    except DumpFormatError as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 500
@@ -6,8 +6,12 @@ from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, Tabl
 from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
 from reportlab.lib.units import inch
 from reportlab.lib import colors
-from openpyxl import Workbook
-from openpyxl.styles import Font, PatternFill, Alignment
+from src.services.validation import validate_projects
+from src.services.excel import write_project_workbook, import_project_workbook, WorkbookImportError
+from src.services.matrix_links import relink_entries
+from src.services.project_summaries import refresh_project_summaries
+from src.utils.streaming import stream_json
+from src.utils.admission import admission_controlled
 import io
 import os
 import tempfile
@@ -16,6 +20,7 @@ from datetime import datetime
 export_bp = Blueprint('export', __name__)
 
 @export_bp.route('/projects/<int:project_id>/export/pdf', methods=['GET'])
+@admission_controlled('export')
 def export_project_pdf(project_id):
     """Exportiert einen Kommunikationsplan als PDF"""
     try:
@@ -180,100 +185,17 @@ def export_project_pdf(project_id):
         return jsonify({'error': str(e)}), 500
 
 @export_bp.route('/projects/<int:project_id>/export/excel', methods=['GET'])
+@admission_controlled('export')
 def export_project_excel(project_id):
     """Exportiert einen Kommunikationsplan als Excel-Datei"""
     try:
         project = Project.query.get_or_404(project_id)
-        stakeholders = Stakeholder.query.filter_by(project_id=project_id).all()
         communication_plan = CommunicationPlan.query.filter_by(project_id=project_id).first()
         
-        # Excel-Workbook erstellen
-        wb = Workbook()
-        
-        # Projektinformationen-Sheet
-        ws_project = wb.active
-        ws_project.title = "Projektinformationen"
-        
-        # Header-Style
-        header_font = Font(bold=True, color="FFFFFF")
-        header_fill = PatternFill(start_color="366092", end_color="366092", fill_type="solid")
-        
-        # Projektinformationen
-        ws_project['A1'] = "Projektname"
-        ws_project['B1'] = project.name
-        ws_project['A2'] = "Beschreibung"
-        ws_project['B2'] = project.description or 'Nicht angegeben'
-        ws_project['A3'] = "Erstellt am"
-        ws_project['B3'] = project.created_at.strftime('%d.%m.%Y')
-        ws_project['A4'] = "Zuletzt aktualisiert"
-        ws_project['B4'] = project.updated_at.strftime('%d.%m.%Y')
-        
-        if project.goals:
-            ws_project['A5'] = "Projektziele"
-            ws_project['B5'] = project.goals
-        
-        # Spaltenbreite anpassen
-        ws_project.column_dimensions['A'].width = 20
-        ws_project.column_dimensions['B'].width = 50
-        
-        # Stakeholder-Sheet
-        if stakeholders:
-            ws_stakeholders = wb.create_sheet("Stakeholder")
-            
-            # Header
-            headers = ['Name', 'Rolle', 'Abteilung', 'Kontakt', 'Informationsbedürfnisse', 'Kommunikationskanäle']
-            for col, header in enumerate(headers, 1):
-                cell = ws_stakeholders.cell(row=1, column=col, value=header)
-                cell.font = header_font
-                cell.fill = header_fill
-                cell.alignment = Alignment(horizontal="center")
-            
-            # Daten
-            for row, stakeholder in enumerate(stakeholders, 2):
-                ws_stakeholders.cell(row=row, column=1, value=stakeholder.name)
-                ws_stakeholders.cell(row=row, column=2, value=stakeholder.role)
-                ws_stakeholders.cell(row=row, column=3, value=stakeholder.department or 'Nicht angegeben')
-                ws_stakeholders.cell(row=row, column=4, value=stakeholder.contact_info or 'Nicht angegeben')
-                ws_stakeholders.cell(row=row, column=5, value=', '.join(stakeholder.information_needs) if stakeholder.information_needs else 'Nicht angegeben')
-                ws_stakeholders.cell(row=row, column=6, value=', '.join(stakeholder.communication_channels) if stakeholder.communication_channels else 'Nicht angegeben')
-            
-            # Spaltenbreite anpassen
-            for col in range(1, 7):
-                ws_stakeholders.column_dimensions[chr(64 + col)].width = 20
-        
-        # Kommunikationsmatrix-Sheet
-        if communication_plan:
-            matrix_entries = CommunicationMatrix.query.filter_by(communication_plan_id=communication_plan.id).all()
-            if matrix_entries:
-                ws_matrix = wb.create_sheet("Kommunikationsmatrix")
-                
-                # Header
-                headers = ['Stakeholder', 'Informationstyp', 'Kommunikationsmethode', 'Frequenz', 'Verantwortliche Person', 'Format', 'Verteilerliste']
-                for col, header in enumerate(headers, 1):
-                    cell = ws_matrix.cell(row=1, column=col, value=header)
-                    cell.font = header_font
-                    cell.fill = header_fill
-                    cell.alignment = Alignment(horizontal="center")
-                
-                # Daten
-                for row, entry in enumerate(matrix_entries, 2):
-                    stakeholder = Stakeholder.query.get(entry.stakeholder_id)
-                    ws_matrix.cell(row=row, column=1, value=stakeholder.name if stakeholder else 'Unbekannt')
-                    ws_matrix.cell(row=row, column=2, value=entry.information_type or 'Nicht angegeben')
-                    ws_matrix.cell(row=row, column=3, value=entry.communication_method or 'Nicht angegeben')
-                    ws_matrix.cell(row=row, column=4, value=entry.frequency or 'Nicht angegeben')
-                    ws_matrix.cell(row=row, column=5, value=entry.responsible_person or 'Nicht angegeben')
-                    ws_matrix.cell(row=row, column=6, value=entry.format or 'Nicht angegeben')
-                    ws_matrix.cell(row=row, column=7, value=entry.distribution_list or 'Nicht angegeben')
-                
-                # Spaltenbreite anpassen
-                for col in range(1, 8):
-                    ws_matrix.column_dimensions[chr(64 + col)].width = 18
-        
         # Temporäre Datei erstellen
         temp_file = tempfile.NamedTemporaryFile(delete=False, suffix='.xlsx')
-        wb.save(temp_file.name)
         temp_file.close()
+        write_project_workbook(project, communication_plan, temp_file.name)
         
         return send_file(
             temp_file.name,
@@ -285,104 +207,64 @@ def export_project_excel(project_id):
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+@export_bp.route('/projects/<int:project_id>/import/excel', methods=['POST'])
+@admission_controlled('bulk')
+def import_project_excel(project_id):
+    """Importiert ein bearbeitetes Excel-Export-Workbook (Stakeholder und Matrix)"""
+    upload = request.files.get('file')
+    if upload is None:
+        return jsonify({'error': 'file is required'}), 400
+    delete_missing = request.form.get('delete_missing', '').lower() in ('1', 'true', 'yes')
+    try:
+        Project.query.get_or_404(project_id)
+        plan_id = db.session.execute(
+            db.select(CommunicationPlan.id).where(CommunicationPlan.project_id == project_id)
+        ).scalar()
+
+        connection = db.session.connection()
+        counts = import_project_workbook(connection, project_id, plan_id, upload.stream, delete_missing=delete_missing)
+        relink_entries(connection, project_ids=[project_id])
+        refresh_project_summaries(connection, [project_id])
+        db.session.commit()
+
+        return jsonify(counts), 200
+    except WorkbookImportError as e:
+        db.session.rollback()
+        return jsonify({'error': str(e), 'rows': e.errors}), 400
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 500
+
 @export_bp.route('/projects/<int:project_id>/validate', methods=['GET'])
 def validate_project(project_id):
     """Validiert einen Kommunikationsplan auf Vollständigkeit"""
     try:
-        project = Project.query.get_or_404(project_id)
-        stakeholders = Stakeholder.query.filter_by(project_id=project_id).all()
-        communication_plan = CommunicationPlan.query.filter_by(project_id=project_id).first()
-        
-        validation_results = {
-            'is_valid': True,
-            'warnings': [],
-            'errors': [],
-            'completeness_score': 0,
-            'recommendations': []
-        }
-        
-        total_checks = 0
-        passed_checks = 0
-        
-        # Projekt-Validierung
-        total_checks += 2
-        if not project.name or len(project.name.strip()) < 3:
-            validation_results['errors'].append('Projektname muss mindestens 3 Zeichen lang sein')
-            validation_results['is_valid'] = False
-        else:
-            passed_checks += 1
-            
-        if not project.description or len(project.description.strip()) < 10:
-            validation_results['warnings'].append('Projektbeschreibung sollte aussagekräftiger sein (mindestens 10 Zeichen)')
-        else:
-            passed_checks += 1
-        
-        # Stakeholder-Validierung
-        total_checks += 3
-        if not stakeholders:
-            validation_results['errors'].append('Mindestens ein Stakeholder muss definiert werden')
-            validation_results['is_valid'] = False
-        else:
-            passed_checks += 1
-            
-            # Prüfe Stakeholder-Vollständigkeit
-            incomplete_stakeholders = []
-            for stakeholder in stakeholders:
-                if not stakeholder.role or not stakeholder.name:
-                    incomplete_stakeholders.append(stakeholder.name or 'Unbenannter Stakeholder')
-            
-            if incomplete_stakeholders:
-                validation_results['warnings'].append(f'Unvollständige Stakeholder-Informationen: {", ".join(incomplete_stakeholders)}')
-            else:
-                passed_checks += 1
-            
-            # Prüfe auf wichtige Stakeholder-Rollen
-            roles = [s.role.lower() for s in stakeholders if s.role]
-            important_roles = ['projektleiter', 'sponsor', 'auftraggeber']
-            missing_roles = [role for role in important_roles if not any(role in r for r in roles)]
-            
-            if missing_roles:
-                validation_results['recommendations'].append(f'Wichtige Stakeholder-Rollen fehlen möglicherweise: {", ".join(missing_roles)}')
-            else:
-                passed_checks += 1
-        
-        # Kommunikationsplan-Validierung
-        total_checks += 2
-        if not communication_plan:
-            validation_results['warnings'].append('Kommunikationsplan-Details sind nicht vollständig ausgefüllt')
-        else:
-            if communication_plan.communication_objectives:
-                passed_checks += 1
-            else:
-                validation_results['warnings'].append('Kommunikationsziele sollten definiert werden')
-                
-            if communication_plan.communication_strategy:
-                passed_checks += 1
-            else:
-                validation_results['warnings'].append('Kommunikationsstrategie sollte definiert werden')
-        
-        # Kommunikationsmatrix-Validierung
-        total_checks += 1
-        if communication_plan:
-            matrix_entries = CommunicationMatrix.query.filter_by(communication_plan_id=communication_plan.id).all()
-            if not matrix_entries:
-                validation_results['warnings'].append('Kommunikationsmatrix ist leer - definieren Sie Kommunikationsregeln')
-            else:
-                passed_checks += 1
-        
-        # Vollständigkeits-Score berechnen
-        validation_results['completeness_score'] = round((passed_checks / total_checks) * 100, 1)
-        
-        # Empfehlungen basierend auf Score
-        if validation_results['completeness_score'] < 60:
-            validation_results['recommendations'].append('Der Kommunikationsplan benötigt noch wesentliche Ergänzungen')
-        elif validation_results['completeness_score'] < 80:
-            validation_results['recommendations'].append('Der Kommunikationsplan ist grundlegend vollständig, könnte aber noch verbessert werden')
-        else:
-            validation_results['recommendations'].append('Der Kommunikationsplan ist gut strukturiert und vollständig')
-        
+        results = validate_projects([project_id])
+        if project_id not in results:
+            return jsonify({'error': 'Project not found'}), 404
+
+        validation_results = results[project_id]
+        del validation_results['project_id']
         return jsonify(validation_results)
         
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+@export_bp.route('/validate', methods=['GET'])
+@admission_controlled('export')
+def validate_portfolio():
+    """Validiert mehrere oder alle Projekte mit einer festen Anzahl von Queries"""
+    try:
+        project_ids = None
+        raw_ids = ','.join(request.args.getlist('project_ids'))
+        if raw_ids:
+            try:
+                project_ids = [int(value) for value in raw_ids.split(',') if value.strip()]
+            except ValueError:
+                return jsonify({'error': 'project_ids must be a comma-separated list of integers'}), 400
+
+        results = validate_projects(project_ids)
+        return stream_json(results.values())
+        
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
@@ -1,15 +1,45 @@
 from flask import Blueprint, request, jsonify
+from sqlalchemy import delete
 from src.models.communication_plan import db, Project, Stakeholder, CommunicationPlan
+from src.models.summaries import ProjectValidation
+from src.models.rows import project_rows, project_list_rows, stakeholder_rows, matrix_rows
+from src.services.cloning import clone_project
+from src.services.concurrency import conditional_update, VersionConflict
+from src.services.project_summaries import refresh_project_summaries
+from src.utils.conditional import expected_versions, with_etag, version_conflict
+from src.utils.streaming import stream_json
+from src.utils.admission import admission_controlled
 import json
 
 projects_bp = Blueprint('projects', __name__)
 
 @projects_bp.route('/projects', methods=['GET'])
 def get_projects():
-    """Alle Projekte abrufen"""
+    """Alle Projekte abrufen, optional nach Vollständigkeit gefiltert und sortiert"""
     try:
-        projects = Project.query.all()
-        return jsonify([project.to_dict() for project in projects]), 200
+        sort_columns = {
+            'id': Project.id,
+            'name': Project.name,
+            'created_at': Project.created_at,
+            'updated_at': Project.updated_at,
+            'completeness_score': ProjectValidation.completeness_score,
+        }
+        sort = request.args.get('sort', 'id')
+        if sort not in sort_columns:
+            return jsonify({'error': f'Unsupported sort field: {sort}'}), 400
+        order_by = sort_columns[sort]
+        if request.args.get('order') == 'desc':
+            order_by = order_by.desc()
+
+        criteria = []
+        min_score = request.args.get('min_score', type=float)
+        if min_score is not None:
+            criteria.append(ProjectValidation.completeness_score >= min_score)
+        max_score = request.args.get('max_score', type=float)
+        if max_score is not None:
+            criteria.append(ProjectValidation.completeness_score <= max_score)
+
+        return stream_json(project_list_rows.iter_rows(*criteria, order_by=order_by))
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -42,31 +72,35 @@ def get_project(project_id):
     """Einzelnes Projekt abrufen"""
     try:
         project = Project.query.get_or_404(project_id)
-        return jsonify(project.to_dict()), 200
+        return with_etag(jsonify(project.to_dict()), project.version), 200
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
 @projects_bp.route('/projects/<int:project_id>', methods=['PUT'])
 def update_project(project_id):
-    """Projekt aktualisieren"""
+    """Projekt aktualisieren (mit If-Match nur, wenn die Version noch passt)"""
     try:
-        project = Project.query.get_or_404(project_id)
         data = request.get_json()
-        
-        project.name = data.get('name', project.name)
-        project.description = data.get('description', project.description)
-        project.charter = data.get('charter', project.charter)
-        project.goals = data.get('goals', project.goals)
-        
-        if 'phases' in data:
-            project.phases = json.dumps(data['phases'])
-        if 'milestones' in data:
-            project.milestones = json.dumps(data['milestones'])
-            
-        project.risk_management_plan = data.get('risk_management_plan', project.risk_management_plan)
-        
+        values = {
+            field: data[field]
+            for field in ('name', 'description', 'charter', 'goals', 'risk_management_plan') if field in data
+        }
+        for field in ('phases', 'milestones'):
+            if field in data:
+                values[field] = json.dumps(data[field])
+
+        connection = db.session.connection()
+        project = conditional_update(
+            connection, Project, [Project.id == project_id], values, project_rows, expected_versions()
+        )
+        if project is None:
+            return jsonify({'error': 'Project not found'}), 404
+        refresh_project_summaries(connection, [project_id])
         db.session.commit()
-        return jsonify(project.to_dict()), 200
+        return with_etag(jsonify(project), project['version']), 200
+    except VersionConflict as conflict:
+        db.session.rollback()
+        return version_conflict(conflict)
     except Exception as e:
         db.session.rollback()
         return jsonify({'error': str(e)}), 500
@@ -83,6 +117,57 @@ def delete_project(project_id):
         db.session.rollback()
         return jsonify({'error': str(e)}), 500
 
+@projects_bp.route('/projects/bulk-delete', methods=['POST'])
+@admission_controlled('bulk')
+def bulk_delete_projects():
+    """Mehrere Projekte löschen; abhängige Daten entfernt die Datenbank per Kaskade"""
+    try:
+        data = request.get_json(silent=True) or {}
+        project_ids = data.get('project_ids')
+        # bool ist eine Unterklasse von int, true/false sind aber keine Ids
+        if not isinstance(project_ids, list) or not all(
+            isinstance(value, int) and not isinstance(value, bool) for value in project_ids
+        ):
+            return jsonify({'error': 'project_ids must be a list of integers'}), 400
+
+        connection = db.session.connection()
+        deleted = 0
+        for start in range(0, len(project_ids), 500):
+            chunk = project_ids[start:start + 500]
+            deleted += connection.execute(delete(Project).where(Project.id.in_(chunk))).rowcount
+            refresh_project_summaries(connection, chunk)
+        db.session.commit()
+
+        return jsonify({'deleted': deleted}), 200
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 500
+
+@projects_bp.route('/projects/<int:project_id>/clone', methods=['POST'])
+@admission_controlled('bulk')
+def clone_project_route(project_id):
+    """Projekt als Vorlage vollständig in der Datenbank kopieren"""
+    try:
+        Project.query.get_or_404(project_id)
+        data = request.get_json(silent=True) or {}
+
+        connection = db.session.connection()
+        new_project_id = clone_project(
+            connection,
+            project_id,
+            name=data.get('name'),
+            include_stakeholders=data.get('include_stakeholders', True),
+            include_plan=data.get('include_communication_plan', True),
+            include_matrix=data.get('include_matrix', True),
+        )
+        refresh_project_summaries(connection, [new_project_id])
+        db.session.commit()
+
+        return jsonify(db.session.get(Project, new_project_id).to_dict()), 201
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 500
+
 @projects_bp.route('/projects/<int:project_id>/complete', methods=['GET'])
 def get_complete_project(project_id):
     """Vollständige Projektdaten mit Stakeholdern und Kommunikationsplan abrufen"""
@@ -92,8 +177,7 @@ def get_complete_project(project_id):
         result = project.to_dict()
         
         # Stakeholder hinzufügen
-        stakeholders = Stakeholder.query.filter_by(project_id=project_id).all()
-        result['stakeholders'] = [stakeholder.to_dict() for stakeholder in stakeholders]
+        result['stakeholders'] = list(stakeholder_rows.iter_rows(Stakeholder.project_id == project_id))
         
         # Kommunikationsplan hinzufügen
         communication_plan = CommunicationPlan.query.filter_by(project_id=project_id).first()
@@ -102,8 +186,9 @@ def get_complete_project(project_id):
             
             # Kommunikationsmatrix hinzufügen
             from src.models.communication_plan import CommunicationMatrix
-            matrix_entries = CommunicationMatrix.query.filter_by(communication_plan_id=communication_plan.id).all()
-            result['communication_plan']['matrix'] = [entry.to_dict() for entry in matrix_entries]
+            result['communication_plan']['matrix'] = list(matrix_rows.iter_rows(
+                CommunicationMatrix.communication_plan_id == communication_plan.id
+            ))
         
         return jsonify(result), 200
     except Exception as e:
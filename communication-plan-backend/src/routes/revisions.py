@@ -0,0 +1,64 @@
+from flask import Blueprint, request, jsonify
+from src.models.user import db
+from src.models.communication_plan import Project
+from src.services.revisions import (
+    list_revisions, record_revision, reconstruct_revision, project_snapshot, describe_diff
+)
+
+revisions_bp = Blueprint('revisions', __name__)
+
+@revisions_bp.route('/projects/<int:project_id>/revisions', methods=['GET'])
+def get_revisions(project_id):
+    """Alle Revisionen eines Projekts abrufen"""
+    try:
+        Project.query.get_or_404(project_id)
+        return jsonify(list_revisions(project_id)), 200
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@revisions_bp.route('/projects/<int:project_id>/revisions', methods=['POST'])
+def create_revision(project_id):
+    """Aktuellen Stand eines Projekts als Revision festhalten (z.B. bei Freigabe)"""
+    try:
+        Project.query.get_or_404(project_id)
+        data = request.get_json(silent=True) or {}
+
+        revision, created = record_revision(project_id, label=data.get('label'))
+        db.session.commit()
+
+        return jsonify(revision.to_dict()), 201 if created else 200
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 500
+
+@revisions_bp.route('/projects/<int:project_id>/revisions/<int:number>', methods=['GET'])
+def get_revision(project_id, number):
+    """Stand eines Projekts zu einer Revision rekonstruieren"""
+    try:
+        state = reconstruct_revision(project_id, number)
+        if state is None:
+            return jsonify({'error': 'Revision not found'}), 404
+        return jsonify({'number': number, **state}), 200
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@revisions_bp.route('/projects/<int:project_id>/revisions/diff', methods=['GET'])
+def diff_revisions(project_id):
+    """Strukturelle Differenz zweier Revisionen (ohne 'to': gegenüber dem aktuellen Stand)"""
+    source = request.args.get('from', type=int)
+    target = request.args.get('to', type=int)
+    if source is None:
+        return jsonify({'error': 'from must be a revision number'}), 400
+    try:
+        old = reconstruct_revision(project_id, source)
+        new = reconstruct_revision(project_id, target) if target is not None else project_snapshot(project_id)
+        if old is None or new is None:
+            return jsonify({'error': 'Revision not found'}), 404
+
+        return jsonify({
+            'from': source,
+            'to': target if target is not None else 'current',
+            'changes': describe_diff(old, new),
+        }), 200
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
@@ -1,5 +1,16 @@
 from flask import Blueprint, request, jsonify
-from src.models.communication_plan import db, Stakeholder
+from sqlalchemy import delete, update
+from src.models.communication_plan import db, Project, Stakeholder, CommunicationMatrix
+from src.models.rows import stakeholder_rows, matrix_rows
+from src.services.matrix_links import stakeholder_entry_ids, relink_entries
+from src.services.project_summaries import refresh_project_summaries
+from src.services.duplicates import (
+    identity_key, find_by_identity, upsert_stakeholders, find_duplicates, DEFAULT_THRESHOLD, STAKEHOLDER_FIELDS
+)
+from src.services.concurrency import conditional_update, VersionConflict
+from src.utils.conditional import expected_versions, with_etag, version_conflict
+from src.utils.streaming import stream_json
+from src.utils.admission import admission_controlled
 import json
 
 stakeholders_bp = Blueprint('stakeholders', __name__)
@@ -8,8 +19,7 @@ stakeholders_bp = Blueprint('stakeholders', __name__)
 def get_stakeholders(project_id):
     """Alle Stakeholder eines Projekts abrufen"""
     try:
-        stakeholders = Stakeholder.query.filter_by(project_id=project_id).all()
-        return jsonify([stakeholder.to_dict() for stakeholder in stakeholders]), 200
+        return stream_json(stakeholder_rows.iter_rows(Stakeholder.project_id == project_id))
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -18,6 +28,10 @@ def create_stakeholder(project_id):
     """Neuen Stakeholder erstellen"""
     try:
         data = request.get_json()
+
+        existing_id = find_by_identity(project_id, identity_key(data.get('name'), data.get('contact_info')))
+        if existing_id is not None:
+            return jsonify({'error': 'Stakeholder already exists', 'stakeholder_id': existing_id}), 409
         
         stakeholder = Stakeholder(
             project_id=project_id,
@@ -48,37 +62,56 @@ def get_stakeholder(stakeholder_id):
     """Einzelnen Stakeholder abrufen"""
     try:
         stakeholder = Stakeholder.query.get_or_404(stakeholder_id)
-        return jsonify(stakeholder.to_dict()), 200
+        return with_etag(jsonify(stakeholder.to_dict()), stakeholder.version), 200
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@stakeholders_bp.route('/stakeholders/<int:stakeholder_id>/communications', methods=['GET'])
+def get_stakeholder_communications(stakeholder_id):
+    """Matrixeinträge abrufen, die ein Stakeholder sendet oder empfängt"""
+    try:
+        role = request.args.get('role')
+        if role not in (None, 'sender', 'receiver'):
+            return jsonify({'error': 'role must be sender or receiver'}), 400
+
+        entry_ids = stakeholder_entry_ids(stakeholder_id, role)
+        return stream_json(matrix_rows.iter_rows(CommunicationMatrix.id.in_(entry_ids)))
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
 @stakeholders_bp.route('/stakeholders/<int:stakeholder_id>', methods=['PUT'])
 def update_stakeholder(stakeholder_id):
-    """Stakeholder aktualisieren"""
+    """Stakeholder aktualisieren (mit If-Match nur, wenn die Version noch passt)"""
     try:
-        stakeholder = Stakeholder.query.get_or_404(stakeholder_id)
         data = request.get_json()
-        
-        stakeholder.name = data.get('name', stakeholder.name)
-        stakeholder.role = data.get('role', stakeholder.role)
-        stakeholder.department = data.get('department', stakeholder.department)
-        stakeholder.contact_info = data.get('contact_info', stakeholder.contact_info)
-        
-        if 'information_needs' in data:
-            stakeholder.information_needs = json.dumps(data['information_needs'])
-        if 'preferred_channels' in data:
-            stakeholder.preferred_channels = json.dumps(data['preferred_channels'])
-        if 'preferred_formats' in data:
-            stakeholder.preferred_formats = json.dumps(data['preferred_formats'])
-            
-        stakeholder.communication_frequency = data.get('communication_frequency', stakeholder.communication_frequency)
-        stakeholder.escalation_path = data.get('escalation_path', stakeholder.escalation_path)
-        stakeholder.decision_authority = data.get('decision_authority', stakeholder.decision_authority)
-        stakeholder.timezone = data.get('timezone', stakeholder.timezone)
-        stakeholder.availability = data.get('availability', stakeholder.availability)
-        
+        values = {field: data[field] for field in STAKEHOLDER_FIELDS if field in data}
+        for field in ('information_needs', 'preferred_channels', 'preferred_formats'):
+            if field in data:
+                values[field] = json.dumps(data[field])
+
+        connection = db.session.connection()
+        stakeholder = conditional_update(
+            connection, Stakeholder, [Stakeholder.id == stakeholder_id], values, stakeholder_rows, expected_versions()
+        )
+        if stakeholder is None:
+            return jsonify({'error': 'Stakeholder not found'}), 404
+
+        # Identitätsschlüssel aus der geschriebenen Zeile nachziehen
+        if 'name' in values or 'contact_info' in values:
+            key = identity_key(stakeholder['name'], stakeholder['contact_info'])
+            existing_id = find_by_identity(stakeholder['project_id'], key, exclude_id=stakeholder_id)
+            if existing_id is not None:
+                db.session.rollback()
+                return jsonify({'error': 'Stakeholder already exists', 'stakeholder_id': existing_id}), 409
+            connection.execute(update(Stakeholder).where(Stakeholder.id == stakeholder_id).values(identity_key=key))
+
+        relink_entries(connection, project_ids=[stakeholder['project_id']])
+        refresh_project_summaries(connection, [stakeholder['project_id']])
         db.session.commit()
-        return jsonify(stakeholder.to_dict()), 200
+        return with_etag(jsonify(stakeholder), stakeholder['version']), 200
+    except VersionConflict as conflict:
+        db.session.rollback()
+        return version_conflict(conflict)
     except Exception as e:
         db.session.rollback()
         return jsonify({'error': str(e)}), 500
@@ -96,38 +129,92 @@ def delete_stakeholder(stakeholder_id):
         return jsonify({'error': str(e)}), 500
 
 @stakeholders_bp.route('/projects/<int:project_id>/stakeholders/bulk', methods=['POST'])
+@admission_controlled('bulk')
 def create_bulk_stakeholders(project_id):
-    """Mehrere Stakeholder gleichzeitig erstellen (z.B. CSV-Import)"""
+    """Mehrere Stakeholder anlegen bzw. über Name und Kontakt vorhandene aktualisieren (z.B. CSV-Import)"""
+    data = request.get_json(silent=True) or {}
+    stakeholders_data = data.get('stakeholders', [])
+    if not isinstance(stakeholders_data, list) or not all(isinstance(item, dict) for item in stakeholders_data):
+        return jsonify({'error': 'stakeholders must be a list of objects'}), 400
+    missing = [index for index, item in enumerate(stakeholders_data) if not (item.get('name') or '').strip()]
+    if missing:
+        return jsonify({'error': 'name is required', 'indexes': missing[:100]}), 400
     try:
-        data = request.get_json()
-        stakeholders_data = data.get('stakeholders', [])
-        
-        created_stakeholders = []
-        
+        Project.query.get_or_404(project_id)
+        records = []
         for stakeholder_data in stakeholders_data:
-            stakeholder = Stakeholder(
-                project_id=project_id,
-                name=stakeholder_data.get('name'),
-                role=stakeholder_data.get('role'),
-                department=stakeholder_data.get('department'),
-                contact_info=stakeholder_data.get('contact_info'),
-                information_needs=json.dumps(stakeholder_data.get('information_needs', [])),
-                preferred_channels=json.dumps(stakeholder_data.get('preferred_channels', [])),
-                preferred_formats=json.dumps(stakeholder_data.get('preferred_formats', [])),
-                communication_frequency=stakeholder_data.get('communication_frequency'),
-                escalation_path=stakeholder_data.get('escalation_path'),
-                decision_authority=stakeholder_data.get('decision_authority'),
-                timezone=stakeholder_data.get('timezone'),
-                availability=stakeholder_data.get('availability')
-            )
-            
-            db.session.add(stakeholder)
-            created_stakeholders.append(stakeholder)
-        
+            record = dict(stakeholder_data)
+            for field in ('information_needs', 'preferred_channels', 'preferred_formats'):
+                if record.get(field) is not None:
+                    record[field] = json.dumps(record[field])
+            records.append(record)
+
+        connection = db.session.connection()
+        stakeholder_ids, created = upsert_stakeholders(connection, project_id, records)
+        relink_entries(connection, project_ids=[project_id])
+        refresh_project_summaries(connection, [project_id])
         db.session.commit()
-        
-        return jsonify([stakeholder.to_dict() for stakeholder in created_stakeholders]), 201
+
+        unique_ids = list(dict.fromkeys(stakeholder_ids))
+        rows = {}
+        for start in range(0, len(unique_ids), 500):
+            rows.update(
+                (row['id'], row) for row in stakeholder_rows.iter_rows(Stakeholder.id.in_(unique_ids[start:start + 500]))
+            )
+        response = jsonify([rows[stakeholder_id] for stakeholder_id in stakeholder_ids])
+        response.headers['X-Created-Count'] = str(created)
+        return response, 201 if created else 200
     except Exception as e:
         db.session.rollback()
         return jsonify({'error': str(e)}), 500
 
+
+@stakeholders_bp.route('/projects/<int:project_id>/stakeholders/duplicates', methods=['GET'])
+def get_duplicate_stakeholders(project_id):
+    """Wahrscheinliche Dubletten unter den Stakeholdern eines Projekts finden"""
+    threshold = request.args.get('threshold', DEFAULT_THRESHOLD, type=float)
+    limit = request.args.get('limit', 100, type=int)
+    if not 0 < threshold <= 1:
+        return jsonify({'error': 'threshold must be between 0 and 1'}), 400
+    if limit < 1:
+        return jsonify({'error': 'limit must be at least 1'}), 400
+    try:
+        Project.query.get_or_404(project_id)
+        return jsonify(find_duplicates(db.session.connection(), project_id, threshold, limit)), 200
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+
+@stakeholders_bp.route('/projects/<int:project_id>/stakeholders/bulk-delete', methods=['POST'])
+@admission_controlled('bulk')
+def bulk_delete_stakeholders(project_id):
+    """Mehrere Stakeholder eines Projekts löschen"""
+    try:
+        data = request.get_json(silent=True) or {}
+        stakeholder_ids = data.get('stakeholder_ids')
+        # bool ist eine Unterklasse von int, true/false sind aber keine Ids
+        if not isinstance(stakeholder_ids, list) or not all(
+            isinstance(value, int) and not isinstance(value, bool) for value in stakeholder_ids
+        ):
+            return jsonify({'error': 'stakeholder_ids must be a list of integers'}), 400
+
+        connection = db.session.connection()
+        deleted = 0
+        for start in range(0, len(stakeholder_ids), 500):
+            deleted += connection.execute(
+                delete(Stakeholder).where(
+                    Stakeholder.project_id == project_id,
+                    Stakeholder.id.in_(stakeholder_ids[start:start + 500]),
+                )
+            ).rowcount
+        # Verknüpfungen der gelöschten Stakeholder entfernt die Kaskade; Namen
+        # können nun auf andere Stakeholder (z.B. über die Rolle) auflösen
+        if deleted:
+            relink_entries(connection, project_ids=[project_id])
+            refresh_project_summaries(connection, [project_id])
+        db.session.commit()
+
+        return jsonify({'deleted': deleted}), 200
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 500
@@ -0,0 +1,213 @@
+from flask import current_app, has_app_context
+from sqlalchemy import select, func, literal, cast, delete, insert, update
+from sqlalchemy.dialects.postgresql import JSONB
+from src.models.user import db
+from src.models.communication_plan import Project, Stakeholder, CommunicationPlan, CommunicationMatrix
+from src.models.summaries import ProjectAnalytics, AnalyticsTotal
+
+# Jede Rollup-Dimension ist ein GROUP BY über indizierte Spalten und liefert
+# (key, subkey, count, total). Für die materialisierten Tabellen wird dieselbe
+# Query zusätzlich nach project_id gruppiert.
+
+def _channels(dialect_name):
+    """Tabellenfunktion über die JSON-Liste preferred_channels (Spalte value)"""
+    channels = func.coalesce(func.nullif(Stakeholder.preferred_channels, ''), '[]')
+    if dialect_name == 'sqlite':
+        return func.json_each(channels).table_valued('value').alias('channel')
+    # PostgreSQL: die Liste ist als Text gespeichert
+    return func.jsonb_array_elements_text(cast(channels, JSONB)).table_valued('value').render_derived(name='channel')
+
+
+def _rollup_statements(dialect_name):
+    """Alle Rollups als (Dimension, Projektspalte, Select ohne Projektspalte)"""
+    channel = _channels(dialect_name)
+    department = func.coalesce(Stakeholder.department, '')
+
+    yield 'projects', Project.id, select(
+        literal(''), literal(''), func.count(), literal(0.0)
+    ).select_from(Project)
+
+    yield 'stakeholder_department', Stakeholder.project_id, select(
+        department, literal(''), func.count(), literal(0.0)
+    ).group_by(department)
+
+    yield 'stakeholder_channel', Stakeholder.project_id, select(
+        channel.c.value, literal(''), func.count(), literal(0.0)
+    ).select_from(Stakeholder).join(channel, literal(True)).group_by(channel.c.value)
+
+    yield 'stakeholder_department_channel', Stakeholder.project_id, select(
+        department, channel.c.value, func.count(), literal(0.0)
+    ).select_from(Stakeholder).join(channel, literal(True)).group_by(department, channel.c.value)
+
+    for dimension, column in [
+        ('matrix_channel', CommunicationMatrix.how_channel),
+        ('matrix_frequency', CommunicationMatrix.when_frequency),
+        ('matrix_priority', CommunicationMatrix.priority),
+    ]:
+        key = func.coalesce(column, '')
+        yield dimension, CommunicationPlan.project_id, select(
+            key, literal(''), func.count(), literal(0.0)
+        ).select_from(CommunicationMatrix).join(
+            CommunicationPlan, CommunicationPlan.id == CommunicationMatrix.communication_plan_id
+        ).group_by(key)
+
+    confirmation = func.coalesce(CommunicationMatrix.confirmation_required, False)
+    yield 'matrix_confirmation', CommunicationPlan.project_id, select(
+        cast(confirmation, db.String), literal(''), func.count(), literal(0.0)
+    ).select_from(CommunicationMatrix).join(
+        CommunicationPlan, CommunicationPlan.id == CommunicationMatrix.communication_plan_id
+    ).group_by(confirmation)
+
+    yield 'communication_budget', CommunicationPlan.project_id, select(
+        literal(''), literal(''), func.count(CommunicationPlan.communication_budget),
+        func.coalesce(func.sum(CommunicationPlan.communication_budget), 0.0)
+    ).select_from(CommunicationPlan)
+
+
+def materialized_enabled():
+    """Ob die materialisierten Analytics-Tabellen gepflegt werden"""
+    return has_app_context() and current_app.config.get('ANALYTICS_MATERIALIZED', False)
+
+
+def _live_rows(connection):
+    """Rollups direkt über die Basistabellen"""
+    for dimension, _, statement in _rollup_statements(connection.dialect.name):
+        for key, subkey, count, total in connection.execute(statement):
+            yield dimension, key, subkey, count, total
+
+
+def _materialized_rows(connection):
+    """Rollups aus den fortgeschriebenen Portfolio-Summen"""
+    statement = select(
+        AnalyticsTotal.dimension, AnalyticsTotal.key, AnalyticsTotal.subkey,
+        AnalyticsTotal.count, AnalyticsTotal.total,
+    ).where(AnalyticsTotal.count > 0)
+    return connection.execute(statement)
+
+
+def _project_rows(connection, project_ids):
+    """Rollups der angegebenen Projekte, nach Projekt gruppiert"""
+    rows = {}
+    for dimension, project_column, statement in _rollup_statements(connection.dialect.name):
+        statement = statement.add_columns(project_column).where(
+            project_column.in_(project_ids)
+        ).group_by(project_column)
+        for key, subkey, count, total, project_id in connection.execute(statement):
+            rows[(project_id, dimension, key or '', subkey or '')] = (count, total or 0.0)
+    return rows
+
+
+def refresh_project_analytics(connection, project_ids):
+    """Berechnet die Kennzahlen von project_ids neu und schreibt die Summen als Delta fort"""
+    project_ids = list(project_ids)
+    if not project_ids:
+        return
+
+    old_rows = {
+        (row.project_id, row.dimension, row.key, row.subkey): (row.count, row.total)
+        for row in connection.execute(
+            select(ProjectAnalytics).where(ProjectAnalytics.project_id.in_(project_ids))
+        )
+    }
+    new_rows = _project_rows(connection, project_ids)
+
+    deltas = {}
+    for rows, sign in ((old_rows, -1), (new_rows, 1)):
+        for (_, dimension, key, subkey), (count, total) in rows.items():
+            delta = deltas.setdefault((dimension, key, subkey), [0, 0.0])
+            delta[0] += sign * count
+            delta[1] += sign * total
+
+    connection.execute(delete(ProjectAnalytics).where(ProjectAnalytics.project_id.in_(project_ids)))
+    if new_rows:
+        connection.execute(insert(ProjectAnalytics), [
+            {'project_id': project_id, 'dimension': dimension, 'key': key, 'subkey': subkey,
+             'count': count, 'total': total}
+            for (project_id, dimension, key, subkey), (count, total) in new_rows.items()
+        ])
+
+    for (dimension, key, subkey), (count, total) in deltas.items():
+        if not count and not total:
+            continue
+        result = connection.execute(
+            update(AnalyticsTotal)
+            .where(
+                AnalyticsTotal.dimension == dimension,
+                AnalyticsTotal.key == key,
+                AnalyticsTotal.subkey == subkey,
+            )
+            .values(count=AnalyticsTotal.count + count, total=AnalyticsTotal.total + total)
+        )
+        if result.rowcount == 0:
+            connection.execute(insert(AnalyticsTotal).values(
+                dimension=dimension, key=key, subkey=subkey, count=count, total=total
+            ))
+
+
+def refresh_missing_analytics():
+    """Materialisiert Projekte, für die noch keine Kennzahlen vorliegen"""
+    missing = select(Project.id).where(
+        Project.id.not_in(
+            select(ProjectAnalytics.project_id).where(ProjectAnalytics.dimension == 'projects')
+        )
+    )
+    project_ids = db.session.execute(missing).scalars().all()
+    for start in range(0, len(project_ids), 500):
+        refresh_project_analytics(db.session.connection(), project_ids[start:start + 500])
+    db.session.commit()
+
+
+def portfolio_analytics(materialized=None):
+    """Portfolio-Dashboard aus den Rollups zusammensetzen"""
+    if materialized is None:
+        materialized = materialized_enabled()
+    connection = db.session.connection()
+    rows = _materialized_rows(connection) if materialized else _live_rows(connection)
+
+    result = {
+        'source': 'materialized' if materialized else 'live',
+        'projects': 0,
+        'stakeholders': {'by_department': [], 'by_channel': [], 'by_department_channel': []},
+        'matrix': {
+            'by_channel': [], 'by_frequency': [], 'by_priority': [],
+            'confirmation': {'required': 0, 'not_required': 0, 'ratio': 0.0},
+        },
+        'budget': {'total': 0.0, 'plans_with_budget': 0, 'average': 0.0},
+    }
+    stakeholders = result['stakeholders']
+    matrix = result['matrix']
+
+    for dimension, key, subkey, count, total in rows:
+        if dimension == 'projects':
+            result['projects'] += count
+        elif dimension == 'stakeholder_department':
+            stakeholders['by_department'].append({'department': key, 'count': count})
+        elif dimension == 'stakeholder_channel':
+            stakeholders['by_channel'].append({'channel': key, 'count': count})
+        elif dimension == 'stakeholder_department_channel':
+            stakeholders['by_department_channel'].append({'department': key, 'channel': subkey, 'count': count})
+        elif dimension == 'matrix_channel':
+            matrix['by_channel'].append({'how_channel': key, 'count': count})
+        elif dimension == 'matrix_frequency':
+            matrix['by_frequency'].append({'when_frequency': key, 'count': count})
+        elif dimension == 'matrix_priority':
+            matrix['by_priority'].append({'priority': key, 'count': count})
+        elif dimension == 'matrix_confirmation':
+            flag = 'required' if key in ('1', 'true', 'True') else 'not_required'
+            matrix['confirmation'][flag] += count
+        elif dimension == 'communication_budget':
+            result['budget']['total'] += total
+            result['budget']['plans_with_budget'] += count
+
+    for breakdown in (*stakeholders.values(), matrix['by_channel'], matrix['by_frequency'], matrix['by_priority']):
+        breakdown.sort(key=lambda item: item['count'], reverse=True)
+
+    confirmation = matrix['confirmation']
+    matrix_total = confirmation['required'] + confirmation['not_required']
+    if matrix_total:
+        confirmation['ratio'] = round(confirmation['required'] / matrix_total, 4)
+    budget = result['budget']
+    if budget['plans_with_budget']:
+        budget['average'] = round(budget['total'] / budget['plans_with_budget'], 2)
+
+    return result
@@ -0,0 +1,313 @@
+from sqlalchemy import select
+from src.models.user import db
+from src.models.communication_plan import Stakeholder, CommunicationPlan, CommunicationMatrix
+from src.services.matrix_links import normalize_name, stakeholder_entry_ids
+from datetime import date, datetime, time, timedelta, timezone
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+from collections import defaultdict, namedtuple
+from functools import lru_cache
+import itertools
+import re
+
+# Kalender-Engine: übersetzt die Freitext-Angaben der Kommunikationsmatrix
+# (when_frequency, when_timing) in konkrete Termine. Einträge mit gleicher
+# Regel und gleicher Zeitzone werden gemeinsam expandiert, sodass die
+# Datumsarithmetik nur einmal pro Regel statt pro Eintrag anfällt.
+
+DEFAULT_TIMEZONE = 'Europe/Berlin'
+DEFAULT_TIME = time(9, 0)
+DEFAULT_DURATION = timedelta(minutes=30)
+
+# (Einheit, Intervall); 'weekday' = jeder Werktag
+FREQUENCIES = {
+    'täglich': ('weekday', 1),
+    'daily': ('weekday', 1),
+    'wöchentlich': ('week', 1),
+    'weekly': ('week', 1),
+    'zweiwöchentlich': ('week', 2),
+    'biweekly': ('week', 2),
+    'monatlich': ('month', 1),
+    'monthly': ('month', 1),
+    'quartalsweise': ('month', 3),
+    'quarterly': ('month', 3),
+    'halbjährlich': ('month', 6),
+    'jährlich': ('month', 12),
+    'yearly': ('month', 12),
+}
+
+# Mehrdeutige Kürzel wie 'so' oder 'we' werden bewusst nicht erkannt
+WEEKDAYS = [
+    ('montag', 'monday', 'mo'),
+    ('dienstag', 'tuesday', 'di'),
+    ('mittwoch', 'wednesday', 'mi'),
+    ('donnerstag', 'thursday', 'do'),
+    ('freitag', 'friday', 'fr'),
+    ('samstag', 'saturday', 'sa'),
+    ('sonntag', 'sunday'),
+]
+_WEEKDAY_LOOKUP = {name: index for index, names in enumerate(WEEKDAYS) for name in names}
+_WORD_PATTERN = re.compile(r'[a-zäöü]+')
+_TIME_PATTERN = re.compile(r'\b([01]?\d|2[0-3])(?::([0-5]\d)|\s*uhr)')
+_OFFSET_PATTERN = re.compile(r'^(?:utc|gmt)\s*([+-])(\d{1,2})(?::?(\d{2}))?')
+
+# Referenz-Montag für die Phase mehrwöchiger Intervalle
+_EPOCH_MONDAY = date(1970, 1, 5)
+
+Rule = namedtuple('Rule', 'unit interval weekday at tz_name')
+Occurrence = namedtuple('Occurrence', 'entry start timezone tzinfo')
+
+
+@lru_cache(maxsize=256)
+def parse_timezone(value, default=DEFAULT_TIMEZONE):
+    """Liefert (Name, tzinfo) für IANA-Namen oder Angaben wie 'UTC+5:30 (IST)'"""
+    text = (value or '').strip()
+    if text:
+        match = _OFFSET_PATTERN.match(text.casefold())
+        if match:
+            sign, hours, minutes = match.groups()
+            # timezone() erlaubt nur Versätze unter 24 Stunden; ungültige
+            # Angaben wie 'UTC+25' fallen wie unbekannte Namen auf default zurück
+            if int(hours) >= 24 or int(minutes or 0) >= 60:
+                return default, ZoneInfo(default)
+            offset = timedelta(hours=int(hours), minutes=int(minutes or 0))
+            return text, timezone(-offset if sign == '-' else offset)
+        try:
+            return text, ZoneInfo(text)
+        except (ZoneInfoNotFoundError, ValueError):
+            pass
+    return default, ZoneInfo(default)
+
+
+@lru_cache(maxsize=4096)
+def parse_rule(frequency, timing, tz_name):
+    """Übersetzt Häufigkeit und Timing in eine Regel, None bei ereignisgesteuerten Einträgen"""
+    unit_interval = FREQUENCIES.get(normalize_name(frequency))
+    if unit_interval is None:
+        return None
+
+    text = normalize_name(timing)
+    weekday = None
+    for word in _WORD_PATTERN.findall(text):
+        stem = word[:-1] if word.endswith('s') and word[:-1] in _WEEKDAY_LOOKUP else word
+        if stem in _WEEKDAY_LOOKUP:
+            weekday = _WEEKDAY_LOOKUP[stem]
+            break
+
+    at = DEFAULT_TIME
+    match = _TIME_PATTERN.search(text)
+    if match:
+        at = time(int(match.group(1)), int(match.group(2) or 0))
+
+    unit, interval = unit_interval
+    return Rule(unit, interval, weekday, at, tz_name)
+
+
+def _local_dates(rule, start, end):
+    """Alle lokalen Daten einer Regel im Intervall [start, end)"""
+    if rule.unit == 'weekday':
+        current = start
+        while current < end:
+            if current.weekday() < 5:
+                yield current
+            current += timedelta(days=1)
+
+    elif rule.unit == 'week':
+        weekday = rule.weekday if rule.weekday is not None else 0
+        step = 7 * rule.interval
+        first = start + timedelta(days=(weekday - start.weekday()) % 7)
+        # Mehrwöchige Intervalle an einer festen Wochenphase ausrichten
+        phase = ((first - _EPOCH_MONDAY).days // 7) % rule.interval
+        if phase:
+            first += timedelta(days=7 * (rule.interval - phase))
+        current = first
+        while current < end:
+            yield current
+            current += timedelta(days=step)
+
+    elif rule.unit == 'month':
+        month_index = start.year * 12 + start.month - 1
+        while True:
+            year, month = divmod(month_index, 12)
+            first_of_month = date(year, month + 1, 1)
+            if first_of_month >= end:
+                break
+            if month % rule.interval == 0:
+                if rule.weekday is not None:
+                    day = first_of_month + timedelta(days=(rule.weekday - first_of_month.weekday()) % 7)
+                else:
+                    day = first_of_month
+                    while day.weekday() >= 5:
+                        day += timedelta(days=1)
+                if start <= day < end:
+                    yield day
+            month_index += 1
+
+
+def _expand_rule(rule, tzinfo, start, end):
+    """Expandiert eine Regel einmalig zu UTC-Zeitpunkten"""
+    lower = datetime.combine(start, time(0), tzinfo=timezone.utc)
+    upper = datetime.combine(end, time(0), tzinfo=timezone.utc)
+    result = []
+    # Einen Tag Rand, da lokale Termine in UTC auf den Vor- oder Folgetag fallen können
+    for day in _local_dates(rule, start - timedelta(days=1), end + timedelta(days=1)):
+        instant = datetime.combine(day, rule.at, tzinfo=tzinfo).astimezone(timezone.utc)
+        if lower <= instant < upper:
+            result.append(instant)
+    return result
+
+
+def expand(entries, receiver_timezones, start, end):
+    """Expandiert Matrixeinträge über [start, end)
+
+    entries sind Zeilen mit den Matrixspalten, receiver_timezones bildet
+    normalisierte Empfängernamen auf Zeitzonen-Angaben ab. Liefert
+    (Iterator der Termine sortiert nach Beginn, nicht planbare Einträge).
+    """
+    groups = defaultdict(list)
+    timezones = {}
+    unscheduled = []
+
+    for entry in entries:
+        tz_name, tzinfo = parse_timezone(receiver_timezones.get(normalize_name(entry.who_receiver)))
+        timezones[tz_name] = tzinfo
+        rule = parse_rule(entry.when_frequency, entry.when_timing, tz_name)
+        if rule is None:
+            unscheduled.append(entry)
+        else:
+            groups[rule].append(entry)
+
+    # Nur die (Zeitpunkt, Regel)-Paare werden sortiert, nicht jeder einzelne Termin
+    rules = list(groups)
+    slots = sorted(
+        (instant, index)
+        for index, rule in enumerate(rules)
+        for instant in _expand_rule(rule, timezones[rule.tz_name], start, end)
+    )
+    for grouped_entries in groups.values():
+        grouped_entries.sort(key=lambda entry: entry.id)
+
+    def iter_occurrences():
+        for instant, group in itertools.groupby(slots, key=lambda slot: slot[0]):
+            indexes = [index for _, index in group]
+            if len(indexes) == 1:
+                pairs = ((entry, rules[indexes[0]]) for entry in groups[rules[indexes[0]]])
+            else:
+                pairs = sorted(
+                    ((entry, rules[index]) for index in indexes for entry in groups[rules[index]]),
+                    key=lambda pair: pair[0].id,
+                )
+            for entry, rule in pairs:
+                yield Occurrence(entry, instant, rule.tz_name, timezones[rule.tz_name])
+
+    return iter_occurrences(), unscheduled
+
+
+_ENTRY_COLUMNS = [
+    CommunicationMatrix.id,
+    CommunicationMatrix.who_sender,
+    CommunicationMatrix.who_receiver,
+    CommunicationMatrix.what_content,
+    CommunicationMatrix.when_frequency,
+    CommunicationMatrix.when_timing,
+    CommunicationMatrix.how_channel,
+    CommunicationMatrix.how_format,
+    CommunicationMatrix.why_purpose,
+    CommunicationMatrix.priority,
+]
+
+
+def project_entries(project_id):
+    """Matrixeinträge eines Projekts als Zeilen"""
+    statement = select(*_ENTRY_COLUMNS).join(
+        CommunicationPlan, CommunicationPlan.id == CommunicationMatrix.communication_plan_id
+    ).where(CommunicationPlan.project_id == project_id)
+    return db.session.execute(statement).all()
+
+
+def stakeholder_entries(stakeholder):
+    """Matrixeinträge, in denen ein Stakeholder Sender oder Empfänger ist"""
+    statement = select(*_ENTRY_COLUMNS).where(
+        CommunicationMatrix.id.in_(stakeholder_entry_ids(stakeholder.id))
+    )
+    return db.session.execute(statement).all()
+
+
+def receiver_timezones(project_id):
+    """Zeitzonen der Stakeholder eines Projekts nach normalisiertem Namen"""
+    statement = select(Stakeholder.name, Stakeholder.timezone).where(
+        Stakeholder.project_id == project_id, Stakeholder.timezone.is_not(None)
+    )
+    return {normalize_name(name): tz for name, tz in db.session.execute(statement)}
+
+
+def occurrence_to_dict(occurrence):
+    entry = occurrence.entry
+    return {
+        'matrix_id': entry.id,
+        'start': occurrence.start.isoformat(),
+        'end': (occurrence.start + DEFAULT_DURATION).isoformat(),
+        'local_start': occurrence.start.astimezone(occurrence.tzinfo).isoformat(),
+        'timezone': occurrence.timezone,
+        'who_sender': entry.who_sender,
+        'who_receiver': entry.who_receiver,
+        'what_content': entry.what_content,
+        'how_channel': entry.how_channel,
+        'how_format': entry.how_format,
+        'priority': entry.priority,
+    }
+
+
+def _escape(value):
+    return (value or '').replace('\\', '\\\\').replace(';', '\\;').replace(',', '\\,').replace('\r\n', '\\n').replace('\n', '\\n')
+
+
+def _fold(line):
+    """Faltet eine Zeile nach RFC 5545 auf höchstens 75 Oktette"""
+    encoded = line.encode('utf-8')
+    if len(encoded) <= 75:
+        return line + '\r\n'
+    parts = []
+    current = ''
+    limit = 75
+    for char in line:
+        if len((current + char).encode('utf-8')) > limit:
+            parts.append(current)
+            current = ' '
+            limit = 75
+        current += char
+    parts.append(current)
+    return '\r\n'.join(parts) + '\r\n'
+
+
+def iter_ics(occurrences, calendar_name):
+    """Erzeugt einen iCalendar-Feed zeilenweise"""
+    stamp = datetime.now(timezone.utc).strftime('%Y%m%dT%H%M%SZ')
+    yield 'BEGIN:VCALENDAR\r\nVERSION:2.0\r\nPRODID:-//shaDoo//Kommunikationsplan//DE\r\nCALSCALE:GREGORIAN\r\n'
+    yield _fold(f'X-WR-CALNAME:{_escape(calendar_name)}')
+
+    for occurrence in occurrences:
+        entry = occurrence.entry
+        start = occurrence.start.strftime('%Y%m%dT%H%M%SZ')
+        summary = entry.what_content or entry.how_channel or 'Kommunikation'
+        lines = [
+            'BEGIN:VEVENT',
+            f'UID:matrix-{entry.id}-{start}@shadoo',
+            f'DTSTAMP:{stamp}',
+            f'DTSTART:{start}',
+            f'DTEND:{(occurrence.start + DEFAULT_DURATION).strftime("%Y%m%dT%H%M%SZ")}',
+            f'SUMMARY:{_escape(summary)}',
+        ]
+        description = ' / '.join(filter(None, [
+            entry.who_sender and f'Von: {entry.who_sender}',
+            entry.who_receiver and f'An: {entry.who_receiver}',
+            entry.how_format and f'Format: {entry.how_format}',
+            entry.why_purpose,
+        ]))
+        if description:
+            lines.append(f'DESCRIPTION:{_escape(description)}')
+        if entry.how_channel:
+            lines.append(f'CATEGORIES:{_escape(entry.how_channel)}')
+        lines.append('END:VEVENT')
+        yield ''.join(_fold(line) for line in lines)
+
+    yield 'END:VCALENDAR\r\n'
@@ -0,0 +1,139 @@
+from sqlalchemy import MetaData, Table, Column, Integer, String, select, insert, delete, literal, func, and_
+from src.models.communication_plan import (
+    Project, Stakeholder, CommunicationPlan, CommunicationMatrix, matrix_stakeholders
+)
+from datetime import datetime
+
+# Kopiert ein Projekt-Aggregat vollständig in der Datenbank über
+# INSERT ... SELECT. Zeilen werden nie nach Python geladen. Für Stakeholder
+# und Matrixeinträge werden die neuen Ids vorab vergeben und mit der alten Id
+# in einer temporären Tabelle abgelegt; die Kopie übernimmt die Id aus
+# dieser Zuordnung, die Matrix-Verknüpfungen werden darüber umgeschrieben.
+# So hängt die Zuordnung nicht davon ab, in welcher Reihenfolge die
+# Datenbank Ids bei INSERT ... SELECT vergibt (PostgreSQL garantiert sie
+# nicht).
+
+def _copy_columns(model, *excluded):
+    # Kopien beginnen bei Version 1 (Standardwert der Spalte)
+    return [column for column in model.__table__.columns if column.name not in ('id', 'version', *excluded)]
+
+
+_temp_metadata = MetaData()
+
+_clone_id_map = Table(
+    'clone_id_map', _temp_metadata,
+    Column('entity', String(20), primary_key=True),
+    Column('old_id', Integer, primary_key=True),
+    Column('new_id', Integer, nullable=False),
+    prefixes=['TEMPORARY'],
+)
+
+
+def _next_ids(connection, model):
+    """Ausdruck für je Zeile eine neue Id von model"""
+    if connection.dialect.name == 'postgresql':
+        return func.nextval(func.pg_get_serial_sequence(model.__table__.name, 'id'))
+    # SQLite: hinter die größte Id; die Schreibsperre der Transaktion hält sie stabil
+    highest = select(func.coalesce(func.max(model.id), 0)).scalar_subquery()
+    return highest + func.row_number().over(order_by=model.id)
+
+
+def _copy_rows(connection, entity, model, parent_column, old_parent_id, new_parent_id):
+    """Kopiert die Kinder eines Elternobjekts mit vorab vergebenen Ids"""
+    connection.execute(
+        insert(_clone_id_map).from_select(
+            ['entity', 'old_id', 'new_id'],
+            select(literal(entity), model.id, _next_ids(connection, model)).where(parent_column == old_parent_id),
+        )
+    )
+
+    columns = _copy_columns(model, parent_column.name)
+    connection.execute(
+        insert(model).from_select(
+            ['id', parent_column.name, *[column.name for column in columns]],
+            select(_clone_id_map.c.new_id, literal(new_parent_id), *columns)
+            .join(_clone_id_map, and_(_clone_id_map.c.entity == entity, _clone_id_map.c.old_id == model.id))
+            .order_by(_clone_id_map.c.new_id),
+        )
+    )
+
+
+def _copy_links(connection):
+    """Kopiert die Stakeholder-Verknüpfungen der Matrix auf die neuen Ids"""
+    entries = _clone_id_map.alias('entries')
+    stakeholders = _clone_id_map.alias('stakeholders')
+    connection.execute(
+        insert(matrix_stakeholders).from_select(
+            ['matrix_id', 'stakeholder_id', 'role'],
+            select(entries.c.new_id, stakeholders.c.new_id, matrix_stakeholders.c.role)
+            .select_from(matrix_stakeholders)
+            .join(entries, and_(entries.c.entity == 'matrix', entries.c.old_id == matrix_stakeholders.c.matrix_id))
+            .join(stakeholders, and_(
+                stakeholders.c.entity == 'stakeholder',
+                stakeholders.c.old_id == matrix_stakeholders.c.stakeholder_id,
+            )),
+        )
+    )
+
+
+def clone_project(connection, project_id, name=None, include_stakeholders=True,
+                  include_plan=True, include_matrix=True):
+    """Klont ein Projekt samt Stakeholdern, Plan und Matrix; liefert die neue Projekt-Id"""
+    now = datetime.utcnow()
+
+    project_columns = _copy_columns(Project, 'name', 'created_at', 'updated_at')
+    new_project_id = connection.execute(
+        insert(Project)
+        .from_select(
+            ['name', 'created_at', 'updated_at', *[column.name for column in project_columns]],
+            select(
+                literal(name) if name else Project.name + ' (Kopie)',
+                literal(now), literal(now),
+                *project_columns,
+            ).where(Project.id == project_id),
+        )
+        .returning(Project.id)
+    ).scalar_one()
+
+    _temp_metadata.create_all(connection, checkfirst=True)
+    try:
+        _clone_children(connection, project_id, new_project_id, now,
+                        include_stakeholders, include_plan, include_matrix)
+    finally:
+        connection.execute(delete(_clone_id_map))
+    return new_project_id
+
+
+def _clone_children(connection, project_id, new_project_id, now,
+                    include_stakeholders, include_plan, include_matrix):
+    """Stakeholder, Plan und Matrix des Projekts kopieren (Zuordnung in clone_id_map)"""
+    if include_stakeholders:
+        _copy_rows(connection, 'stakeholder', Stakeholder, Stakeholder.project_id, project_id, new_project_id)
+
+    if not include_plan:
+        return
+
+    plan_columns = _copy_columns(CommunicationPlan, 'project_id', 'created_at', 'updated_at')
+    source_plan_id = connection.execute(
+        select(CommunicationPlan.id).where(CommunicationPlan.project_id == project_id)
+    ).scalar()
+    if source_plan_id is None:
+        return
+
+    new_plan_id = connection.execute(
+        insert(CommunicationPlan)
+        .from_select(
+            ['project_id', 'created_at', 'updated_at', *[column.name for column in plan_columns]],
+            select(literal(new_project_id), literal(now), literal(now), *plan_columns)
+            .where(CommunicationPlan.id == source_plan_id),
+        )
+        .returning(CommunicationPlan.id)
+    ).scalar_one()
+
+    if not include_matrix:
+        return
+
+    _copy_rows(connection, 'matrix', CommunicationMatrix, CommunicationMatrix.communication_plan_id,
+               source_plan_id, new_plan_id)
+    if include_stakeholders:
+        _copy_links(connection)
@@ -0,0 +1,39 @@
+from sqlalchemy import select, update
+
+# Optimistische Nebenläufigkeit: Projekte, Stakeholder, Kommunikationspläne
+# und Matrixeinträge tragen eine Versionsnummer, die jeder Schreibzugriff
+# erhöht (ORM über version_id_col, Core-Pfade explizit). Ein bedingtes
+# Update prüft die erwartete Version im selben UPDATE ... WHERE version = ?
+# und liefert die neue Zeile per RETURNING; es gibt weder Sperren noch ein
+# vorheriges Lesen. Nur wenn keine Zeile getroffen wurde, wird nachgesehen,
+# ob sie fehlt oder eine andere Version hat.
+
+
+class VersionConflict(Exception):
+    """Die Zeile wurde seit dem Lesen geändert"""
+
+    def __init__(self, current_version):
+        super().__init__(f'Version conflict (current version {current_version})')
+        self.current_version = current_version
+
+
+def conditional_update(connection, model, criteria, values, serializer, versions=None):
+    """Aktualisiert eine Zeile, sofern ihre Version in versions liegt
+
+    criteria identifiziert die Zeile, values enthält die zu setzenden Spalten
+    (bereits in Speicherform). versions ist None für ein unbedingtes Update,
+    sonst die Menge akzeptierter Versionen aus If-Match. Liefert die neue
+    Zeile in der Form des serializer oder None, wenn es die Zeile nicht gibt;
+    bei abweichender Version wird VersionConflict geworfen.
+    """
+    statement = update(model).where(*criteria).values(**values, version=model.version + 1)
+    if versions is not None:
+        statement = statement.where(model.version.in_(versions))
+    row = connection.execute(statement.returning(*serializer.statement.selected_columns)).first()
+    if row is not None:
+        return serializer(row)
+
+    current = connection.execute(select(model.version).where(*criteria)).scalar()
+    if current is None:
+        return None
+    raise VersionConflict(current)
@@ -0,0 +1,412 @@
+from sqlalchemy import MetaData, UniqueConstraint, create_engine, select, insert, func, tuple_
+from sqlalchemy import types as sqltypes
+from flask.cli import AppGroup
+from src.models.user import db
+from src.models.migrations import prepare_database, sync_sequence
+from src.models.compressed import compress_text_columns
+from src.services.matrix_links import relink_entries
+from src.services.project_summaries import refresh_project_summaries
+from src.services.duplicates import refresh_identity_keys
+from src.services.tenants import get_router
+from contextlib import contextmanager
+from datetime import date, datetime
+from decimal import Decimal
+import base64
+import click
+import json
+import os
+import sqlite3
+import tempfile
+import uuid
+
+# Vollständiger Datenbank-Dump als NDJSON: eine Kopfzeile, je Tabelle die
+# Zeilen ({"table": ..., "row": {...}}) und eine Abschlusszeile mit der
+# Zeilenzahl, am Ende {"complete": true}. Gelesen wird aus einem
+# konsistenten Stand: SQLite wird per Online-Backup-API seitenweise in eine
+# temporäre Datei kopiert (Schreiber werden nur zwischen den Schritten
+# kurz angehalten), andere Datenbanken lesen in einer REPEATABLE-READ-
+# Transaktion mit serverseitigem Cursor. Abgeleitete Tabellen fehlen im
+# Dump und werden nach dem Import neu berechnet.
+
+DUMP_FORMAT = 'shadoo-dump'
+DUMP_VERSION = 1
+
+# Aus den übrigen Tabellen berechnet bzw. je Datenbank verwaltet
+DERIVED_TABLES = {
+    'schema_migrations', 'matrix_stakeholders', 'project_validations', 'project_analytics', 'analytics_totals',
+}
+
+BATCH_SIZE = 1000
+BACKUP_PAGES = 1024
+
+
+class DumpFormatError(ValueError):
+    """Ungültiger oder unvollständiger Dump"""
+
+
+def dump_tables():
+    """Tabellen des Dumps in Abhängigkeitsreihenfolge (Eltern vor Kindern)"""
+    return [table for table in db.metadata.sorted_tables if table.name not in DERIVED_TABLES]
+
+
+def _json_default(value):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, bytes):
+        return base64.b64encode(value).decode('ascii')
+    if isinstance(value, Decimal):
+        return str(value)
+    raise TypeError(f'Cannot serialize {type(value).__name__}')
+
+
+def _line(value):
+    return json.dumps(value, separators=(',', ':'), ensure_ascii=False, default=_json_default) + '\n'
+
+
+@contextmanager
+def _snapshot(engine):
+    """Connection auf einem konsistenten Stand der Datenbank"""
+    database = engine.url.database
+    if engine.dialect.name == 'sqlite' and database and database != ':memory:':
+        handle, path = tempfile.mkstemp(prefix='dump-', suffix='.db')
+        os.close(handle)
+        try:
+            source = engine.raw_connection()
+            target = sqlite3.connect(path)
+            try:
+                source.driver_connection.backup(target, pages=BACKUP_PAGES)
+            finally:
+                target.close()
+                source.close()
+            snapshot = create_engine(f'sqlite:///{path}')
+            try:
+                with snapshot.connect() as connection:
+                    yield connection
+            finally:
+                snapshot.dispose()
+        finally:
+            os.remove(path)
+        return
+
+    with engine.connect() as connection:
+        if engine.dialect.name != 'sqlite':
+            connection = connection.execution_options(isolation_level='REPEATABLE READ')
+        with connection.begin():
+            yield connection
+
+
+def iter_dump(engine):
+    """Erzeugt die Zeilen eines Dumps (str) mit konstantem Speicherbedarf"""
+    with _snapshot(engine) as connection:
+        yield _line({
+            'format': DUMP_FORMAT,
+            'version': DUMP_VERSION,
+            'dialect': engine.dialect.name,
+            'created_at': datetime.utcnow().isoformat(),
+        })
+        for table in dump_tables():
+            rows = connection.execute(
+                select(table).order_by(*table.primary_key.columns).execution_options(
+                    stream_results=True, yield_per=BATCH_SIZE
+                )
+            ).mappings()
+            count = 0
+            for batch in rows.partitions():
+                yield ''.join(_line({'table': table.name, 'row': dict(row)}) for row in batch)
+                count += len(batch)
+            yield _line({'table': table.name, 'count': count})
+        yield _line({'complete': True})
+
+
+class _KeyMapper:
+    """Bildet Ids einer Tabelle des Dumps auf freie Ids im Ziel ab
+
+    Ganzzahlige Schlüssel werden um das bisherige Maximum im Ziel verschoben
+    (in eine leere Datenbank bleiben sie also erhalten), UUID-Schlüssel (z.B.
+    das Supabase-Schema) werden deterministisch je Import abgeleitet. Beides
+    kommt ohne Zuordnungstabelle aus; nur Zeilen, die im Ziel bereits
+    vorhanden sind (siehe _TableRestore), werden in existing zugeordnet.
+    """
+
+    def __init__(self, connection, table, namespace):
+        self.table = table.name
+        self.namespace = namespace
+        self.column = None
+        self.offset = 0
+        self.is_uuid = False
+        self.existing = {}
+        key = list(table.primary_key.columns)
+        if len(key) == 1:
+            column = key[0]
+            self.column = column.name
+            self.is_uuid = isinstance(column.type, sqltypes.Uuid)
+            if not self.is_uuid and column.type._type_affinity is sqltypes.Integer:
+                self.offset = connection.execute(select(func.max(column))).scalar() or 0
+
+    def map(self, value):
+        if value is None:
+            return None
+        if value in self.existing:
+            return self.existing[value]
+        if self.is_uuid:
+            return uuid.uuid5(self.namespace, f'{self.table}:{value}')
+        return value + self.offset if isinstance(value, int) else value
+
+
+def _decoder(column):
+    """Wandelt JSON-Werte in den Typ der Zielspalte"""
+    column_type = column.type
+    if isinstance(column_type, sqltypes.DateTime):
+        return datetime.fromisoformat
+    if isinstance(column_type, sqltypes.Date):
+        return date.fromisoformat
+    if isinstance(column_type, sqltypes._Binary):
+        return base64.b64decode
+    if isinstance(column_type, sqltypes.JSON):
+        # In SQLite als Text gespeicherte Listen
+        return lambda value: json.loads(value) if isinstance(value, str) else value
+    return None
+
+
+def _unique_column_sets(table):
+    """Spaltenmengen der eindeutigen Constraints und Indizes einer Tabelle"""
+    sets = [
+        tuple(column.name for column in constraint.columns)
+        for constraint in table.constraints if isinstance(constraint, UniqueConstraint)
+    ]
+    sets.extend(tuple(column.name for column in index.columns) for index in table.indexes if index.unique)
+    return list(dict.fromkeys(column_set for column_set in sets if column_set))
+
+
+class _TableRestore:
+    """Schreibt die Zeilen einer Tabelle blockweise mit umgeschlüsselten Ids
+
+    Zeilen, deren eindeutige Werte (z.B. E-Mail eines Benutzers) im Ziel
+    schon vorkommen, werden nicht eingefügt; Verweise darauf zeigen auf die
+    vorhandene Zeile. Eindeutige Spalten mit umgeschlüsselten Ids können
+    nicht kollidieren und werden nicht geprüft.
+    """
+
+    def __init__(self, connection, table, mappers, namespace):
+        self.connection = connection
+        self.table = table
+        self.mapper = mappers[table.name] = _KeyMapper(connection, table, namespace)
+        self.count = 0
+        self.existing = 0
+        self.project_ids = []
+        self._batch = []
+        self._source_ids = []
+
+        # Spalten ohne Umwandlung werden unverändert übernommen
+        self.plain = set()
+        self.converted = []
+        for column in table.columns:
+            decode = _decoder(column)
+            remap = None
+            if column.name == self.mapper.column:
+                remap = self.mapper.map
+            else:
+                for foreign_key in column.foreign_keys:
+                    parent = mappers.get(foreign_key.column.table.name)
+                    if parent is not None and foreign_key.column.name == parent.column:
+                        remap = parent.map
+            if decode is None and remap is None:
+                self.plain.add(column.name)
+            else:
+                self.converted.append((column.name, decode, remap))
+        remapped = {name for name, _, remap in self.converted if remap is not None}
+        self.unique_sets = [
+            column_set for column_set in _unique_column_sets(table) if not remapped & set(column_set)
+        ]
+
+    def add(self, row):
+        # Spalten, die es im Ziel nicht gibt, entfallen
+        record = {name: value for name, value in row.items() if name in self.plain}
+        for name, decode, remap in self.converted:
+            if name not in row:
+                continue
+            value = row[name]
+            if value is not None and decode is not None:
+                value = decode(value)
+            if remap is not None:
+                value = remap(value)
+            record[name] = value
+        self._batch.append(record)
+        self._source_ids.append(row.get(self.mapper.column))
+        if len(self._batch) >= BATCH_SIZE:
+            self.flush()
+
+    def _skip_existing(self):
+        """Entfernt Zeilen, die im Ziel schon vorhanden sind, und ordnet ihre Ids zu"""
+        key = self.table.c[self.mapper.column] if self.mapper.column else None
+        matches = {}
+        for column_set in self.unique_sets:
+            columns = [self.table.c[name] for name in column_set]
+            values = {
+                tuple(record.get(name) for name in column_set) for record in self._batch
+                if all(record.get(name) is not None for name in column_set)
+            }
+            if not values:
+                continue
+            if len(columns) == 1:
+                condition = columns[0].in_([value[0] for value in values])
+            else:
+                condition = tuple_(*columns).in_(list(values))
+            existing = {
+                tuple(row[:len(columns)]): row[-1]
+                for row in self.connection.execute(select(*columns, key if key is not None else columns[0]).where(condition))
+            }
+            for index, record in enumerate(self._batch):
+                value = tuple(record.get(name) for name in column_set)
+                if index not in matches and value in existing:
+                    matches[index] = existing[value]
+
+        for index, target_id in matches.items():
+            if key is not None:
+                self.mapper.existing[self._source_ids[index]] = target_id
+        self.existing += len(matches)
+        return [record for index, record in enumerate(self._batch) if index not in matches]
+
+    def flush(self):
+        if not self._batch:
+            return
+        records = self._skip_existing() if self.unique_sets else self._batch
+        if records:
+            self.connection.execute(insert(self.table), records)
+        if self.table.name == 'projects':
+            self.project_ids.extend(record['id'] for record in records)
+        self.count += len(self._batch)
+        self._batch = []
+        self._source_ids = []
+
+    def finish(self, expected):
+        self.flush()
+        if self.count != expected:
+            raise DumpFormatError(f'{self.table.name}: restored {self.count} of {expected} rows')
+        if self.mapper.column and not self.mapper.is_uuid:
+            # Sequenz hinter die eingefügten Ids setzen
+            sync_sequence(self.connection, self.table)
+
+
+def restore_dump(connection, lines):
+    """Importiert einen Dump in die Datenbank von connection
+
+    Läuft in der Transaktion des Aufrufers; ist der Dump unvollständig oder
+    ungültig, wird DumpFormatError geworfen und der Aufrufer verwirft die
+    Transaktion. Tabellen und Spalten, die es im Ziel nicht gibt, werden
+    übersprungen, ebenso Zeilen, die im Ziel schon vorhanden sind (gleiche
+    eindeutige Werte, z.B. Benutzer mit derselben E-Mail). Verknüpfungen und
+    Zusammenfassungen werden anschließend für die importierten Projekte neu
+    berechnet. Liefert die eingefügten und die bereits vorhandenen Zeilen je
+    Tabelle.
+    """
+    target = MetaData()
+    target.reflect(bind=connection)
+    namespace = uuid.uuid4()
+    mappers = {}
+    counts = {}
+    existing = {}
+    skipped = {}
+    project_ids = []
+    current = None
+    header = None
+    complete = False
+
+    for number, line in enumerate(lines, 1):
+        if not line.strip():
+            continue
+        try:
+            record = json.loads(line)
+        except ValueError as e:
+            raise DumpFormatError(f'line {number}: {e}')
+
+        if header is None:
+            if record.get('format') != DUMP_FORMAT or record.get('version') != DUMP_VERSION:
+                raise DumpFormatError(f'Unsupported dump format: {record.get("format")} {record.get("version")}')
+            header = record
+            continue
+        if record.get('complete'):
+            complete = True
+            break
+
+        name = record.get('table')
+        if name not in target.tables:
+            skipped[name] = skipped.get(name, 0) + ('row' in record)
+            continue
+        if current is None or current.table.name != name:
+            if name in counts:
+                raise DumpFormatError(f'line {number}: rows of {name} are not contiguous')
+            current = _TableRestore(connection, target.tables[name], mappers, namespace)
+
+        if 'row' in record:
+            current.add(record['row'])
+        elif 'count' in record:
+            current.finish(record['count'])
+            counts[name] = current.count - current.existing
+            if current.existing:
+                existing[name] = current.existing
+            project_ids.extend(current.project_ids)
+            current = None
+        else:
+            raise DumpFormatError(f'line {number}: expected a row or a count')
+
+    if not complete:
+        raise DumpFormatError('Dump is incomplete')
+
+    # Abgeleitete Daten (auch Identitätsschlüssel älterer Dumps) nur, wenn das
+    # Ziel das Schema dieser App hat; der Dump enthält Klartext, große Texte
+    # werden hier komprimiert
+    if {'matrix_stakeholders', 'project_validations'} <= set(target.tables):
+        for start in range(0, len(project_ids), 100):
+            chunk = project_ids[start:start + 100]
+            refresh_identity_keys(connection, chunk)
+            compress_text_columns(connection, chunk)
+            relink_entries(connection, project_ids=chunk)
+            refresh_project_summaries(connection, chunk)
+    return {
+        'tables': counts,
+        'existing': existing,
+        'skipped': {name: count for name, count in skipped.items() if name},
+    }
+
+
+data_cli = AppGroup('data', help='Datenbank sichern und wiederherstellen')
+
+
+def _cli_engine(tenant, database_url):
+    if database_url:
+        return create_engine(database_url)
+    if tenant:
+        return get_router().engine_for(tenant)
+    return db.engine
+
+
+@data_cli.command('dump')
+@click.argument('output', type=click.File('w', encoding='utf-8'), default='-')
+@click.option('--tenant', help='Datenbank dieses Mandanten sichern')
+@click.option('--database-url', help='Andere Datenbank sichern')
+def dump_command(output, tenant, database_url):
+    """Alle Tabellen als NDJSON sichern (ohne OUTPUT auf stdout)"""
+    engine = _cli_engine(tenant, database_url)
+    for chunk in iter_dump(engine):
+        output.write(chunk)
+
+
+@data_cli.command('restore')
+@click.argument('source', type=click.File('r', encoding='utf-8'))
+@click.option('--tenant', help='In die Datenbank dieses Mandanten importieren')
+@click.option('--database-url', help='In eine andere Datenbank importieren, z.B. das Supabase-Schema')
+@click.option('--create-schema', is_flag=True, help='Tabellen dieser App in --database-url anlegen')
+def restore_command(source, tenant, database_url, create_schema):
+    """NDJSON-Dump importieren; Ids werden hinter die vorhandenen Daten gelegt"""
+    engine = _cli_engine(tenant, database_url)
+    if database_url and create_schema:
+        prepare_database(engine)
+    with engine.begin() as connection:
+        result = restore_dump(connection, source)
+    for table, count in result['tables'].items():
+        click.echo(f'{table}: {count}')
+    for table, count in result['existing'].items():
+        click.echo(f'{table}: {count} already present')
+    for table, count in result['skipped'].items():
+        click.echo(f'{table}: {count} skipped (not in target)')
@@ -0,0 +1,312 @@
+from sqlalchemy import event, select, update, bindparam, func
+from sqlalchemy.dialects import sqlite, postgresql
+from src.models.user import db
+from src.models.communication_plan import Stakeholder
+from src.services.matrix_links import normalize_name
+from collections import defaultdict
+from difflib import SequenceMatcher
+import hashlib
+import itertools
+import re
+import unicodedata
+
+# Dubletten bei Stakeholdern: Der Identitätsschlüssel (Hash aus
+# normalisiertem Namen und Kontakt) ist je Projekt eindeutig indiziert,
+# Bulk-Importe werden darüber zu Upserts. Für unscharfe Dubletten
+# ("Müller, Anna" / "Anna Mueller") werden Kandidaten nur innerhalb von
+# Blöcken verglichen, die einen Blocking-Schlüssel teilen (E-Mail, Telefon,
+# Namensbestandteile); große Blöcke werden übersprungen, der Aufwand bleibt
+# so nahezu linear.
+
+_EMAIL = re.compile(r'[\w.+-]+@[\w-]+(?:\.[\w-]+)+')
+_PHONE = re.compile(r'\+?\d[\d\s()/.-]{5,}\d')
+_FOLDS = [('ß', 'ss'), ('ae', 'a'), ('oe', 'o'), ('ue', 'u'), ('ss', 's')]
+
+MAX_BLOCK_SIZE = 100
+DEFAULT_THRESHOLD = 0.85
+UPSERT_BATCH_SIZE = 500
+
+# Felder, die ein Bulk-Import setzen kann; Listen werden als JSON gespeichert
+STAKEHOLDER_FIELDS = (
+    'name', 'role', 'department', 'contact_info', 'information_needs', 'preferred_channels',
+    'preferred_formats', 'communication_frequency', 'escalation_path', 'decision_authority',
+    'timezone', 'availability',
+)
+IDENTITY_FIELDS = ('name', 'contact_info')
+
+
+def _email(contact):
+    match = _EMAIL.search(contact or '')
+    return match.group(0).casefold() if match else None
+
+
+def _phone(contact):
+    match = _PHONE.search(contact or '')
+    if not match:
+        return None
+    digits = re.sub(r'\D', '', match.group(0))
+    return digits if len(digits) >= 7 else None
+
+
+def normalize_contact(contact):
+    """E-Mail-Adresse, sonst Telefonnummer (nur Ziffern), sonst normalisierter Text"""
+    return _email(contact) or _phone(contact) or normalize_name(contact)
+
+
+def identity_key(name, contact_info):
+    """Identitätsschlüssel eines Stakeholders; None ohne Namen"""
+    name = normalize_name(unicodedata.normalize('NFKC', name or ''))
+    if not name:
+        return None
+    contact = normalize_contact(unicodedata.normalize('NFKC', contact_info or ''))
+    return hashlib.sha1(f'{name}\x1f{contact}'.encode('utf-8')).hexdigest()
+
+
+@event.listens_for(Stakeholder, 'before_insert')
+@event.listens_for(Stakeholder, 'before_update')
+def _set_identity_key(mapper, connection, target):
+    """Hält den Schlüssel bei Schreibzugriffen über das ORM aktuell"""
+    target.identity_key = identity_key(target.name, target.contact_info)
+
+
+def refresh_identity_keys(connection, project_ids=None):
+    """Berechnet die Identitätsschlüssel neu (Core-Schreibpfade, Migration)
+
+    Haben mehrere Stakeholder eines Projekts denselben Schlüssel, behält ihn
+    der älteste, die übrigen erhalten NULL und erscheinen in der
+    Dublettensuche.
+    """
+    statement = select(Stakeholder.id, Stakeholder.project_id, Stakeholder.name,
+                       Stakeholder.contact_info, Stakeholder.identity_key)
+    if project_ids is not None:
+        statement = statement.where(Stakeholder.project_id.in_(project_ids))
+    statement = statement.order_by(Stakeholder.project_id, Stakeholder.id)
+
+    seen = set()
+    changes = []
+    for row in connection.execute(statement):
+        key = identity_key(row.name, row.contact_info)
+        if key is not None:
+            if (row.project_id, key) in seen:
+                key = None
+            else:
+                seen.add((row.project_id, key))
+        if key != row.identity_key:
+            changes.append({'_id': row.id, 'identity_key': key})
+    if not changes:
+        return 0
+
+    # Erst leeren, dann setzen: sonst kollidieren vertauschte Schlüssel mit dem Index
+    statement = update(Stakeholder).where(Stakeholder.id == bindparam('_id'))
+    connection.execute(statement.values(identity_key=None), [{'_id': change['_id']} for change in changes])
+    connection.execute(statement, [change for change in changes if change['identity_key'] is not None])
+    return len(changes)
+
+
+def find_by_identity(project_id, key, exclude_id=None):
+    """Id eines Stakeholders mit diesem Schlüssel im Projekt oder None"""
+    statement = select(Stakeholder.id).where(
+        Stakeholder.project_id == project_id, Stakeholder.identity_key == key
+    )
+    if exclude_id is not None:
+        statement = statement.where(Stakeholder.id != exclude_id)
+    return db.session.execute(statement).scalar()
+
+
+def _insert(connection):
+    return (postgresql if connection.dialect.name == 'postgresql' else sqlite).insert
+
+
+def upsert_stakeholders(connection, project_id, records):
+    """Legt Stakeholder an oder aktualisiert vorhandene mit gleichem Identitätsschlüssel
+
+    records sind Dicts mit Feldern aus STAKEHOLDER_FIELDS (Listen bereits als
+    JSON). Name und Kontakt eines vorhandenen Stakeholders bleiben in ihrer
+    Schreibweise erhalten, fehlende Felder (None) überschreiben vorhandene
+    Werte nicht; Dubletten innerhalb von records werden vorab zusammengeführt. Liefert
+    (Ids in der Reihenfolge von records, Zahl neu angelegter Stakeholder).
+    """
+    merged = {}
+    order = []
+    for record in records:
+        key = identity_key(record.get('name'), record.get('contact_info'))
+        order.append(key)
+        values = {field: record.get(field) for field in STAKEHOLDER_FIELDS}
+        if key in merged:
+            merged[key].update({
+                field: value for field, value in values.items()
+                if value is not None and field not in IDENTITY_FIELDS
+            })
+        else:
+            merged[key] = values
+
+    keys = list(merged)
+    existing = set()
+    for start in range(0, len(keys), UPSERT_BATCH_SIZE):
+        existing.update(connection.execute(
+            select(Stakeholder.identity_key).where(
+                Stakeholder.project_id == project_id,
+                Stakeholder.identity_key.in_(keys[start:start + UPSERT_BATCH_SIZE]),
+            )
+        ).scalars())
+
+    insert = _insert(connection)(Stakeholder)
+    statement = insert.on_conflict_do_update(
+        index_elements=[Stakeholder.project_id, Stakeholder.identity_key],
+        index_where=Stakeholder.identity_key.isnot(None),
+        set_={
+            **{
+                field: func.coalesce(insert.excluded[field], Stakeholder.__table__.c[field])
+                for field in STAKEHOLDER_FIELDS if field not in IDENTITY_FIELDS
+            },
+            'version': Stakeholder.__table__.c.version + 1,
+        },
+    )
+    rows = [{'project_id': project_id, 'identity_key': key, **values} for key, values in merged.items()]
+    for start in range(0, len(rows), UPSERT_BATCH_SIZE):
+        connection.execute(statement, rows[start:start + UPSERT_BATCH_SIZE])
+
+    ids = {}
+    for start in range(0, len(keys), UPSERT_BATCH_SIZE):
+        ids.update(connection.execute(
+            select(Stakeholder.identity_key, Stakeholder.id).where(
+                Stakeholder.project_id == project_id,
+                Stakeholder.identity_key.in_(keys[start:start + UPSERT_BATCH_SIZE]),
+            )
+        ).all())
+    return [ids[key] for key in order], len(keys) - len(existing)
+
+
+# Unscharfe Dublettensuche
+
+def _fold(value):
+    """Kleinschreibung ohne Akzente, Umlaute und Satzzeichen"""
+    value = normalize_name(value)
+    for source, target in _FOLDS:
+        value = value.replace(source, target)
+    value = ''.join(
+        character for character in unicodedata.normalize('NFKD', value) if not unicodedata.combining(character)
+    )
+    return re.findall(r'[a-z0-9]+', value)
+
+
+def _blocking_keys(tokens, email, phone):
+    keys = []
+    if email:
+        keys.append(('email', email))
+    if phone:
+        keys.append(('phone', phone[-9:]))
+    if tokens:
+        keys.append(('name', ' '.join(sorted(tokens))))
+    # Je Paar von Namensbestandteilen: Präfix des einen und Initiale des
+    # anderen, unabhängig von der Reihenfolge ("Müller, A." / "Anna Müller")
+    for first, second in itertools.permutations(tokens[:4], 2):
+        if len(first) >= 3:
+            keys.append(('prefix', f'{first[:4]}|{second[0]}'))
+    return keys
+
+
+class _Clusters:
+    """Union-Find über Stakeholder-Ids"""
+
+    def __init__(self):
+        self.parent = {}
+
+    def find(self, item):
+        root = item
+        while self.parent.get(root, root) != root:
+            root = self.parent[root]
+        while item != root:
+            self.parent[item], item = root, self.parent.get(item, item)
+        return root
+
+    def union(self, first, second):
+        first, second = self.find(first), self.find(second)
+        if first != second:
+            self.parent[max(first, second)] = min(first, second)
+
+
+def find_duplicates(connection, project_id, threshold=DEFAULT_THRESHOLD, limit=100):
+    """Gruppen wahrscheinlicher Dubletten eines Projekts
+
+    Verglichen werden nur Stakeholder, die einen Blocking-Schlüssel teilen;
+    Blöcke mit mehr als MAX_BLOCK_SIZE Einträgen (z.B. sehr häufige Namen)
+    werden übersprungen und gezählt. Die Ähnlichkeit ist die der sortierten
+    Namensbestandteile; gleiche E-Mail oder Telefonnummer hebt sie auf
+    mindestens 0,95.
+    """
+    people = {}
+    blocks = defaultdict(list)
+    statement = select(
+        Stakeholder.id, Stakeholder.name, Stakeholder.contact_info, Stakeholder.department, Stakeholder.role
+    ).where(Stakeholder.project_id == project_id).order_by(Stakeholder.id)
+    for row in connection.execute(statement.execution_options(yield_per=1000)):
+        tokens = _fold(row.name)
+        email, phone = _email(row.contact_info), _phone(row.contact_info)
+        people[row.id] = (row, ' '.join(sorted(tokens)), email, phone)
+        for key in _blocking_keys(tokens, email, phone):
+            blocks[key].append(row.id)
+
+    compared = set()
+    skipped_blocks = 0
+    clusters = _Clusters()
+    matches = []
+    for members in blocks.values():
+        if len(members) < 2:
+            continue
+        if len(members) > MAX_BLOCK_SIZE:
+            skipped_blocks += 1
+            continue
+        for first, second in itertools.combinations(members, 2):
+            if (first, second) in compared:
+                continue
+            compared.add((first, second))
+            _, first_name, first_email, first_phone = people[first]
+            _, second_name, second_email, second_phone = people[second]
+
+            reasons = []
+            matcher = SequenceMatcher(None, first_name, second_name)
+            score = 0.0
+            if matcher.real_quick_ratio() >= threshold and matcher.quick_ratio() >= threshold:
+                score = matcher.ratio()
+            if score >= threshold:
+                reasons.append('similar_name')
+            if first_email and first_email == second_email:
+                reasons.append('same_email')
+            if first_phone and first_phone == second_phone:
+                reasons.append('same_phone')
+            if 'same_email' in reasons or 'same_phone' in reasons:
+                score = max(score, 0.95)
+            if score >= threshold:
+                clusters.union(first, second)
+                matches.append((first, second, round(score, 3), reasons))
+
+    groups = defaultdict(lambda: {'members': set(), 'matches': []})
+    for first, second, score, reasons in matches:
+        group = groups[clusters.find(first)]
+        group['members'].update((first, second))
+        group['matches'].append({'stakeholder_ids': [first, second], 'score': score, 'reasons': reasons})
+
+    result = []
+    for group in groups.values():
+        result.append({
+            'stakeholders': [
+                {
+                    'id': member,
+                    'name': people[member][0].name,
+                    'contact_info': people[member][0].contact_info,
+                    'role': people[member][0].role,
+                    'department': people[member][0].department,
+                }
+                for member in sorted(group['members'])
+            ],
+            'matches': group['matches'],
+        })
+    result.sort(key=lambda group: (-len(group['stakeholders']), group['stakeholders'][0]['id']))
+    return {
+        'stakeholder_count': len(people),
+        'group_count': len(result),
+        'compared_pairs': len(compared),
+        'skipped_blocks': skipped_blocks,
+        'groups': result[:limit],
+    }
@@ -0,0 +1,301 @@
+from sqlalchemy import select, insert, update, delete, bindparam
+from openpyxl import Workbook, load_workbook
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.styles import Font, PatternFill, Alignment
+from src.models.communication_plan import Stakeholder, CommunicationMatrix
+from src.models.rows import stakeholder_rows, matrix_rows
+from src.services.duplicates import refresh_identity_keys
+import json
+
+# Excel-Export und -Import teilen sich die Spaltendefinitionen, damit ein
+# exportiertes Workbook offline bearbeitet und wieder importiert werden kann.
+# Zeilen werden über die Spalte "ID" bestehenden Datensätzen zugeordnet;
+# Zeilen ohne ID werden neu angelegt. Beide Richtungen arbeiten zeilenweise
+# (write_only/read_only), der Speicherbedarf hängt nicht von der Zeilenzahl ab.
+
+STAKEHOLDER_SHEET = 'Stakeholder'
+MATRIX_SHEET = 'Kommunikationsmatrix'
+
+ID_HEADER = 'ID'
+
+# (Überschrift, Schlüssel in to_dict()/Spalte, Art)
+STAKEHOLDER_COLUMNS = [
+    ('Name', 'name', 'text'),
+    ('Rolle', 'role', 'text'),
+    ('Abteilung', 'department', 'text'),
+    ('Kontakt', 'contact_info', 'text'),
+    ('Informationsbedürfnisse', 'information_needs', 'list'),
+    ('Bevorzugte Kanäle', 'preferred_channels', 'list'),
+    ('Bevorzugte Formate', 'preferred_formats', 'list'),
+    ('Kommunikationsfrequenz', 'communication_frequency', 'text'),
+    ('Eskalationspfad', 'escalation_path', 'text'),
+    ('Entscheidungsbefugnis', 'decision_authority', 'text'),
+    ('Zeitzone', 'timezone', 'text'),
+    ('Verfügbarkeit', 'availability', 'text'),
+]
+
+MATRIX_COLUMNS = [
+    ('Sender', 'who_sender', 'text'),
+    ('Empfänger', 'who_receiver', 'text'),
+    ('Inhalt', 'what_content', 'text'),
+    ('Frequenz', 'when_frequency', 'text'),
+    ('Timing', 'when_timing', 'text'),
+    ('Kanal', 'how_channel', 'text'),
+    ('Format', 'how_format', 'text'),
+    ('Zweck', 'why_purpose', 'text'),
+    ('Priorität', 'priority', 'text'),
+    ('Bestätigung erforderlich', 'confirmation_required', 'bool'),
+]
+
+IMPORT_BATCH_SIZE = 1000
+MAX_REPORTED_ERRORS = 100
+
+_HEADER_FONT = Font(bold=True, color="FFFFFF")
+_HEADER_FILL = PatternFill(start_color="366092", end_color="366092", fill_type="solid")
+
+
+# Export
+
+def _export_value(value, kind):
+    if kind == 'list':
+        return ', '.join(value) if value else None
+    if kind == 'bool':
+        return 'Ja' if value else 'Nein'
+    return value
+
+
+def _header_row(sheet, headers):
+    cells = []
+    for header in headers:
+        cell = WriteOnlyCell(sheet, value=header)
+        cell.font = _HEADER_FONT
+        cell.fill = _HEADER_FILL
+        cell.alignment = Alignment(horizontal="center")
+        cells.append(cell)
+    return cells
+
+
+def _write_sheet(workbook, title, columns, rows, width):
+    sheet = workbook.create_sheet(title)
+    for index in range(len(columns) + 1):
+        sheet.column_dimensions[chr(65 + index)].width = width
+    sheet.append(_header_row(sheet, [ID_HEADER] + [header for header, _, _ in columns]))
+    for row in rows:
+        sheet.append([row['id']] + [_export_value(row[key], kind) for _, key, kind in columns])
+
+
+def write_project_workbook(project, communication_plan, path):
+    """Schreibt Projekt, Stakeholder und Matrix zeilenweise in eine XLSX-Datei"""
+    workbook = Workbook(write_only=True)
+
+    # Projektinformationen-Sheet
+    ws_project = workbook.create_sheet("Projektinformationen")
+    ws_project.column_dimensions['A'].width = 20
+    ws_project.column_dimensions['B'].width = 50
+    ws_project.append(["Projektname", project.name])
+    ws_project.append(["Beschreibung", project.description or 'Nicht angegeben'])
+    ws_project.append(["Erstellt am", project.created_at.strftime('%d.%m.%Y')])
+    ws_project.append(["Zuletzt aktualisiert", project.updated_at.strftime('%d.%m.%Y')])
+    if project.goals:
+        ws_project.append(["Projektziele", project.goals])
+
+    _write_sheet(
+        workbook, STAKEHOLDER_SHEET, STAKEHOLDER_COLUMNS,
+        stakeholder_rows.iter_rows(Stakeholder.project_id == project.id, order_by=Stakeholder.id),
+        20,
+    )
+    if communication_plan:
+        _write_sheet(
+            workbook, MATRIX_SHEET, MATRIX_COLUMNS,
+            matrix_rows.iter_rows(
+                CommunicationMatrix.communication_plan_id == communication_plan.id,
+                order_by=CommunicationMatrix.id,
+            ),
+            18,
+        )
+
+    workbook.save(path)
+
+
+# Import
+
+class WorkbookImportError(ValueError):
+    """Fehlerhafte Zellen; errors enthält die Meldungen je Zeile"""
+
+    def __init__(self, errors):
+        super().__init__(f'{len(errors)} invalid rows')
+        self.errors = errors
+
+
+def _import_value(value, kind):
+    if isinstance(value, str):
+        value = value.strip()
+        if value == '':
+            value = None
+    if kind == 'list':
+        if value is None:
+            return json.dumps([])
+        return json.dumps([part.strip() for part in str(value).split(',') if part.strip()])
+    if kind == 'bool':
+        if value is None:
+            return False
+        if isinstance(value, (bool, int, float)):
+            return bool(value)
+        normalized = value.casefold()
+        if normalized in ('ja', 'yes', 'true', 'x', '1'):
+            return True
+        if normalized in ('nein', 'no', 'false', '0'):
+            return False
+        raise ValueError(f'expected Ja or Nein, got {value!r}')
+    if value is None:
+        return None
+    if isinstance(value, float) and value.is_integer():
+        value = int(value)
+    return str(value)
+
+
+class _SheetImport:
+    """Wendet die Zeilen eines Sheets blockweise auf eine Tabelle an"""
+
+    def __init__(self, connection, model, columns, parent_column, parent_id, required=()):
+        self.connection = connection
+        self.model = model
+        self.columns = columns
+        self.parent_column = parent_column
+        self.parent_id = parent_id
+        self.required = required
+        self.sheet_name = None
+        self.seen_ids = set()
+        self.errors = []
+        self.error_count = 0
+        self.counts = {'inserted': 0, 'updated': 0, 'deleted': 0}
+        self._updates = []
+        self._inserts = []
+
+    def _error(self, row_number, message):
+        self.error_count += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append({'sheet': self.sheet_name, 'row': row_number, 'error': message})
+
+    def read(self, sheet):
+        self.sheet_name = sheet.title
+        rows = sheet.iter_rows(values_only=True)
+        header = next(rows, None)
+        if header is None:
+            return
+        positions = {str(value).strip(): index for index, value in enumerate(header) if value is not None}
+        columns = [(positions[title], key, kind) for title, key, kind in self.columns if title in positions]
+        id_position = positions.get(ID_HEADER)
+
+        for row_number, values in enumerate(rows, 2):
+            if not values or all(value is None or value == '' for value in values):
+                continue
+            record = {}
+            try:
+                for position, key, kind in columns:
+                    record[key] = _import_value(values[position] if position < len(values) else None, kind)
+                raw_id = values[id_position] if id_position is not None and id_position < len(values) else None
+                row_id = int(raw_id) if raw_id not in (None, '') else None
+            except (TypeError, ValueError) as e:
+                self._error(row_number, str(e))
+                continue
+
+            missing = [key for key in self.required if key in record and not record[key]]
+            if missing or (row_id is None and any(key not in record for key in self.required)):
+                self._error(row_number, f'missing required value: {", ".join(missing or self.required)}')
+                continue
+
+            if row_id is None:
+                self._inserts.append({self.parent_column.key: self.parent_id, **record})
+            else:
+                if row_id in self.seen_ids:
+                    self._error(row_number, f'duplicate ID {row_id}')
+                    continue
+                self.seen_ids.add(row_id)
+                self._updates.append((row_number, {'id': row_id, **record}))
+
+            if len(self._updates) + len(self._inserts) >= IMPORT_BATCH_SIZE:
+                self.flush()
+        self.flush()
+
+    def flush(self):
+        if self._updates:
+            ids = [record['id'] for _, record in self._updates]
+            owned = set(self.connection.execute(
+                select(self.model.id).where(self.model.id.in_(ids), self.parent_column == self.parent_id)
+            ).scalars())
+            updates = []
+            for row_number, record in self._updates:
+                if record['id'] in owned:
+                    updates.append(record)
+                else:
+                    self._error(row_number, f'ID {record["id"]} does not belong to this project')
+            # Nach dem ersten Fehler wird nur noch geprüft; die Transaktion wird ohnehin verworfen
+            if updates and not self.error_count:
+                self.connection.execute(
+                    update(self.model).where(self.model.id == bindparam('_id')).values(
+                        version=self.model.version + 1
+                    ),
+                    [{'_id': record.pop('id'), **record} for record in updates],
+                )
+            self.counts['updated'] += len(updates)
+            self._updates = []
+
+        if self._inserts:
+            if not self.error_count:
+                self.connection.execute(insert(self.model), self._inserts)
+            self.counts['inserted'] += len(self._inserts)
+            self._inserts = []
+
+    def delete_missing(self):
+        """Löscht Datensätze des Elternobjekts, die im Sheet nicht mehr vorkommen"""
+        existing = self.connection.execute(
+            select(self.model.id).where(self.parent_column == self.parent_id)
+        ).scalars().all()
+        missing = [row_id for row_id in existing if row_id not in self.seen_ids]
+        for start in range(0, len(missing), 500):
+            self.connection.execute(delete(self.model).where(self.model.id.in_(missing[start:start + 500])))
+        self.counts['deleted'] = len(missing)
+
+
+
+def import_project_workbook(connection, project_id, plan_id, file, delete_missing=False):
+    """Importiert Stakeholder- und Matrix-Sheet eines Workbooks in ein Projekt
+
+    Alle Änderungen laufen über connection in der Transaktion des Aufrufers.
+    Bei fehlerhaften Zeilen wird WorkbookImportError geworfen, der Aufrufer verwirft
+    dann die Transaktion. Liefert die Zahl der angelegten, geänderten und
+    gelöschten Zeilen je Tabelle.
+    """
+    workbook = load_workbook(file, read_only=True, data_only=True)
+    try:
+        imports = {}
+        if STAKEHOLDER_SHEET in workbook.sheetnames:
+            imports['stakeholders'] = _SheetImport(
+                connection, Stakeholder, STAKEHOLDER_COLUMNS, Stakeholder.project_id, project_id, required=('name',)
+            )
+            imports['stakeholders'].read(workbook[STAKEHOLDER_SHEET])
+
+        if MATRIX_SHEET in workbook.sheetnames:
+            if plan_id is None:
+                raise WorkbookImportError([{'sheet': MATRIX_SHEET, 'row': None, 'error': 'project has no communication plan'}])
+            imports['communication_matrix'] = _SheetImport(
+                connection, CommunicationMatrix, MATRIX_COLUMNS,
+                CommunicationMatrix.communication_plan_id, plan_id,
+            )
+            imports['communication_matrix'].read(workbook[MATRIX_SHEET])
+    finally:
+        workbook.close()
+
+    errors = [error for sheet_import in imports.values() for error in sheet_import.errors]
+    if errors:
+        raise WorkbookImportError(errors[:MAX_REPORTED_ERRORS])
+
+    if delete_missing:
+        # Matrix zuerst, damit Verknüpfungen gelöschter Stakeholder per Kaskade folgen
+        for name in ('communication_matrix', 'stakeholders'):
+            if name in imports:
+                imports[name].delete_missing()
+    if 'stakeholders' in imports:
+        refresh_identity_keys(connection, [project_id])
+    return {name: sheet_import.counts for name, sheet_import in imports.items()}
@@ -0,0 +1,123 @@
+from sqlalchemy import select
+from src.models.user import db
+from src.models.communication_plan import Stakeholder, CommunicationMatrix, matrix_stakeholders
+from src.services.matrix_links import normalize_name
+from collections import defaultdict
+import json
+
+# Leitet einen Entwurf der Kommunikationsmatrix aus den Präferenzen der
+# Stakeholder ab. Stakeholder mit gleichem Informationsbedarf, Kanal, Format
+# und gleicher Häufigkeit teilen sich einen Eintrag. Stakeholder, die im
+# Plan bereits einen Eintrag mit gleichem Sender, Inhalt, Kanal und gleicher
+# Häufigkeit empfangen (über matrix_stakeholders), werden nicht erneut
+# eingeplant; ein erneuter Lauf legt so nur Einträge für neu hinzugekommene
+# Empfänger an.
+
+DEFAULT_SENDER = 'Projektleiter'
+DEFAULT_CHANNEL = 'E-Mail'
+DEFAULT_FREQUENCY = 'Monatlich'
+
+# who_receiver ist String(100); größere Gruppen werden auf mehrere Einträge verteilt
+MAX_RECEIVER_LENGTH = 100
+
+HIGH_PRIORITY_TYPES = {'entscheidungen', 'risiko-updates', 'budget-updates', 'änderungsanträge'}
+CONFIRMATION_TYPES = {'entscheidungen', 'änderungsanträge'}
+
+
+def _json_list(value):
+    return json.loads(value) if value else []
+
+
+def _chunk_names(names):
+    """Teilt Namen so auf, dass jede Empfängerliste in who_receiver passt"""
+    chunk = []
+    length = 0
+    for name in names:
+        added = len(name) + (2 if chunk else 0)
+        if chunk and length + added > MAX_RECEIVER_LENGTH:
+            yield chunk
+            chunk = []
+            added = len(name)
+            length = 0
+        chunk.append(name)
+        length += added
+    if chunk:
+        yield chunk
+
+
+def _key(sender, need, channel, frequency):
+    return tuple(normalize_name(value) for value in (sender, need, channel, frequency))
+
+
+def _covered_receivers(plan):
+    """Bereits erreichte Stakeholder je (Sender, Inhalt, Kanal, Häufigkeit)"""
+    statement = select(
+        CommunicationMatrix.who_sender, CommunicationMatrix.what_content,
+        CommunicationMatrix.how_channel, CommunicationMatrix.when_frequency,
+        matrix_stakeholders.c.stakeholder_id,
+    ).join(matrix_stakeholders, matrix_stakeholders.c.matrix_id == CommunicationMatrix.id).where(
+        CommunicationMatrix.communication_plan_id == plan.id,
+        matrix_stakeholders.c.role == 'receiver',
+    )
+    covered = defaultdict(set)
+    for sender, need, channel, frequency, stakeholder_id in db.session.execute(statement):
+        covered[_key(sender, need, channel, frequency)].add(stakeholder_id)
+    return covered
+
+
+def generate_matrix(plan, sender=DEFAULT_SENDER):
+    """Erzeugt Matrixeinträge als Dicts für einen Kommunikationsplan
+
+    Liefert (Einträge, übersprungene Stakeholder, Zahl der Zuordnungen
+    Stakeholder/Inhalt, die der Plan bereits abdeckt). Der Bedarf eines Stakeholders wird, sofern der Plan
+    Informationstypen festlegt, auf diese eingeschränkt.
+    """
+    plan_types = _json_list(plan.information_types)
+    allowed = {value.casefold() for value in plan_types}
+
+    statement = select(
+        Stakeholder.id, Stakeholder.name, Stakeholder.information_needs,
+        Stakeholder.preferred_channels, Stakeholder.preferred_formats,
+        Stakeholder.communication_frequency,
+    ).where(Stakeholder.project_id == plan.project_id).order_by(Stakeholder.id)
+
+    groups = defaultdict(list)
+    skipped = []
+    for row in db.session.execute(statement):
+        needs = [need for need in _json_list(row.information_needs) if not allowed or need.casefold() in allowed]
+        if not needs:
+            skipped.append({'stakeholder_id': row.id, 'name': row.name, 'reason': 'no matching information needs'})
+            continue
+
+        channels = _json_list(row.preferred_channels)
+        formats = _json_list(row.preferred_formats)
+        channel = channels[0] if channels else DEFAULT_CHANNEL
+        format_ = formats[0] if formats else None
+        frequency = row.communication_frequency or DEFAULT_FREQUENCY
+        for need in needs:
+            groups[(need, channel, format_, frequency)].append((row.id, row.name))
+
+    covered = _covered_receivers(plan)
+    entries = []
+    duplicates = 0
+    for (need, channel, format_, frequency), members in sorted(groups.items(), key=lambda item: item[0][0]):
+        already = covered.get(_key(sender, need, channel, frequency), ())
+        names = [name for stakeholder_id, name in members if stakeholder_id not in already]
+        duplicates += len(members) - len(names)
+        for chunk in _chunk_names(names):
+            receiver = ', '.join(chunk)
+            entries.append({
+                'communication_plan_id': plan.id,
+                'who_sender': sender,
+                'who_receiver': receiver,
+                'what_content': need,
+                'when_frequency': frequency,
+                'when_timing': None,
+                'how_channel': channel,
+                'how_format': format_,
+                'why_purpose': f'{need} für {len(chunk)} Stakeholder gemäß Informationsbedarf',
+                'priority': 'Hoch' if need.casefold() in HIGH_PRIORITY_TYPES else 'Mittel',
+                'confirmation_required': need.casefold() in CONFIRMATION_TYPES,
+            })
+
+    return entries, skipped, duplicates
@@ -0,0 +1,169 @@
+from sqlalchemy import event, select, delete, insert, func, case
+from sqlalchemy.orm import Session
+from src.models.user import db
+from src.models.communication_plan import (
+    Stakeholder, CommunicationPlan, CommunicationMatrix, matrix_stakeholders
+)
+from collections import defaultdict
+import itertools
+import re
+
+# Die Freitext-Spalten who_sender/who_receiver werden auf Stakeholder des
+# Projekts aufgelöst und in matrix_stakeholders abgelegt. Ein Eintrag kann
+# mehrere Namen oder Rollen enthalten ("Projektleiter, Entwicklungsteam");
+# jeder Teil wird zuerst gegen Namen, dann gegen Rollen abgeglichen.
+
+_SEPARATORS = re.compile(r'\s*(?:[,;/&+]|\bund\b|\band\b)\s*')
+
+
+def normalize_name(value):
+    """Normalisiert Namen für den Abgleich (Groß-/Kleinschreibung, Leerraum)"""
+    return ' '.join((value or '').casefold().split())
+
+
+def split_names(value):
+    """Zerlegt eine Sender-/Empfängerangabe in normalisierte Teile"""
+    return [part for part in (normalize_name(part) for part in _SEPARATORS.split(value or '')) if part]
+
+
+class _ProjectDirectory:
+    """Stakeholder eines Projekts, nach normalisiertem Namen und Rolle indiziert"""
+
+    def __init__(self):
+        self.by_name = defaultdict(list)
+        self.by_role = defaultdict(list)
+
+    def add(self, stakeholder_id, name, role):
+        self.by_name[normalize_name(name)].append(stakeholder_id)
+        if role:
+            self.by_role[normalize_name(role)].append(stakeholder_id)
+
+    def resolve(self, value):
+        ids = []
+        for part in split_names(value):
+            ids.extend(self.by_name.get(part) or self.by_role.get(part) or ())
+        return set(ids)
+
+
+def relink_entries(connection, entry_ids=None, project_ids=None):
+    """Löst Sender und Empfänger der angegebenen Einträge bzw. Projekte neu auf"""
+    entries = select(
+        CommunicationMatrix.id, CommunicationPlan.project_id,
+        CommunicationMatrix.who_sender, CommunicationMatrix.who_receiver,
+    ).join(CommunicationPlan, CommunicationPlan.id == CommunicationMatrix.communication_plan_id)
+    if entry_ids is not None and project_ids is not None:
+        entries = entries.where(
+            CommunicationMatrix.id.in_(entry_ids) | CommunicationPlan.project_id.in_(project_ids)
+        )
+    elif entry_ids is not None:
+        entries = entries.where(CommunicationMatrix.id.in_(entry_ids))
+    elif project_ids is not None:
+        entries = entries.where(CommunicationPlan.project_id.in_(project_ids))
+    entries = connection.execute(entries).all()
+    if not entries:
+        return
+
+    directories = defaultdict(_ProjectDirectory)
+    stakeholders = select(Stakeholder.id, Stakeholder.project_id, Stakeholder.name, Stakeholder.role).where(
+        Stakeholder.project_id.in_({entry.project_id for entry in entries})
+    )
+    for stakeholder_id, project_id, name, role in connection.execute(stakeholders):
+        directories[project_id].add(stakeholder_id, name, role)
+
+    links = []
+    for entry in entries:
+        directory = directories[entry.project_id]
+        for role, value in (('sender', entry.who_sender), ('receiver', entry.who_receiver)):
+            links.extend(
+                {'matrix_id': entry.id, 'stakeholder_id': stakeholder_id, 'role': role}
+                for stakeholder_id in directory.resolve(value)
+            )
+
+    entry_ids = [entry.id for entry in entries]
+    for start in range(0, len(entry_ids), 500):
+        connection.execute(delete(matrix_stakeholders).where(
+            matrix_stakeholders.c.matrix_id.in_(entry_ids[start:start + 500])
+        ))
+    if links:
+        connection.execute(insert(matrix_stakeholders), links)
+
+
+def relink_all(connection):
+    """Migration: verknüpft alle bestehenden Matrixeinträge"""
+    project_ids = connection.execute(select(CommunicationPlan.project_id).distinct()).scalars().all()
+    for start in range(0, len(project_ids), 100):
+        relink_entries(connection, project_ids=project_ids[start:start + 100])
+
+
+@event.listens_for(Session, 'after_flush')
+def _relink_after_flush(session, flush_context):
+    """Hält die Verknüpfungen bei Änderungen an Matrix oder Stakeholdern aktuell"""
+    entry_ids = set()
+    project_ids = set()
+    removed_entries = set()
+    removed_stakeholders = set()
+    deleted = session.deleted
+
+    for obj in itertools.chain(session.new, session.dirty, deleted):
+        if isinstance(obj, CommunicationMatrix):
+            (removed_entries if obj in deleted else entry_ids).add(obj.id)
+        elif isinstance(obj, Stakeholder):
+            project_ids.add(obj.project_id)
+            if obj in deleted:
+                removed_stakeholders.add(obj.id)
+
+    if not (entry_ids or project_ids or removed_entries or removed_stakeholders):
+        return
+
+    connection = session.connection()
+    if removed_entries:
+        connection.execute(delete(matrix_stakeholders).where(matrix_stakeholders.c.matrix_id.in_(removed_entries)))
+    if removed_stakeholders:
+        connection.execute(delete(matrix_stakeholders).where(matrix_stakeholders.c.stakeholder_id.in_(removed_stakeholders)))
+    if entry_ids or project_ids:
+        relink_entries(connection, entry_ids=entry_ids or None, project_ids=project_ids or None)
+
+
+def coverage_report(project_id):
+    """Kommunikationslast je Stakeholder und nicht erreichte Stakeholder in einer Query"""
+    received = func.count(case((matrix_stakeholders.c.role == 'receiver', 1)))
+    sent = func.count(case((matrix_stakeholders.c.role == 'sender', 1)))
+    statement = (
+        select(Stakeholder.id, Stakeholder.name, Stakeholder.role, received.label('received'), sent.label('sent'))
+        .outerjoin(matrix_stakeholders, matrix_stakeholders.c.stakeholder_id == Stakeholder.id)
+        .where(Stakeholder.project_id == project_id)
+        .group_by(Stakeholder.id, Stakeholder.name, Stakeholder.role)
+        .order_by(received.desc(), Stakeholder.name)
+    )
+
+    load = []
+    uncovered = []
+    for row in db.session.execute(statement):
+        item = {
+            'stakeholder_id': row.id,
+            'name': row.name,
+            'role': row.role,
+            'received': row.received,
+            'sent': row.sent,
+        }
+        load.append(item)
+        if not row.received:
+            uncovered.append(item)
+
+    return {
+        'project_id': project_id,
+        'stakeholder_count': len(load),
+        'covered_count': len(load) - len(uncovered),
+        'uncovered': uncovered,
+        'load': load,
+    }
+
+
+def stakeholder_entry_ids(stakeholder_id, role=None):
+    """Select der Matrixeintrags-Ids eines Stakeholders über den Index (stakeholder_id, role)"""
+    statement = select(matrix_stakeholders.c.matrix_id).distinct().where(
+        matrix_stakeholders.c.stakeholder_id == stakeholder_id
+    )
+    if role is not None:
+        statement = statement.where(matrix_stakeholders.c.role == role)
+    return statement
@@ -0,0 +1,89 @@
+from sqlalchemy import event, select, delete, insert, inspect
+from sqlalchemy.orm import Session
+from src.models.user import db
+from src.models.communication_plan import Project, Stakeholder, CommunicationPlan, CommunicationMatrix
+from src.models.summaries import ProjectValidation
+from src.services.validation import validate_projects
+from src.services.analytics import materialized_enabled, refresh_project_analytics
+from datetime import datetime
+import itertools
+import json
+
+# Projektbezogene Zusammenfassungen werden nach jedem Flush nur für die
+# Projekte neu berechnet, deren Daten sich geändert haben. Schreibpfade, die
+# das ORM umgehen (Core-Bulk-Statements), rufen refresh_project_summaries
+# selbst auf.
+
+def refresh_project_summaries(connection, project_ids):
+    """Berechnet die gespeicherten Zusammenfassungen für project_ids neu
+
+    Gelöschte Projekte liefern keine Ergebnisse mehr, ihre Zusammenfassungen
+    werden dabei entfernt.
+    """
+    project_ids = [project_id for project_id in set(project_ids) if project_id is not None]
+    if not project_ids:
+        return
+
+    results = validate_projects(project_ids, connection=connection)
+    now = datetime.utcnow()
+
+    connection.execute(delete(ProjectValidation).where(ProjectValidation.project_id.in_(project_ids)))
+    if results:
+        connection.execute(insert(ProjectValidation), [
+            {
+                'project_id': project_id,
+                'completeness_score': result['completeness_score'],
+                'is_valid': result['is_valid'],
+                'errors': json.dumps(result['errors']),
+                'warnings': json.dumps(result['warnings']),
+                'recommendations': json.dumps(result['recommendations']),
+                'updated_at': now,
+            }
+            for project_id, result in results.items()
+        ])
+
+    if materialized_enabled():
+        refresh_project_analytics(connection, project_ids)
+
+
+def refresh_missing_summaries():
+    """Ergänzt Zusammenfassungen für Projekte, die noch keine haben"""
+    missing = select(Project.id).where(
+        Project.id.not_in(select(ProjectValidation.project_id))
+    )
+    project_ids = db.session.execute(missing).scalars().all()
+    if project_ids:
+        refresh_project_summaries(db.session.connection(), project_ids)
+        db.session.commit()
+
+
+def _previous_values(obj, attribute):
+    """Aktueller und ggf. vorheriger Wert eines Attributs"""
+    history = inspect(obj).attrs[attribute].history
+    return [value for value in itertools.chain(history.unchanged, history.added, history.deleted)]
+
+
+@event.listens_for(Session, 'after_flush')
+def _refresh_after_flush(session, flush_context):
+    """Sammelt die vom Flush betroffenen Projekte und aktualisiert deren Zusammenfassung"""
+    deleted = session.deleted
+    project_ids = set()
+    plan_ids = set()
+
+    for obj in itertools.chain(session.new, session.dirty, deleted):
+        if isinstance(obj, Project):
+            project_ids.add(obj.id)
+        elif isinstance(obj, (Stakeholder, CommunicationPlan)):
+            project_ids.update(_previous_values(obj, 'project_id'))
+        elif isinstance(obj, CommunicationMatrix):
+            plan_ids.update(_previous_values(obj, 'communication_plan_id'))
+
+    if not project_ids and not plan_ids:
+        return
+
+    connection = session.connection()
+    if plan_ids:
+        plan_projects = select(CommunicationPlan.project_id).where(CommunicationPlan.id.in_(plan_ids))
+        project_ids.update(connection.execute(plan_projects).scalars())
+
+    refresh_project_summaries(connection, project_ids)
@@ -0,0 +1,264 @@
+from sqlalchemy import select, update, func
+from flask import current_app
+from src.models.user import db
+from src.models.communication_plan import Project, Stakeholder, CommunicationPlan, CommunicationMatrix
+from src.models.revisions import ProjectRevision
+from src.models.rows import project_rows, stakeholder_rows, communication_plan_rows, matrix_rows
+import json
+import zlib
+
+# Revisionen speichern den Stand eines Projekt-Aggregats (Projekt, Plan,
+# Stakeholder, Matrix). Gespeichert wird nur das strukturelle Delta zur
+# vorherigen Revision. Ein komprimierter Vollstand (Keyframe) wird erst
+# geschrieben, wenn die Deltas seit dem letzten Keyframe zusammen so groß wie
+# ein Vollstand wären oder die Kette REVISION_KEYFRAME_INTERVAL Revisionen
+# erreicht. Der Speicherbedarf wächst so mit dem Umfang der Änderungen, und
+# die Rekonstruktion liest höchstens etwa zwei Vollstände.
+
+DEFAULT_KEYFRAME_INTERVAL = 50
+
+RECORDS = ('project', 'communication_plan')
+COLLECTIONS = ('stakeholders', 'communication_matrix')
+
+
+def project_snapshot(project_id):
+    """Aktueller Stand eines Projekt-Aggregats, Sammlungen nach Id indiziert"""
+    project = next(project_rows.iter_rows(Project.id == project_id), None)
+    if project is None:
+        return None
+
+    plan = next(communication_plan_rows.iter_rows(CommunicationPlan.project_id == project_id), None)
+    stakeholders = stakeholder_rows.iter_rows(Stakeholder.project_id == project_id, order_by=Stakeholder.id)
+    matrix = matrix_rows.iter_rows(
+        CommunicationMatrix.communication_plan_id == plan['id'], order_by=CommunicationMatrix.id
+    ) if plan else ()
+
+    # JSON-Objektschlüssel sind Strings, daher Ids von Anfang an als String
+    return {
+        'project': project,
+        'communication_plan': plan,
+        'stakeholders': {str(row['id']): row for row in stakeholders},
+        'communication_matrix': {str(row['id']): row for row in matrix},
+    }
+
+
+def _changed_fields(old, new):
+    changed = {key: value for key, value in new.items() if key not in old or old[key] != value}
+    removed = [key for key in old if key not in new]
+    return changed, removed
+
+
+def compute_delta(old, new):
+    """Strukturelles Delta, das old in new überführt"""
+    delta = {}
+    for section in RECORDS:
+        before, after = old[section], new[section]
+        if before == after:
+            continue
+        if before is None or after is None or before.get('id') != after.get('id'):
+            delta[section] = {'set': after}
+            continue
+        changed, removed = _changed_fields(before, after)
+        delta[section] = {'changed': changed, **({'removed_fields': removed} if removed else {})}
+
+    for section in COLLECTIONS:
+        before, after = old[section], new[section]
+        added = {key: record for key, record in after.items() if key not in before}
+        removed = [key for key in before if key not in after]
+        changed = {}
+        for key, record in after.items():
+            previous = before.get(key)
+            if previous is not None and previous != record:
+                fields, removed_fields = _changed_fields(previous, record)
+                changed[key] = {'changed': fields, **({'removed_fields': removed_fields} if removed_fields else {})}
+        section_delta = {
+            name: value for name, value in (('added', added), ('removed', removed), ('changed', changed)) if value
+        }
+        if section_delta:
+            delta[section] = section_delta
+    return delta
+
+
+def _apply_fields(record, change):
+    record = dict(record)
+    record.update(change.get('changed', {}))
+    for key in change.get('removed_fields', ()):
+        record.pop(key, None)
+    return record
+
+
+def apply_delta(state, delta):
+    """Wendet ein Delta auf einen Stand an und liefert den neuen Stand"""
+    state = dict(state)
+    for section in RECORDS:
+        change = delta.get(section)
+        if change is None:
+            continue
+        state[section] = change['set'] if 'set' in change else _apply_fields(state[section], change)
+
+    for section in COLLECTIONS:
+        change = delta.get(section)
+        if change is None:
+            continue
+        records = dict(state[section])
+        for key in change.get('removed', ()):
+            records.pop(key, None)
+        for key, fields in change.get('changed', {}).items():
+            records[key] = _apply_fields(records[key], fields)
+        records.update(change.get('added', {}))
+        state[section] = records
+    return state
+
+
+def _encode(value):
+    return zlib.compress(json.dumps(value, separators=(',', ':')).encode('utf-8'), 9)
+
+
+def _decode(data):
+    return json.loads(zlib.decompress(data))
+
+
+def reconstruct_revision(project_id, number):
+    """Stand einer Revision aus dem letzten Keyframe und den folgenden Deltas"""
+    keyframe = select(func.max(ProjectRevision.number)).where(
+        ProjectRevision.project_id == project_id,
+        ProjectRevision.is_keyframe.is_(True),
+        ProjectRevision.number <= number,
+    ).scalar_subquery()
+    rows = db.session.execute(
+        select(ProjectRevision.number, ProjectRevision.is_keyframe, ProjectRevision.data)
+        .where(
+            ProjectRevision.project_id == project_id,
+            ProjectRevision.number >= keyframe,
+            ProjectRevision.number <= number,
+        )
+        .order_by(ProjectRevision.number)
+    ).all()
+    if not rows or rows[-1].number != number:
+        return None
+
+    state = _decode(rows[0].data)
+    for row in rows[1:]:
+        state = apply_delta(state, _decode(row.data))
+    return state
+
+
+def list_revisions(project_id):
+    """Metadaten aller Revisionen ohne die gespeicherten Daten zu laden"""
+    statement = select(
+        ProjectRevision.id, ProjectRevision.number, ProjectRevision.label,
+        ProjectRevision.created_at, ProjectRevision.is_keyframe,
+        func.length(ProjectRevision.data).label('stored_bytes'),
+    ).where(ProjectRevision.project_id == project_id).order_by(ProjectRevision.number)
+    return [
+        {
+            'id': row.id,
+            'project_id': project_id,
+            'number': row.number,
+            'label': row.label,
+            'created_at': row.created_at.isoformat() if row.created_at else None,
+            'is_keyframe': row.is_keyframe,
+            'stored_bytes': row.stored_bytes,
+        }
+        for row in db.session.execute(statement)
+    ]
+
+
+def _lock_project(project_id):
+    """Sperrt das Projekt bis zum Ende der Transaktion für andere Schreiber
+
+    Ein UPDATE ohne Änderung: PostgreSQL sperrt die Zeile, SQLite nimmt die
+    Schreibsperre der Datenbank. Gleichzeitige Revisionen desselben
+    Projekts lesen die letzte Nummer so erst, wenn die vorherige committet
+    ist. Liefert False, wenn es das Projekt nicht gibt.
+    """
+    result = db.session.execute(
+        update(Project).where(Project.id == project_id).values(updated_at=Project.updated_at)
+    )
+    return result.rowcount > 0
+
+
+def record_revision(project_id, label=None):
+    """Legt eine Revision des aktuellen Stands an
+
+    Liefert (Revision, angelegt). Ist der Stand seit der letzten Revision
+    unverändert, wird keine neue angelegt und die letzte zurückgegeben. Die
+    Revision wird der Session hinzugefügt, aber nicht committet; das
+    Projekt bleibt bis zum Commit gesperrt.
+    """
+    if not _lock_project(project_id):
+        return None, False
+    snapshot = project_snapshot(project_id)
+    if snapshot is None:
+        return None, False
+
+    interval = current_app.config.get('REVISION_KEYFRAME_INTERVAL', DEFAULT_KEYFRAME_INTERVAL)
+    latest = db.session.execute(
+        select(ProjectRevision)
+        .where(ProjectRevision.project_id == project_id)
+        .order_by(ProjectRevision.number.desc())
+        .limit(1)
+    ).scalar_one_or_none()
+
+    full = _encode(snapshot)
+    data, is_keyframe = full, True
+    if latest is not None:
+        previous = reconstruct_revision(project_id, latest.number)
+        if previous == snapshot:
+            return latest, False
+
+        delta = _encode(compute_delta(previous, snapshot))
+        keyframe = select(func.max(ProjectRevision.number)).where(
+            ProjectRevision.project_id == project_id, ProjectRevision.is_keyframe.is_(True)
+        ).scalar_subquery()
+        chain_length, chain_bytes = db.session.execute(
+            select(func.count(), func.coalesce(func.sum(func.length(ProjectRevision.data)), 0))
+            .where(ProjectRevision.project_id == project_id, ProjectRevision.number > keyframe)
+        ).one()
+        if chain_length + 1 < interval and chain_bytes + len(delta) < len(full):
+            data, is_keyframe = delta, False
+
+    revision = ProjectRevision(
+        project_id=project_id,
+        number=latest.number + 1 if latest is not None else 1,
+        label=label,
+        is_keyframe=is_keyframe,
+        data=data,
+    )
+    db.session.add(revision)
+    return revision, True
+
+
+def describe_diff(old, new):
+    """Strukturelle Differenz zweier Stände mit alten und neuen Werten"""
+    def fields(before, after):
+        return {
+            key: {'from': before.get(key), 'to': after.get(key)}
+            for key in before.keys() | after.keys()
+            if before.get(key) != after.get(key)
+        }
+
+    diff = {}
+    for section in RECORDS:
+        before, after = old[section], new[section]
+        if before == after:
+            continue
+        if before is None or after is None or before.get('id') != after.get('id'):
+            diff[section] = {'from': before, 'to': after}
+        else:
+            diff[section] = {'changed': fields(before, after)}
+
+    for section in COLLECTIONS:
+        before, after = old[section], new[section]
+        section_diff = {
+            'added': [record for key, record in after.items() if key not in before],
+            'removed': [record for key, record in before.items() if key not in after],
+            'changed': [
+                {'id': record['id'], 'fields': fields(before[key], record)}
+                for key, record in after.items()
+                if key in before and before[key] != record
+            ],
+        }
+        if any(section_diff.values()):
+            diff[section] = section_diff
+    return diff
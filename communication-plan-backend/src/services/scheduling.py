@@ -0,0 +1,296 @@
+from sqlalchemy import select
+from src.models.user import db
+from src.models.communication_plan import Stakeholder, matrix_stakeholders
+from src.services.calendar import WEEKDAYS, parse_timezone
+from datetime import datetime, time, timedelta, timezone
+from collections import defaultdict, deque, namedtuple
+from functools import lru_cache
+import bisect
+import re
+
+# Terminfinder: Die Freitext-Verfügbarkeit der Stakeholder ("Mo-Fr 09:00-17:00",
+# "Di, Do 8-12 Uhr; Fr 9-11") wird in ein Wochenmuster übersetzt, in der
+# Zeitzone des Stakeholders über den Zeitraum expandiert und nach UTC
+# normalisiert. Stakeholder mit gleicher Verfügbarkeit und Zeitzone werden
+# als Gruppe nur einmal expandiert. Ein Sweep über die Intervallgrenzen
+# liefert die Zahl verfügbarer Teilnehmer je Abschnitt.
+
+# Ohne (erkennbare) Angabe: übliche Arbeitszeit
+DEFAULT_DAYS = (0, 1, 2, 3, 4)
+DEFAULT_HOURS = (9 * 60, 17 * 60)
+
+_DAY_LOOKUP = {name: index for index, names in enumerate(WEEKDAYS) for name in names}
+_DAY_LOOKUP['so'] = 6  # im Kalender mehrdeutig ("so früh"), in Verfügbarkeiten üblich
+_DAY_GROUPS = {
+    'werktags': DEFAULT_DAYS,
+    'wochentags': DEFAULT_DAYS,
+    'weekdays': DEFAULT_DAYS,
+    'täglich': tuple(range(7)),
+    'daily': tuple(range(7)),
+    'wochenende': (5, 6),
+    'weekend': (5, 6),
+}
+
+_CLAUSE_SEPARATOR = re.compile(r'[;\n|]')
+_TIME_RANGE = re.compile(
+    r'\b([01]?\d|2[0-4])(?:[:.]([0-5]\d))?\s*(?:uhr)?\s*(?:-|–|bis|to)\s*'
+    r'([01]?\d|2[0-4])(?:[:.]([0-5]\d))?\s*(?:uhr)?'
+)
+_DAY_RANGE = re.compile(r'([a-zäöü]+)\.?\s*(?:-|–|bis|to)\s*([a-zäöü]+)')
+_WORD = re.compile(r'[a-zäöü]+')
+
+Group = namedtuple('Group', 'key attendees intervals starts')
+
+
+def _days(text):
+    days = set()
+    for first, last in _DAY_RANGE.findall(text):
+        if first in _DAY_LOOKUP and last in _DAY_LOOKUP:
+            start, end = _DAY_LOOKUP[first], _DAY_LOOKUP[last]
+            days.update((start + offset) % 7 for offset in range((end - start) % 7 + 1))
+    for word in _WORD.findall(text):
+        if word in _DAY_LOOKUP:
+            days.add(_DAY_LOOKUP[word])
+        elif word in _DAY_GROUPS:
+            days.update(_DAY_GROUPS[word])
+    return days
+
+
+@lru_cache(maxsize=1024)
+def parse_availability(text):
+    """Wochenmuster als Tupel (Wochentag, Beginn, Ende) in Minuten lokaler Zeit
+
+    Liefert (Muster, angenommen); angenommen ist True, wenn nichts erkannt
+    wurde und die übliche Arbeitszeit gilt. Abschnitte ohne Tage gelten
+    werktags, Abschnitte ohne Uhrzeit ganztägig zur Arbeitszeit. Endet ein
+    Zeitraum vor seinem Beginn, reicht er über Mitternacht.
+    """
+    pattern = set()
+    for clause in _CLAUSE_SEPARATOR.split((text or '').casefold()):
+        ranges = []
+        for start_hour, start_minute, end_hour, end_minute in _TIME_RANGE.findall(clause):
+            start = int(start_hour) * 60 + int(start_minute or 0)
+            end = int(end_hour) * 60 + int(end_minute or 0)
+            if end <= start:
+                end += 24 * 60
+            if start < 24 * 60:
+                ranges.append((start, end))
+
+        days = _days(_TIME_RANGE.sub(' ', clause))
+        if not ranges and not days:
+            continue
+        for day in days or DEFAULT_DAYS:
+            for start, end in ranges or [DEFAULT_HOURS]:
+                pattern.add((day, start, end))
+
+    if not pattern:
+        return tuple((day, *DEFAULT_HOURS) for day in DEFAULT_DAYS), True
+    return tuple(sorted(pattern)), False
+
+
+def _merge(intervals):
+    merged = []
+    for start, end in sorted(intervals):
+        if merged and start <= merged[-1][1]:
+            if end > merged[-1][1]:
+                merged[-1][1] = end
+        else:
+            merged.append([start, end])
+    return [tuple(interval) for interval in merged]
+
+
+def _local_days(tzinfo, start, end):
+    """(Wochentag, lokale Mitternacht, Tag und Zeitzone bei Zeitumstellung) je Tag des Zeitraums
+
+    Einen Tag Rand, da lokale Tage gegenüber UTC verschoben sind. Nur wenn
+    am Tag oder am Folgetag (Zeiträume über Mitternacht) die Uhr umgestellt
+    wird, wird jede Uhrzeit einzeln lokalisiert.
+    """
+    first = start.date() - timedelta(days=1)
+    count = (end.date() - first).days + 2
+    midnights = [
+        datetime.combine(first + timedelta(days=offset), time(0), tzinfo).timestamp() for offset in range(count + 2)
+    ]
+    days = []
+    for offset in range(count):
+        day = first + timedelta(days=offset)
+        regular = midnights[offset + 2] - midnights[offset] == 2 * 86400
+        days.append((day.weekday(), midnights[offset], None if regular else (day, tzinfo)))
+    return days
+
+
+def _expand(pattern, local_days, start, end):
+    """UTC-Intervalle (Epoch-Sekunden) eines Wochenmusters, auf [start, end) beschnitten"""
+    lower, upper = start.timestamp(), end.timestamp()
+    by_weekday = defaultdict(list)
+    for weekday, begin, finish in pattern:
+        by_weekday[weekday].append((begin * 60, finish * 60))
+
+    intervals = []
+    for weekday, midnight, transition in local_days:
+        for begin, finish in by_weekday.get(weekday, ()):
+            if transition is None:
+                interval_start, interval_end = midnight + begin, midnight + finish
+            else:
+                day, tzinfo = transition
+                base = datetime.combine(day, time(0))
+                interval_start = (base + timedelta(seconds=begin)).replace(tzinfo=tzinfo).timestamp()
+                interval_end = (base + timedelta(seconds=finish)).replace(tzinfo=tzinfo).timestamp()
+            interval_start, interval_end = max(interval_start, lower), min(interval_end, upper)
+            if interval_start < interval_end:
+                intervals.append((interval_start, interval_end))
+    return _merge(intervals)
+
+
+def build_groups(attendees, start, end):
+    """Gruppiert Teilnehmer nach Verfügbarkeit und Zeitzone und expandiert jede Gruppe einmal"""
+    members = defaultdict(list)
+    for attendee in attendees:
+        tz_name, _ = parse_timezone(attendee.timezone)
+        members[((attendee.availability or '').strip(), tz_name)].append(attendee)
+
+    groups = []
+    calendars = {}
+    for (availability, tz_name), group_attendees in members.items():
+        if tz_name not in calendars:
+            calendars[tz_name] = _local_days(parse_timezone(tz_name)[1], start, end)
+        pattern, _ = parse_availability(availability)
+        intervals = _expand(pattern, calendars[tz_name], start, end)
+        groups.append(Group(
+            (availability, tz_name), group_attendees, intervals, [interval[0] for interval in intervals]
+        ))
+    return groups
+
+
+def _timeline(groups):
+    """Grenzpunkte und die Zahl verfügbarer Teilnehmer ab jedem Punkt
+
+    Liefert (Zeitpunkte, Zahlen, Beginne); Zahlen[i] gilt bis Zeitpunkte[i + 1],
+    Beginne sind die Indizes, an denen mindestens ein Intervall beginnt.
+    """
+    deltas = defaultdict(int)
+    opening = set()
+    for group in groups:
+        weight = len(group.attendees)
+        for start, end in group.intervals:
+            deltas[start] += weight
+            deltas[end] -= weight
+            opening.add(start)
+
+    instants = sorted(deltas)
+    counts = []
+    count = 0
+    for instant in instants:
+        count += deltas[instant]
+        counts.append(count)
+    return instants, counts, [index for index, instant in enumerate(instants) if instant in opening]
+
+
+def _upper_bounds(instants, counts, starts, seconds):
+    """Für jeden Intervallbeginn die kleinste Teilnehmerzahl im Fenster [Beginn, Beginn + Dauer)
+
+    Wer das ganze Fenster abdeckt, zählt an jedem Punkt darin mit; das
+    Minimum ist daher eine obere Schranke. Gleitendes Minimum, O(n).
+    """
+    bounds = []
+    window = deque()
+    last = -1
+    for index in starts:
+        end = instants[index] + seconds
+        while last + 1 < len(instants) and instants[last + 1] < end:
+            last += 1
+            while window and counts[window[-1]] >= counts[last]:
+                window.pop()
+            window.append(last)
+        while window[0] < index:
+            window.popleft()
+        bounds.append((counts[window[0]], instants[index]))
+    return bounds
+
+
+def _covering(groups, start, end):
+    """Gruppen, die [start, end) vollständig abdecken, und ihr gemeinsames Intervall"""
+    covering = []
+    common_start, common_end = float('-inf'), float('inf')
+    for group in groups:
+        index = bisect.bisect_right(group.starts, start) - 1
+        if index >= 0 and group.intervals[index][1] >= end:
+            covering.append(group)
+            common_start = max(common_start, group.intervals[index][0])
+            common_end = min(common_end, group.intervals[index][1])
+    return covering, (common_start, common_end)
+
+
+def find_slots(attendees, start, end, duration, limit=10, min_attendees=1):
+    """Beste gemeinsame Zeitfenster der Teilnehmer in [start, end)
+
+    Ein Fenster ist der Zeitraum, in dem eine Gruppe von Teilnehmern
+    gemeinsam verfügbar ist, mindestens duration lang. Da ein bestes Fenster
+    immer mit dem Beginn eines Verfügbarkeitsintervalls beginnen kann, werden
+    nur diese Zeitpunkte geprüft, in absteigender Reihenfolge ihrer oberen
+    Schranke, bis keine bessere mehr folgen kann. Sortiert nach Zahl der
+    verfügbaren Teilnehmer, dann Beginn.
+    """
+    groups = build_groups(attendees, start, end)
+    seconds = duration.total_seconds()
+    instants, counts, starts = _timeline(groups)
+    bounds = sorted(_upper_bounds(instants, counts, starts, seconds), key=lambda item: (-item[0], item[1]))
+
+    slots = {}
+    ranked = []
+    for bound, slot_start in bounds:
+        if bound < max(min_attendees, 1):
+            break
+        if len(ranked) >= limit and bound < ranked[limit - 1][0]:
+            break
+        covering, window = _covering(groups, slot_start, slot_start + seconds)
+        available = sum(len(group.attendees) for group in covering)
+        if available < min_attendees or window in slots:
+            continue
+        slots[window] = covering
+        ranked.append((available, window))
+        ranked.sort(key=lambda item: (-item[0], item[1]))
+
+    return [_slot_to_dict(window, slots[window], groups) for _, window in ranked[:limit]]
+
+
+def _isoformat(timestamp):
+    return datetime.fromtimestamp(timestamp, timezone.utc).isoformat().replace('+00:00', 'Z')
+
+
+def _slot_to_dict(run, covering, groups):
+    covering_keys = {group.key for group in covering}
+    missing = [
+        attendee for group in groups if group.key not in covering_keys for attendee in group.attendees
+    ]
+    return {
+        'start': _isoformat(run[0]),
+        'end': _isoformat(run[1]),
+        'duration_minutes': int((run[1] - run[0]) // 60),
+        'available_count': sum(len(group.attendees) for group in covering),
+        'missing': [{'stakeholder_id': attendee.id, 'name': attendee.name} for attendee in missing],
+    }
+
+
+def entry_attendees(entry_id, include_sender=False):
+    """Verknüpfte Empfänger (optional auch Sender) eines Matrixeintrags"""
+    roles = ('receiver', 'sender') if include_sender else ('receiver',)
+    statement = select(
+        Stakeholder.id, Stakeholder.name, Stakeholder.timezone, Stakeholder.availability
+    ).where(
+        Stakeholder.id.in_(
+            select(matrix_stakeholders.c.stakeholder_id).where(
+                matrix_stakeholders.c.matrix_id == entry_id, matrix_stakeholders.c.role.in_(roles)
+            )
+        )
+    ).order_by(Stakeholder.id)
+    return db.session.execute(statement).all()
+
+
+def assumed_availability(attendees):
+    """Teilnehmer, für die keine Verfügbarkeit erkannt wurde (Standard-Arbeitszeit angenommen)"""
+    return [
+        {'stakeholder_id': attendee.id, 'name': attendee.name}
+        for attendee in attendees
+        if parse_availability((attendee.availability or '').strip())[1]
+    ]
@@ -0,0 +1,392 @@
+from sqlalchemy import (
+    MetaData, Table, Column, String, DateTime, create_engine, select, insert, update, delete, func
+)
+from sqlalchemy.engine import make_url
+from sqlalchemy.schema import CreateSchema, DropSchema
+from flask import current_app, g, request, jsonify
+from flask.cli import AppGroup
+from src.models.user import db
+from src.models.migrations import prepare_database, sync_sequence
+from collections import OrderedDict
+from datetime import datetime
+import click
+import os
+import re
+import threading
+import time
+
+# Mandantenfähiges Routing: Jeder Mandant (Header X-Tenant) hat eine eigene
+# Datenbank. Shards sind URL-Vorlagen in TENANT_SHARDS; enthält die URL
+# '{tenant}', bekommt jeder Mandant eine eigene Datenbank (z.B. eine
+# SQLite-Datei), sonst ein eigenes Schema (PostgreSQL). Welcher Shard einen
+# Mandanten hält, steht im Katalog tenant_placements der Standarddatenbank.
+# Anfragen ohne Mandant verwenden weiterhin die Standarddatenbank. Mandanten
+# werden nur über die CLI angelegt (flask tenants create); unbekannte
+# Mandanten im Header werden mit 404 abgewiesen.
+
+TENANT_KEY = re.compile(r'^[a-z0-9][a-z0-9_-]{0,62}$')
+
+DEFAULT_CACHE_SIZE = 32
+# Sekunden, die eine zwischengespeicherte Zuordnung Mandant -> Shard gilt;
+# move_tenant wartet nach dem Markieren so lange, bis alle Prozesse den Umzug sehen
+DEFAULT_PLACEMENT_TTL = 5.0
+COPY_BATCH_SIZE = 1000
+
+# Katalog nur in der Standarddatenbank, daher eigene Metadaten
+catalog_metadata = MetaData()
+
+tenant_placements = Table(
+    'tenant_placements', catalog_metadata,
+    Column('tenant', String(63), primary_key=True),
+    Column('shard', String(50), nullable=False),
+    Column('status', String(20), nullable=False, default='active'),  # active, moving
+    Column('updated_at', DateTime, default=datetime.utcnow, onupdate=datetime.utcnow),
+)
+
+
+class TenantUnavailable(Exception):
+    """Mandant wird gerade verschoben"""
+
+
+class UnknownTenant(Exception):
+    """Mandant ist nicht im Katalog eingetragen"""
+
+
+def _schema_name(tenant):
+    return 'tenant_' + tenant.replace('-', '_')
+
+
+class TenantRouter:
+    """Löst Mandanten auf Engines auf; Engines werden per LRU zwischengespeichert
+
+    Der Cache hält je Mandant Shard und Engine. Die Zuordnung aus dem
+    Katalog gilt höchstens placement_ttl Sekunden, danach wird sie erneut
+    gelesen; nach einem Umzug wird so die Engine des neuen Shards verwendet.
+    Neue Engines werden außerhalb der Cache-Sperre angelegt und vorbereitet
+    (Migrationen), damit andere Mandanten nicht warten; verdrängt werden nur
+    Engines ohne ausgeliehene Verbindungen.
+    """
+
+    def __init__(self, shards, default_shard, capacity=DEFAULT_CACHE_SIZE, placement_ttl=DEFAULT_PLACEMENT_TTL):
+        if default_shard not in shards:
+            raise ValueError(f'Unknown default shard: {default_shard}')
+        for name, url in shards.items():
+            if '{tenant}' not in url and make_url(url).get_backend_name() == 'sqlite':
+                raise ValueError(f'SQLite shard {name} needs a {{tenant}} placeholder in its URL')
+
+        self.shards = shards
+        self.default_shard = default_shard
+        self.capacity = capacity
+        self.placement_ttl = placement_ttl
+        self._engines = OrderedDict()  # Mandant -> (Shard, Engine, Zeitpunkt der Katalogprüfung)
+        self._prepared = set()
+        self._lock = threading.RLock()
+        self._tenant_locks = {}
+
+    def create_engine(self, shard, tenant):
+        """Neue Engine für einen Mandanten auf einem Shard"""
+        url = self.shards[shard]
+        if '{tenant}' in url:
+            url = make_url(url.format(tenant=tenant))
+            if url.get_backend_name() == 'sqlite' and url.database:
+                os.makedirs(os.path.dirname(os.path.abspath(url.database)), exist_ok=True)
+            return create_engine(url)
+
+        # Gemeinsame Datenbank, ein Schema je Mandant über den search_path
+        schema = _schema_name(tenant)
+        engine = create_engine(url, connect_args={'options': f'-csearch_path={schema}'})
+        with engine.begin() as connection:
+            connection.execute(CreateSchema(schema, if_not_exists=True))
+        return engine
+
+    def placement(self, tenant):
+        """Eintrag im Katalog oder None für unbekannte Mandanten"""
+        with db.engines[None].connect() as connection:
+            return connection.execute(
+                select(tenant_placements).where(tenant_placements.c.tenant == tenant)
+            ).first()
+
+    def _cached(self, tenant):
+        """Engine aus dem Cache, solange die Zuordnung nicht abgelaufen ist"""
+        with self._lock:
+            entry = self._engines.get(tenant)
+            if entry is None or time.monotonic() - entry[2] > self.placement_ttl:
+                return None
+            self._engines.move_to_end(tenant)
+            return entry[1]
+
+    def engine_for(self, tenant):
+        """Engine des Mandanten
+
+        Wirft UnknownTenant für Mandanten ohne Katalogeintrag und
+        TenantUnavailable während eines Umzugs.
+        """
+        engine = self._cached(tenant)
+        if engine is not None:
+            return engine
+
+        # Je Mandant nur ein Aufbau gleichzeitig, andere Mandanten laufen weiter
+        with self._lock:
+            tenant_lock = self._tenant_locks.setdefault(tenant, threading.Lock())
+        with tenant_lock:
+            engine = self._cached(tenant)
+            if engine is not None:
+                return engine
+
+            placement = self.placement(tenant)
+            if placement is None:
+                self.discard(tenant)
+                raise UnknownTenant(f'Unknown tenant: {tenant}')
+            if placement.status != 'active':
+                self.discard(tenant)
+                raise TenantUnavailable(f'Tenant {tenant} is being moved')
+            key = (tenant, placement.shard)
+
+            with self._lock:
+                entry = self._engines.get(tenant)
+                if entry is not None and entry[0] == placement.shard:
+                    self._engines[tenant] = (entry[0], entry[1], time.monotonic())
+                    self._engines.move_to_end(tenant)
+                    return entry[1]
+                prepared = key in self._prepared
+
+            engine = self.create_engine(placement.shard, tenant)
+            if not prepared:
+                try:
+                    prepare_database(engine)
+                except Exception:
+                    engine.dispose()
+                    raise
+
+            with self._lock:
+                previous = self._engines.pop(tenant, None)
+                self._prepared.add(key)
+                self._engines[tenant] = (placement.shard, engine, time.monotonic())
+                self._evict()
+            if previous is not None:
+                previous[1].dispose()
+            return engine
+
+    def _evict(self):
+        for tenant in list(self._engines):
+            if len(self._engines) <= self.capacity:
+                break
+            engine = self._engines[tenant][1]
+            if engine.pool.checkedout() == 0:
+                del self._engines[tenant]
+                self._tenant_locks.pop(tenant, None)
+                engine.dispose()
+
+    def discard(self, tenant):
+        """Verwirft Engine, zwischengespeicherte Zuordnung und Aufbausperre eines Mandanten"""
+        with self._lock:
+            entry = self._engines.pop(tenant, None)
+            self._tenant_locks.pop(tenant, None)
+            self._prepared = {key for key in self._prepared if key[0] != tenant}
+        if entry is not None:
+            entry[1].dispose()
+
+    def cached_tenants(self):
+        with self._lock:
+            return [{'tenant': tenant, 'shard': entry[0]} for tenant, entry in self._engines.items()]
+
+
+def get_router():
+    return current_app.extensions['tenancy']
+
+
+def _select_tenant():
+    """before_request: Mandant aus dem Header lesen und seine Engine für die Session ablegen"""
+    tenant = request.headers.get(current_app.config.get('TENANT_HEADER', 'X-Tenant'))
+    if not tenant:
+        return None
+    if not TENANT_KEY.match(tenant):
+        return jsonify({'error': 'Invalid tenant key'}), 400
+    try:
+        g.tenant_engine = get_router().engine_for(tenant)
+    except UnknownTenant as e:
+        return jsonify({'error': str(e)}), 404
+    except TenantUnavailable as e:
+        response = jsonify({'error': str(e)})
+        response.status_code = 503
+        response.headers['Retry-After'] = '30'
+        return response
+    g.tenant = tenant
+    return None
+
+
+def _lock_source(connection):
+    """Sperrt die Quelle für Schreibzugriffe, bis die Kopie abgeschlossen ist
+
+    SQLite: BEGIN IMMEDIATE auf einer AUTOCOMMIT-Connection; sonst
+    Tabellensperren in der Transaktion der Connection (serverseitige Cursor
+    brauchen eine Transaktion). Aufheben mit _unlock_source.
+    """
+    if connection.dialect.name == 'sqlite':
+        connection.exec_driver_sql('BEGIN IMMEDIATE')
+    else:
+        preparer = connection.dialect.identifier_preparer
+        for table in db.metadata.sorted_tables:
+            connection.exec_driver_sql(f'LOCK TABLE {preparer.format_table(table)} IN SHARE MODE')
+
+
+def _unlock_source(connection):
+    if connection.dialect.name == 'sqlite':
+        connection.exec_driver_sql('ROLLBACK')
+    else:
+        connection.rollback()
+
+
+def move_tenant(tenant, target_shard, drop_source=False):
+    """Verschiebt einen Mandanten auf einen anderen Shard
+
+    Der Mandant wird im Katalog als 'moving' markiert (Anfragen erhalten
+    503), die Quelle für Schreibzugriffe gesperrt und alle Tabellen in
+    Blöcken in den Ziel-Shard kopiert. Erst nach Prüfung der Zeilenzahlen
+    zeigt der Katalog auf den neuen Shard. Liefert die kopierten Zeilen je
+    Tabelle.
+    """
+    router = get_router()
+    if target_shard not in router.shards:
+        raise ValueError(f'Unknown shard: {target_shard}')
+    placement = router.placement(tenant)
+    if placement is None:
+        raise ValueError(f'Unknown tenant: {tenant}')
+    if placement.status != 'active':
+        raise TenantUnavailable(f'Tenant {tenant} is already being moved')
+    if placement.shard == target_shard:
+        raise ValueError(f'Tenant {tenant} is already on shard {target_shard}')
+
+    catalog = db.engines[None]
+
+    def set_placement(**values):
+        with catalog.begin() as connection:
+            connection.execute(
+                update(tenant_placements)
+                .where(tenant_placements.c.tenant == tenant)
+                .values(updated_at=datetime.utcnow(), **values)
+            )
+
+    set_placement(status='moving')
+    router.discard(tenant)
+    # Andere Prozesse verwenden ihre zwischengespeicherte Zuordnung noch bis
+    # zum Ablauf; erst danach schreibt niemand mehr in die Quelle
+    time.sleep(router.placement_ttl)
+    source = router.create_engine(placement.shard, tenant)
+    target = router.create_engine(target_shard, tenant)
+    try:
+        prepare_database(target)
+        counts = {}
+        with source.connect() as source_connection, target.begin() as target_connection:
+            if source_connection.dialect.name == 'sqlite':
+                source_connection = source_connection.execution_options(isolation_level='AUTOCOMMIT')
+            _lock_source(source_connection)
+            try:
+                if target_connection.execute(select(func.count()).select_from(db.metadata.tables['projects'])).scalar():
+                    raise ValueError(f'Shard {target_shard} already holds data for tenant {tenant}')
+                for table in reversed(db.metadata.sorted_tables):
+                    target_connection.execute(delete(table))
+
+                for table in db.metadata.sorted_tables:
+                    rows = source_connection.execute(
+                        select(table).execution_options(yield_per=COPY_BATCH_SIZE)
+                    ).mappings()
+                    copied = 0
+                    for batch in rows.partitions():
+                        target_connection.execute(insert(table), [dict(row) for row in batch])
+                        copied += len(batch)
+                    expected = source_connection.execute(select(func.count()).select_from(table)).scalar()
+                    if copied != expected:
+                        raise RuntimeError(f'Copied {copied} of {expected} rows from {table.name}')
+                    sync_sequence(target_connection, table)
+                    counts[table.name] = copied
+            finally:
+                _unlock_source(source_connection)
+    except Exception:
+        set_placement(status='active')
+        raise
+    finally:
+        target.dispose()
+
+    set_placement(shard=target_shard, status='active')
+    router.discard(tenant)
+    if drop_source:
+        _drop_database(source, tenant)
+    source.dispose()
+    return counts
+
+
+def create_tenant(tenant, shard=None):
+    """Trägt einen Mandanten im Katalog ein und legt seine Datenbank an"""
+    router = get_router()
+    if not TENANT_KEY.match(tenant):
+        raise ValueError(f'Invalid tenant key: {tenant}')
+    shard = shard or router.default_shard
+    if shard not in router.shards:
+        raise ValueError(f'Unknown shard: {shard}')
+    if router.placement(tenant) is not None:
+        raise ValueError(f'Tenant {tenant} already exists')
+
+    with db.engines[None].begin() as connection:
+        connection.execute(insert(tenant_placements).values(
+            tenant=tenant, shard=shard, status='active', updated_at=datetime.utcnow()
+        ))
+    router.engine_for(tenant)
+
+
+def _drop_database(engine, tenant):
+    """Entfernt die Daten eines Mandanten aus seinem alten Shard"""
+    if engine.dialect.name == 'sqlite':
+        engine.dispose()
+        database = engine.url.database
+        if database and os.path.exists(database):
+            os.remove(database)
+    else:
+        with engine.begin() as connection:
+            connection.execute(DropSchema(_schema_name(tenant), cascade=True))
+
+
+tenants_cli = AppGroup('tenants', help='Mandanten und Shards verwalten')
+
+
+@tenants_cli.command('list')
+def list_tenants_command():
+    """Mandanten mit ihrem Shard auflisten"""
+    with db.engines[None].connect() as connection:
+        for row in connection.execute(select(tenant_placements).order_by(tenant_placements.c.tenant)):
+            click.echo(f'{row.tenant}\t{row.shard}\t{row.status}')
+
+
+@tenants_cli.command('create')
+@click.argument('tenant')
+@click.option('--shard', default=None, help='Shard des Mandanten (Standard: TENANT_DEFAULT_SHARD)')
+def create_tenant_command(tenant, shard):
+    """Mandanten anlegen"""
+    create_tenant(tenant, shard)
+    click.echo(f'{tenant} -> {shard or get_router().default_shard}')
+
+
+@tenants_cli.command('move')
+@click.argument('tenant')
+@click.argument('shard')
+@click.option('--drop-source', is_flag=True, help='Daten im alten Shard nach erfolgreicher Kopie löschen')
+def move_tenant_command(tenant, shard, drop_source):
+    """Mandanten auf einen anderen Shard verschieben"""
+    counts = move_tenant(tenant, shard, drop_source=drop_source)
+    for table, count in counts.items():
+        click.echo(f'{table}: {count}')
+    click.echo(f'{tenant} -> {shard}')
+
+
+def init_tenancy(app):
+    """Registriert Routing, Katalog und CLI für eine App"""
+    app.extensions['tenancy'] = TenantRouter(
+        app.config['TENANT_SHARDS'],
+        app.config['TENANT_DEFAULT_SHARD'],
+        app.config.get('TENANT_ENGINE_CACHE_SIZE', DEFAULT_CACHE_SIZE),
+        app.config.get('TENANT_PLACEMENT_TTL', DEFAULT_PLACEMENT_TTL),
+    )
+    with app.app_context():
+        catalog_metadata.create_all(db.engine)
+    app.before_request(_select_tenant)
+    app.cli.add_command(tenants_cli)
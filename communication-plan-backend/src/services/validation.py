@@ -0,0 +1,173 @@
+from sqlalchemy import select, func, case, and_, or_
+from src.models.user import db
+from src.models.communication_plan import Project, Stakeholder, CommunicationPlan, CommunicationMatrix
+
+IMPORTANT_ROLES = ['projektleiter', 'sponsor', 'auftraggeber']
+
+
+def _is_blank(column):
+    return or_(column.is_(None), func.trim(column) == '')
+
+
+def _project_statement(project_ids):
+    """Projekt-, Plan- und Matrixkennzahlen je Projekt in einer Query"""
+    matrix_counts = (
+        select(
+            CommunicationMatrix.communication_plan_id.label('plan_id'),
+            func.count().label('matrix_count'),
+        )
+        .group_by(CommunicationMatrix.communication_plan_id)
+        .subquery()
+    )
+    statement = (
+        select(
+            Project.id,
+            Project.name,
+            func.length(func.trim(Project.description)).label('description_length'),
+            CommunicationPlan.id.label('plan_id'),
+            and_(
+                CommunicationPlan.information_types.is_not(None),
+                CommunicationPlan.information_types.not_in(['', '[]']),
+            ).label('has_information_types'),
+            and_(
+                CommunicationPlan.effectiveness_metrics.is_not(None),
+                CommunicationPlan.effectiveness_metrics != '',
+            ).label('has_effectiveness_metrics'),
+            func.coalesce(matrix_counts.c.matrix_count, 0).label('matrix_count'),
+        )
+        .outerjoin(CommunicationPlan, CommunicationPlan.project_id == Project.id)
+        .outerjoin(matrix_counts, matrix_counts.c.plan_id == CommunicationPlan.id)
+        .order_by(Project.id)
+    )
+    if project_ids is not None:
+        statement = statement.where(Project.id.in_(project_ids))
+    return statement
+
+
+def _string_agg(dialect_name, value, separator):
+    """Verkettung über eine Gruppe: group_concat in SQLite, string_agg sonst"""
+    if dialect_name == 'sqlite':
+        return func.group_concat(value, separator)
+    return func.string_agg(value, separator)
+
+
+def _stakeholder_statement(project_ids, dialect_name='sqlite'):
+    """Stakeholder-Kennzahlen je Projekt in einer aggregierenden Query"""
+    incomplete = or_(_is_blank(Stakeholder.role), _is_blank(Stakeholder.name))
+    role = func.lower(Stakeholder.role)
+    columns = [
+        Stakeholder.project_id,
+        func.count().label('stakeholder_count'),
+        _string_agg(
+            dialect_name,
+            case((incomplete, func.coalesce(func.nullif(Stakeholder.name, ''), 'Unbenannter Stakeholder'))),
+            ', ',
+        ).label('incomplete_names'),
+    ]
+    for important_role in IMPORTANT_ROLES:
+        columns.append(
+            func.max(case((role.contains(important_role), 1), else_=0)).label(important_role)
+        )
+    statement = select(*columns).group_by(Stakeholder.project_id)
+    if project_ids is not None:
+        statement = statement.where(Stakeholder.project_id.in_(project_ids))
+    return statement
+
+
+def _evaluate(project, stakeholders):
+    """Bewertet die aggregierten Kennzahlen eines Projekts"""
+    validation_results = {
+        'project_id': project.id,
+        'is_valid': True,
+        'warnings': [],
+        'errors': [],
+        'completeness_score': 0,
+        'recommendations': []
+    }
+
+    total_checks = 0
+    passed_checks = 0
+
+    # Projekt-Validierung
+    total_checks += 2
+    if not project.name or len(project.name.strip()) < 3:
+        validation_results['errors'].append('Projektname muss mindestens 3 Zeichen lang sein')
+        validation_results['is_valid'] = False
+    else:
+        passed_checks += 1
+
+    if not project.description_length or project.description_length < 10:
+        validation_results['warnings'].append('Projektbeschreibung sollte aussagekräftiger sein (mindestens 10 Zeichen)')
+    else:
+        passed_checks += 1
+
+    # Stakeholder-Validierung
+    total_checks += 3
+    if stakeholders is None:
+        validation_results['errors'].append('Mindestens ein Stakeholder muss definiert werden')
+        validation_results['is_valid'] = False
+    else:
+        passed_checks += 1
+
+        if stakeholders.incomplete_names:
+            validation_results['warnings'].append(f'Unvollständige Stakeholder-Informationen: {stakeholders.incomplete_names}')
+        else:
+            passed_checks += 1
+
+        missing_roles = [role for role in IMPORTANT_ROLES if not getattr(stakeholders, role)]
+        if missing_roles:
+            validation_results['recommendations'].append(f'Wichtige Stakeholder-Rollen fehlen möglicherweise: {", ".join(missing_roles)}')
+        else:
+            passed_checks += 1
+
+    # Kommunikationsplan-Validierung
+    total_checks += 2
+    if project.plan_id is None:
+        validation_results['warnings'].append('Kommunikationsplan-Details sind nicht vollständig ausgefüllt')
+    else:
+        if project.has_information_types:
+            passed_checks += 1
+        else:
+            validation_results['warnings'].append('Informationstypen sollten definiert werden')
+
+        if project.has_effectiveness_metrics:
+            passed_checks += 1
+        else:
+            validation_results['warnings'].append('Metriken zur Kommunikationseffektivität sollten definiert werden')
+
+    # Kommunikationsmatrix-Validierung
+    total_checks += 1
+    if project.plan_id is not None:
+        if not project.matrix_count:
+            validation_results['warnings'].append('Kommunikationsmatrix ist leer - definieren Sie Kommunikationsregeln')
+        else:
+            passed_checks += 1
+
+    # Vollständigkeits-Score berechnen
+    validation_results['completeness_score'] = round((passed_checks / total_checks) * 100, 1)
+
+    # Empfehlungen basierend auf Score
+    if validation_results['completeness_score'] < 60:
+        validation_results['recommendations'].append('Der Kommunikationsplan benötigt noch wesentliche Ergänzungen')
+    elif validation_results['completeness_score'] < 80:
+        validation_results['recommendations'].append('Der Kommunikationsplan ist grundlegend vollständig, könnte aber noch verbessert werden')
+    else:
+        validation_results['recommendations'].append('Der Kommunikationsplan ist gut strukturiert und vollständig')
+
+    return validation_results
+
+
+def validate_projects(project_ids=None, connection=None):
+    """Validiert Projekte mengenbasiert mit zwei Queries, unabhängig von ihrer Anzahl
+
+    Ohne project_ids werden alle Projekte geprüft. Liefert ein Dict
+    project_id -> Validierungsergebnis in der Form von validate_project.
+    """
+    executor = connection if connection is not None else db.session.connection()
+    stakeholders = {
+        row.project_id: row for row in executor.execute(_stakeholder_statement(project_ids, executor.dialect.name))
+    }
+    return {
+        project.id: _evaluate(project, stakeholders.get(project.id))
+        for project in executor.execute(_project_statement(project_ids))
+    }
@@ -0,0 +1,166 @@
+import functools
+import math
+import threading
+import time
+from collections import deque
+from flask import current_app, jsonify
+
+# Zulassungskontrolle für rechenintensive Endpunkte. Jede Endpunktklasse
+# (z.B. export, bulk) hat eine feste Zahl gleichzeitiger Ausführungen und
+# eine begrenzte Warteschlange. Ist die Warteschlange voll oder wird die
+# Wartezeit überschritten, wird die Anfrage sofort mit 503 und Retry-After
+# abgewiesen, statt alle Worker zu blockieren. Die Grenzen gelten je Prozess.
+
+DEFAULT_LIMITS = {
+    'concurrency': 2,
+    'queue_size': 4,
+    'queue_timeout': 10.0,
+}
+
+
+class AdmissionRejected(Exception):
+    """Anfrage wurde abgewiesen; retry_after in Sekunden"""
+
+    def __init__(self, reason, retry_after):
+        super().__init__(reason)
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+class _Ticket:
+    __slots__ = ('granted',)
+
+    def __init__(self):
+        self.granted = False
+
+
+class AdmissionController:
+    """Begrenzt gleichzeitige Ausführungen mit FIFO-Warteschlange
+
+    Frei werdende Plätze werden direkt an den ältesten Wartenden übergeben,
+    neu eintreffende Anfragen können sich also nicht vordrängen.
+    """
+
+    def __init__(self, name, concurrency, queue_size, queue_timeout):
+        self.name = name
+        self.concurrency = concurrency
+        self.queue_size = queue_size
+        self.queue_timeout = queue_timeout
+
+        self._condition = threading.Condition()
+        self._waiting = deque()
+        self._active = 0
+        self._admitted = 0
+        self._queued = 0
+        self._rejected_queue_full = 0
+        self._rejected_timeout = 0
+        self._service_time = None  # gleitender Mittelwert in Sekunden
+
+    def _retry_after(self):
+        service_time = self._service_time or 1.0
+        backlog = len(self._waiting) + 1
+        return max(1, math.ceil(service_time * backlog / self.concurrency))
+
+    def acquire(self):
+        """Belegt einen Platz oder wirft AdmissionRejected"""
+        with self._condition:
+            if self._active < self.concurrency and not self._waiting:
+                self._active += 1
+                self._admitted += 1
+                return
+
+            if len(self._waiting) >= self.queue_size:
+                self._rejected_queue_full += 1
+                raise AdmissionRejected('queue full', self._retry_after())
+
+            ticket = _Ticket()
+            self._waiting.append(ticket)
+            self._queued += 1
+            self._condition.wait_for(lambda: ticket.granted, timeout=self.queue_timeout)
+            if not ticket.granted:
+                self._waiting.remove(ticket)
+                self._rejected_timeout += 1
+                raise AdmissionRejected('queue timeout', self._retry_after())
+            self._admitted += 1
+
+    def release(self, duration=None):
+        """Gibt einen Platz frei und übergibt ihn ggf. an den nächsten Wartenden"""
+        with self._condition:
+            if duration is not None:
+                self._service_time = duration if self._service_time is None else (
+                    0.8 * self._service_time + 0.2 * duration
+                )
+            if self._waiting:
+                self._waiting.popleft().granted = True
+                self._condition.notify_all()
+            else:
+                self._active -= 1
+
+    def metrics(self):
+        with self._condition:
+            return {
+                'concurrency': self.concurrency,
+                'queue_size': self.queue_size,
+                'queue_timeout': self.queue_timeout,
+                'active': self._active,
+                'queue_depth': len(self._waiting),
+                'admitted': self._admitted,
+                'queued': self._queued,
+                'rejected_queue_full': self._rejected_queue_full,
+                'rejected_timeout': self._rejected_timeout,
+                'avg_service_seconds': round(self._service_time, 3) if self._service_time is not None else None,
+            }
+
+
+_registry_lock = threading.Lock()
+
+
+def get_controller(name):
+    """Controller einer Endpunktklasse, Grenzen aus ADMISSION_LIMITS"""
+    controllers = current_app.extensions.setdefault('admission', {})
+    controller = controllers.get(name)
+    if controller is None:
+        with _registry_lock:
+            controller = controllers.get(name)
+            if controller is None:
+                limits = {**DEFAULT_LIMITS, **current_app.config.get('ADMISSION_LIMITS', {}).get(name, {})}
+                controller = controllers[name] = AdmissionController(name, **limits)
+    return controller
+
+
+def admission_metrics():
+    """Kennzahlen aller bisher verwendeten Endpunktklassen"""
+    controllers = current_app.extensions.get('admission', {})
+    return {name: controller.metrics() for name, controller in sorted(controllers.items())}
+
+
+def admission_controlled(name):
+    """Decorator: View nur innerhalb der Grenzen der Endpunktklasse ausführen"""
+    def decorator(view):
+        @functools.wraps(view)
+        def wrapper(*args, **kwargs):
+            controller = get_controller(name)
+            try:
+                controller.acquire()
+            except AdmissionRejected as e:
+                response = jsonify({'error': f'Server busy ({e.reason}), please retry later'})
+                response.status_code = 503
+                response.headers['Retry-After'] = str(e.retry_after)
+                return response
+
+            started = time.monotonic()
+            try:
+                response = current_app.make_response(view(*args, **kwargs))
+            except BaseException:
+                controller.release(time.monotonic() - started)
+                raise
+
+            # Generator-Antworten arbeiten noch nach dem View, Platz erst am Ende
+            # freigeben; Dateiantworten (send_file) sind bereits fertig erzeugt
+            if response.is_streamed and not response.direct_passthrough:
+                response.call_on_close(lambda: controller.release(time.monotonic() - started))
+            else:
+                controller.release(time.monotonic() - started)
+            return response
+        return wrapper
+    return decorator
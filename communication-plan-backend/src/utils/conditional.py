@@ -0,0 +1,35 @@
+from flask import jsonify, request
+
+# Bedingte Anfragen: Die ETag eines Projekts, Stakeholders,
+# Kommunikationsplans oder Matrixeintrags ist seine Versionsnummer. PUT mit
+# If-Match schreibt nur, wenn die Version noch passt, sonst 412 mit der
+# aktuellen ETag. Ohne If-Match (oder mit *) wird wie bisher unbedingt
+# geschrieben.
+
+
+def expected_versions():
+    """Versionen aus If-Match oder None für ein unbedingtes Update
+
+    Schwache und nicht numerische ETags passen nie; eine leere Menge führt
+    damit zu 412.
+    """
+    if_match = request.if_match
+    if not if_match or if_match.star_tag:
+        return None
+    return {int(tag) for tag in if_match.as_set() if tag.isdigit()}
+
+
+def with_etag(response, version):
+    """Setzt die Version als starke ETag"""
+    response.set_etag(str(version))
+    return response
+
+
+def version_conflict(conflict):
+    """Antwort 412 mit der aktuellen Version"""
+    response = jsonify({
+        'error': 'Precondition failed: resource was modified',
+        'current_version': conflict.current_version,
+    })
+    response.status_code = 412
+    return with_etag(response, conflict.current_version)
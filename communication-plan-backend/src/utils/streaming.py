@@ -0,0 +1,99 @@
+import itertools
+import zlib
+from flask import Response, current_app, request, stream_with_context
+
+try:
+    import brotli
+except ImportError:  # Brotli ist optional, ohne Paket wird nur gzip angeboten
+    brotli = None
+
+DEFAULT_COMPRESS_MIN_SIZE = 1024
+CHUNK_SIZE = 16 * 1024
+
+
+def iter_json_array(items):
+    """Kodiert eine Folge von Dicts stückweise als JSON-Array"""
+    dumps = current_app.json.dumps
+    buffer = ['[']
+    size = 1
+    separator = ''
+
+    for item in items:
+        encoded = dumps(item, separators=(',', ':'))
+        buffer.append(separator)
+        buffer.append(encoded)
+        size += len(encoded) + 1
+        separator = ','
+
+        if size >= CHUNK_SIZE:
+            yield ''.join(buffer).encode('utf-8')
+            buffer = []
+            size = 0
+
+    buffer.append(']')
+    yield ''.join(buffer).encode('utf-8')
+
+
+def _negotiate_encoding():
+    """Wählt die beste vom Client akzeptierte Kompression"""
+    accepted = request.accept_encodings
+    if brotli is not None and accepted['br']:
+        return 'br'
+    if accepted['gzip']:
+        return 'gzip'
+    return None
+
+
+def _compress(chunks, encoding):
+    """Komprimiert einen Chunk-Strom, jeder Chunk wird sofort geflusht"""
+    if encoding == 'br':
+        compressor = brotli.Compressor(quality=5)
+        compress, flush, finish = compressor.process, compressor.flush, compressor.finish
+    else:
+        compressor = zlib.compressobj(6, zlib.DEFLATED, 31)
+        compress = compressor.compress
+        flush = lambda: compressor.flush(zlib.Z_SYNC_FLUSH)
+        finish = compressor.flush
+
+    for chunk in chunks:
+        data = compress(chunk) + flush()
+        if data:
+            yield data
+    yield finish()
+
+
+def stream_json(items, status=200):
+    """Liefert eine Collection als gestreamtes JSON-Array
+
+    Antworten unterhalb von JSON_COMPRESS_MIN_SIZE werden unverändert in einem
+    Stück gesendet, größere Antworten werden mit der ausgehandelten Kompression
+    direkt aus dem Cursor gestreamt.
+    """
+    threshold = current_app.config.get('JSON_COMPRESS_MIN_SIZE', DEFAULT_COMPRESS_MIN_SIZE)
+    chunks = iter_json_array(items)
+
+    # Ersten Chunk noch im View lesen, damit Fehler im Aufrufer landen
+    head = []
+    size = 0
+    for chunk in chunks:
+        head.append(chunk)
+        size += len(chunk)
+        if size >= threshold:
+            break
+    else:
+        return Response(b''.join(head), status=status, mimetype='application/json')
+
+    return stream_chunks(itertools.chain(head, chunks), 'application/json', status)
+
+
+def stream_chunks(chunks, mimetype, status=200):
+    """Streamt bereits kodierte Chunks mit der ausgehandelten Kompression"""
+    encoding = _negotiate_encoding()
+    if encoding:
+        chunks = _compress(chunks, encoding)
+
+    response = Response(stream_with_context(chunks), status=status, mimetype=mimetype)
+    response.headers['Vary'] = 'Accept-Encoding'
+    if encoding:
+        response.headers['Content-Encoding'] = encoding
+    return response
@@ -0,0 +1,43 @@
+import os
+import sys
+sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
+
+import pytest
+from flask import Flask
+from src.models.user import db
+from src.models.migrations import prepare_database
+from src.routes.projects import projects_bp
+from src.routes.stakeholders import stakeholders_bp
+from src.routes.communication_plans import communication_plans_bp
+from src.routes.revisions import revisions_bp
+
+
+def create_app(directory, **config):
+    """Anwendung mit eigener, leerer SQLite-Datenbank (nicht src/database/app.db)"""
+    app = Flask(__name__)
+    app.config['TESTING'] = True
+    app.config['SQLALCHEMY_DATABASE_URI'] = f"sqlite:///{directory / 'app.db'}"
+    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    app.config.update(config)
+    app.register_blueprint(projects_bp, url_prefix='/api')
+    app.register_blueprint(stakeholders_bp, url_prefix='/api')
+    app.register_blueprint(communication_plans_bp, url_prefix='/api')
+    app.register_blueprint(revisions_bp, url_prefix='/api')
+    db.init_app(app)
+    with app.app_context():
+        prepare_database()
+    return app
+
+
+@pytest.fixture
+def app(tmp_path):
+    app = create_app(tmp_path)
+    with app.app_context():
+        yield app
+        db.session.remove()
+        db.engine.dispose()
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
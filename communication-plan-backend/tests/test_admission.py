@@ -0,0 +1,12 @@
+from src.utils.admission import admission_metrics
+
+
+def test_bulk_matrix_import_is_admission_controlled(client):
+    project_id = client.post('/api/projects', json={'name': 'Bulk'}).get_json()['id']
+    plan_id = client.post(f'/api/projects/{project_id}/communication-plan', json={}).get_json()['id']
+
+    response = client.post(f'/api/communication-plans/{plan_id}/matrix/bulk', json={'entries': [
+        {'who_sender': 'PMO', 'who_receiver': 'Team', 'what_content': 'Status'},
+    ]})
+    assert response.status_code == 201, response.get_json()
+    assert admission_metrics()['bulk']['admitted'] == 1
@@ -0,0 +1,24 @@
+from src.models.user import db
+from src.models.communication_plan import Project
+from src.models.summaries import ProjectValidation
+
+
+def test_bulk_delete_rejects_booleans(client):
+    project_id = client.post('/api/projects', json={'name': 'Eins'}).get_json()['id']
+    assert project_id == 1
+
+    response = client.post('/api/projects/bulk-delete', json={'project_ids': [True]})
+    assert response.status_code == 400
+    response = client.post(f'/api/projects/{project_id}/stakeholders/bulk-delete', json={'stakeholder_ids': [False]})
+    assert response.status_code == 400
+    assert db.session.get(Project, project_id) is not None
+
+
+def test_bulk_delete_refreshes_summaries_of_all_chunks(client):
+    ids = [client.post('/api/projects', json={'name': f'P{index}'}).get_json()['id'] for index in range(3)]
+    # Mehr als ein Block zu 500 Ids, die gelöschten Projekte liegen im letzten
+    response = client.post('/api/projects/bulk-delete', json={'project_ids': list(range(10000, 10600)) + ids[:2]})
+    assert response.get_json() == {'deleted': 2}
+
+    remaining = db.session.execute(db.select(ProjectValidation.project_id)).scalars().all()
+    assert remaining == [ids[2]]
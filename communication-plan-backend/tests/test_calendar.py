@@ -0,0 +1,17 @@
+from datetime import timedelta
+
+import pytest
+from src.services.calendar import parse_timezone, DEFAULT_TIMEZONE
+
+
+@pytest.mark.parametrize('value', ['UTC+25', 'UTC+24:30', 'GMT-24', 'UTC+5:75'])
+def test_out_of_range_offsets_fall_back_to_default(value):
+    assert parse_timezone(value) == parse_timezone(None)
+    assert parse_timezone(value)[0] == DEFAULT_TIMEZONE
+
+
+def test_valid_offsets_are_parsed():
+    name, tzinfo = parse_timezone('UTC+5:30 (IST)')
+    assert name == 'UTC+5:30 (IST)'
+    assert tzinfo.utcoffset(None) == timedelta(hours=5, minutes=30)
+    assert parse_timezone('GMT-23:59')[1].utcoffset(None) == -timedelta(hours=23, minutes=59)
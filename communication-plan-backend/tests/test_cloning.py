@@ -0,0 +1,48 @@
+from sqlalchemy import select
+from src.models.user import db
+from src.models.communication_plan import (
+    Stakeholder, CommunicationPlan, CommunicationMatrix, matrix_stakeholders
+)
+
+
+def _links(project_id):
+    """Verknüpfungen eines Projekts als (Inhalt, Stakeholder, Rolle)"""
+    statement = (
+        select(CommunicationMatrix.what_content, Stakeholder.name, matrix_stakeholders.c.role)
+        .join(matrix_stakeholders, matrix_stakeholders.c.matrix_id == CommunicationMatrix.id)
+        .join(Stakeholder, Stakeholder.id == matrix_stakeholders.c.stakeholder_id)
+        .join(CommunicationPlan, CommunicationPlan.id == CommunicationMatrix.communication_plan_id)
+        .where(CommunicationPlan.project_id == project_id, Stakeholder.project_id == project_id)
+    )
+    return sorted(db.session.execute(statement).tuples())
+
+
+def test_clone_maps_links_to_copied_rows(client):
+    project_id = client.post('/api/projects', json={'name': 'Vorlage'}).get_json()['id']
+    ids = [
+        client.post(f'/api/projects/{project_id}/stakeholders', json={'name': name, 'role': role}).get_json()['id']
+        for name, role in [('Anna', 'Sponsor'), ('Ben', 'Team'), ('Clara', 'Team'), ('David', 'PMO')]
+    ]
+    # Lücke in den Ids, damit Position und Id auseinanderfallen
+    client.delete(f'/api/stakeholders/{ids[1]}')
+    plan_id = client.post(f'/api/projects/{project_id}/communication-plan', json={}).get_json()['id']
+    client.post(f'/api/communication-plans/{plan_id}/matrix/bulk', json={'entries': [
+        {'who_sender': 'David', 'who_receiver': 'Anna', 'what_content': 'Entscheidungen'},
+        {'who_sender': 'Anna', 'who_receiver': 'Team', 'what_content': 'Status'},
+        {'who_sender': 'PMO', 'who_receiver': 'Clara, Anna', 'what_content': 'Risiken'},
+    ]})
+    expected = _links(project_id)
+    assert len(expected) == 7
+
+    response = client.post(f'/api/projects/{project_id}/clone', json={'name': 'Kopie'})
+    assert response.status_code == 201, response.get_json()
+    clone_id = response.get_json()['id']
+
+    assert _links(clone_id) == expected
+    source_ids = set(db.session.execute(select(Stakeholder.id).where(Stakeholder.project_id == project_id)).scalars())
+    clone_ids = set(db.session.execute(select(Stakeholder.id).where(Stakeholder.project_id == clone_id)).scalars())
+    assert len(clone_ids) == 3 and not source_ids & clone_ids
+
+    # Nach dem Klonen lassen sich weiter Zeilen anlegen
+    response = client.post(f'/api/projects/{clone_id}/stakeholders', json={'name': 'Eve'})
+    assert response.status_code == 201, response.get_json()
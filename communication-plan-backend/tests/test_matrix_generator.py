@@ -0,0 +1,73 @@
+from src.models.user import db
+from src.models.communication_plan import CommunicationMatrix
+
+
+def _setup(client):
+    project_id = client.post('/api/projects', json={'name': 'Rollout'}).get_json()['id']
+    for name, needs, channels in [
+        ('Anna', ['Entscheidungen', 'Status'], ['E-Mail']),
+        ('Ben', ['Status'], ['E-Mail']),
+        ('Clara', ['Status'], ['Teams']),
+    ]:
+        response = client.post(f'/api/projects/{project_id}/stakeholders', json={
+            'name': name, 'information_needs': needs, 'preferred_channels': channels,
+        })
+        assert response.status_code == 201, response.get_json()
+    response = client.post(f'/api/projects/{project_id}/communication-plan', json={})
+    assert response.status_code == 201, response.get_json()
+    return project_id, response.get_json()['id']
+
+
+def _entries(plan_id):
+    return db.session.query(CommunicationMatrix).filter_by(communication_plan_id=plan_id).count()
+
+
+def test_second_generate_is_idempotent(client):
+    _, plan_id = _setup(client)
+
+    first = client.post(f'/api/communication-plans/{plan_id}/matrix/generate', json={})
+    assert first.status_code == 201, first.get_json()
+    assert first.get_json()['created'] == 3
+    assert _entries(plan_id) == 3
+
+    second = client.post(f'/api/communication-plans/{plan_id}/matrix/generate', json={})
+    assert second.status_code == 201, second.get_json()
+    assert second.get_json()['created'] == 0
+    # Anna: Entscheidungen und Status, Ben: Status, Clara: Status
+    assert second.get_json()['existing'] == 4
+    assert _entries(plan_id) == 3
+
+
+def test_generate_adds_only_new_suggestions(client):
+    project_id, plan_id = _setup(client)
+    client.post(f'/api/communication-plans/{plan_id}/matrix/generate', json={})
+
+    client.post(f'/api/projects/{project_id}/stakeholders', json={
+        'name': 'David', 'information_needs': ['Risiko-Updates'], 'preferred_channels': ['E-Mail'],
+    })
+    preview = client.post(f'/api/communication-plans/{plan_id}/matrix/generate', json={'dry_run': True}).get_json()
+    assert [entry['what_content'] for entry in preview['entries']] == ['Risiko-Updates']
+    assert preview['existing'] == 4
+
+    result = client.post(f'/api/communication-plans/{plan_id}/matrix/generate', json={}).get_json()
+    assert result['created'] == 1
+    assert _entries(plan_id) == 4
+
+
+def test_new_member_of_existing_group_gets_own_entry(client):
+    project_id, plan_id = _setup(client)
+    client.post(f'/api/communication-plans/{plan_id}/matrix/generate', json={})
+
+    client.post(f'/api/projects/{project_id}/stakeholders', json={
+        'name': 'Eve', 'information_needs': ['Status'], 'preferred_channels': ['E-Mail'],
+    })
+    result = client.post(f'/api/communication-plans/{plan_id}/matrix/generate', json={}).get_json()
+    assert result['created'] == 1
+    assert result['entries'][0]['who_receiver'] == 'Eve'
+
+    receivers = [
+        entry.who_receiver for entry in db.session.query(CommunicationMatrix).filter_by(
+            communication_plan_id=plan_id, what_content='Status', how_channel='E-Mail',
+        )
+    ]
+    assert sorted(receivers) == ['Anna, Ben', 'Eve']
@@ -0,0 +1,33 @@
+from concurrent.futures import ThreadPoolExecutor
+import threading
+
+from conftest import create_app
+from src.models.user import db
+
+
+def test_concurrent_revisions_get_distinct_numbers(tmp_path):
+    app = create_app(tmp_path)
+    client = app.test_client()
+    project_id = client.post('/api/projects', json={'name': 'Freigabe'}).get_json()['id']
+
+    # Jede Anfrage ändert das Projekt und hält danach eine Revision fest
+    barrier = threading.Barrier(8)
+
+    def release(index):
+        barrier.wait()
+        with app.test_client() as own:
+            own.put(f'/api/projects/{project_id}', json={'description': f'Stand {index}'})
+            return own.post(f'/api/projects/{project_id}/revisions', json={'label': f'R{index}'})
+
+    with ThreadPoolExecutor(8) as pool:
+        responses = list(pool.map(release, range(8)))
+
+    assert all(response.status_code in (200, 201) for response in responses), \
+        [response.get_json() for response in responses]
+    revisions = client.get(f'/api/projects/{project_id}/revisions').get_json()
+    numbers = [revision['number'] for revision in revisions]
+    assert numbers == list(range(1, len(numbers) + 1))
+    assert len(numbers) == sum(response.status_code == 201 for response in responses)
+
+    with app.app_context():
+        db.engine.dispose()
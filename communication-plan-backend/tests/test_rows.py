@@ -0,0 +1,114 @@
+from datetime import datetime
+import json
+
+from src.models.user import db
+from src.models.compressed import DEFAULT_THRESHOLD
+from src.models.communication_plan import Project, Stakeholder, CommunicationPlan, CommunicationMatrix
+from src.models.rows import project_rows, project_list_rows, stakeholder_rows, communication_plan_rows, matrix_rows
+
+# Der Core-Lesepfad muss exakt dieselben Dicts liefern wie to_dict()
+
+LONG_TEXT = 'Änderungen werden im Lenkungskreis abgestimmt. ' * (DEFAULT_THRESHOLD // 20)
+
+
+def _compare(serializer, model, *criteria):
+    db.session.expunge_all()
+    expected = [item.to_dict() for item in model.query.filter(*criteria).order_by(model.id)]
+    db.session.expunge_all()
+    actual = list(serializer.iter_rows(*criteria, order_by=model.id))
+    assert expected
+    assert actual == expected
+    # Auch die JSON-Ausgabe muss übereinstimmen (Typen, nicht nur Gleichheit)
+    assert json.dumps(actual, sort_keys=True) == json.dumps(expected, sort_keys=True)
+    return actual
+
+
+def _populate():
+    full = Project(
+        name='Migration', description='Kurz', charter=LONG_TEXT, goals='Ziele',
+        phases=json.dumps(['Analyse', 'Umsetzung']), milestones=json.dumps([{'name': 'Go-live'}]),
+        risk_management_plan=LONG_TEXT, created_at=datetime(2024, 5, 17, 8, 30, 15, 123456),
+    )
+    empty = Project(name='Leer', phases='', milestones=None)
+    db.session.add_all([full, empty])
+    db.session.flush()
+
+    db.session.add_all([
+        Stakeholder(
+            project_id=full.id, name='Anna Müller', role='Sponsor', department='IT',
+            contact_info='anna@example.com', information_needs=json.dumps(['Entscheidungen', 'Budget-Updates']),
+            preferred_channels=json.dumps(['E-Mail']), preferred_formats=json.dumps(['Bericht']),
+            communication_frequency='Wöchentlich', timezone='Europe/Berlin',
+        ),
+        Stakeholder(project_id=full.id, name='Ben', information_needs=None, preferred_channels=''),
+    ])
+    plan = CommunicationPlan(
+        project_id=full.id, company_guidelines=LONG_TEXT, available_technologies=json.dumps(['Teams']),
+        information_types=json.dumps(['Entscheidungen']), communication_budget=1250.5,
+        budget_breakdown='kurz', feedback_mechanisms=LONG_TEXT, effectiveness_metrics='NPS',
+    )
+    db.session.add(plan)
+    db.session.flush()
+    db.session.add_all([
+        CommunicationMatrix(
+            communication_plan_id=plan.id, who_sender='Projektleiter', who_receiver='Anna Müller',
+            what_content='Entscheidungen', how_channel='E-Mail', priority='Hoch', confirmation_required=True,
+        ),
+        CommunicationMatrix(communication_plan_id=plan.id, who_sender='PMO', what_content='Status'),
+    ])
+    db.session.commit()
+
+    # Ein Update erhöht die Version, die ebenfalls übereinstimmen muss
+    full.goals = 'Geänderte Ziele'
+    db.session.commit()
+    return full.id, plan.id
+
+
+def test_project_rows_match_to_dict(app):
+    project_id, _ = _populate()
+    rows = _compare(project_rows, Project)
+    row = next(row for row in rows if row['id'] == project_id)
+    assert row['version'] == 2
+    assert row['charter'] == LONG_TEXT
+    assert row['milestones'] == [{'name': 'Go-live'}]
+    assert row['created_at'] == '2024-05-17T08:30:15.123456'
+    assert rows[1]['phases'] == [] and rows[1]['milestones'] == []
+
+
+def test_compressed_text_is_stored_compressed(app):
+    project_id, plan_id = _populate()
+    stored = db.session.execute(
+        db.select(db.func.typeof(Project.charter), db.func.typeof(Project.goals)).where(Project.id == project_id)
+    ).one()
+    assert tuple(stored) == ('blob', 'text')
+    _compare(communication_plan_rows, CommunicationPlan, CommunicationPlan.id == plan_id)
+
+
+def test_stakeholder_rows_match_to_dict(app):
+    project_id, _ = _populate()
+    rows = _compare(stakeholder_rows, Stakeholder, Stakeholder.project_id == project_id)
+    assert rows[0]['information_needs'] == ['Entscheidungen', 'Budget-Updates']
+    assert rows[1]['information_needs'] == [] and rows[1]['preferred_channels'] == []
+
+
+def test_communication_plan_rows_match_to_dict(app):
+    _, plan_id = _populate()
+    (row,) = _compare(communication_plan_rows, CommunicationPlan, CommunicationPlan.id == plan_id)
+    assert row['company_guidelines'] == LONG_TEXT
+    assert row['communication_budget'] == 1250.5
+    assert row['updated_at'] is not None
+
+
+def test_matrix_rows_match_to_dict(app):
+    _, plan_id = _populate()
+    rows = _compare(matrix_rows, CommunicationMatrix, CommunicationMatrix.communication_plan_id == plan_id)
+    assert rows[0]['confirmation_required'] is True
+    assert rows[1]['confirmation_required'] is False
+
+
+def test_project_list_rows_extend_project_rows(app):
+    _populate()
+    rows = list(project_list_rows.iter_rows(order_by=Project.id))
+    assert [{key: value for key, value in row.items() if key != 'completeness_score'} for row in rows] \
+        == list(project_rows.iter_rows(order_by=Project.id))
+    assert all(isinstance(row['completeness_score'], (int, float)) for row in rows)
@@ -0,0 +1,61 @@
+import os
+
+import pytest
+from conftest import create_app
+from src.models.user import db
+from src.services.tenants import init_tenancy, create_tenant
+
+# Ohne dauerhaft geöffneten App-Kontext, damit jede Anfrage wie im Betrieb
+# ihren eigenen Kontext (und damit ihre eigene Mandanten-Engine) erhält
+
+
+@pytest.fixture
+def tenant_app(tmp_path):
+    app = create_app(
+        tmp_path,
+        TENANT_SHARDS={'local': f"sqlite:///{tmp_path / 'tenants' / '{tenant}.db'}"},
+        TENANT_DEFAULT_SHARD='local',
+    )
+    init_tenancy(app)
+    yield app
+    router = app.extensions['tenancy']
+    for entry in router.cached_tenants():
+        router.discard(entry['tenant'])
+    with app.app_context():
+        db.engine.dispose()
+
+
+def test_unknown_tenant_is_rejected_without_provisioning(tenant_app, tmp_path):
+    client = tenant_app.test_client()
+    response = client.get('/api/projects', headers={'X-Tenant': 'acme'})
+    assert response.status_code == 404
+    assert not os.path.exists(tmp_path / 'tenants' / 'acme.db')
+    router = tenant_app.extensions['tenancy']
+    with tenant_app.app_context():
+        assert router.placement('acme') is None
+    assert 'acme' not in router._tenant_locks
+
+
+def test_created_tenant_has_own_database(tenant_app, tmp_path):
+    with tenant_app.app_context():
+        create_tenant('acme')
+    client = tenant_app.test_client()
+    response = client.post('/api/projects', json={'name': 'Mandant'}, headers={'X-Tenant': 'acme'})
+    assert response.status_code == 201, response.get_json()
+
+    assert [item['name'] for item in client.get('/api/projects', headers={'X-Tenant': 'acme'}).get_json()] \
+        == ['Mandant']
+    assert client.get('/api/projects').get_json() == []
+    assert os.path.exists(tmp_path / 'tenants' / 'acme.db')
+
+    with tenant_app.app_context(), pytest.raises(ValueError):
+        create_tenant('acme')
+
+
+def test_discard_drops_tenant_lock(tenant_app):
+    with tenant_app.app_context():
+        create_tenant('acme')
+    router = tenant_app.extensions['tenancy']
+    assert 'acme' in router._tenant_locks
+    router.discard('acme')
+    assert 'acme' not in router._tenant_locks